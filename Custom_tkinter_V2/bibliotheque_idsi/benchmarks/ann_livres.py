@@ -0,0 +1,73 @@
+"""
+Benchmark de l'index ANN des livres : rappel et latence
+Système de Gestion de Bibliothèque - IDSI
+
+Compare l'index IVF (utils/ann.py) à la recherche exacte pour plusieurs
+valeurs de nprobe, sur un catalogue synthétique (par défaut) ou sur les
+vecteurs de contenu du catalogue réel :
+
+    python benchmarks/ann_livres.py [--livres 50000] [--requetes 200] [--catalogue]
+"""
+
+import sys
+import os
+import argparse
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils.ann import IndexIVF, evaluer_index, normaliser, projection_aleatoire, DIMENSION_PROJECTION
+
+
+def vecteurs_synthetiques(n_livres, dimension=DIMENSION_PROJECTION, n_themes=500, graine=0):
+    """Vecteurs groupés autour de ``n_themes`` thèmes, comme un catalogue réel"""
+    rng = np.random.default_rng(graine)
+    themes = normaliser(rng.standard_normal((n_themes, dimension)))
+    labels = rng.integers(n_themes, size=n_livres)
+    bruit = 0.6 * rng.standard_normal((n_livres, dimension)).astype(np.float32) / np.sqrt(dimension)
+    return normaliser(themes[labels] + bruit)
+
+
+def vecteurs_catalogue():
+    """Vecteurs de contenu TF-IDF du catalogue, projetés en dimension réduite"""
+    from models.database import get_db
+    from utils.recommendation import RecommendationSystem
+    
+    db = get_db()
+    try:
+        index = RecommendationSystem(db).construire_index_contenu()
+        return projection_aleatoire(index.vecteurs), index.livre_ids
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rappel et latence de l'index ANN")
+    parser.add_argument('--livres', type=int, default=50000, help="taille du catalogue synthétique")
+    parser.add_argument('--requetes', type=int, default=200, help="nombre de requêtes")
+    parser.add_argument('--k', type=int, default=10, help="voisins par requête")
+    parser.add_argument('--catalogue', action='store_true', help="utiliser le catalogue de la base")
+    args = parser.parse_args()
+    
+    if args.catalogue:
+        vecteurs, ids = vecteurs_catalogue()
+    else:
+        vecteurs = vecteurs_synthetiques(args.livres)
+        ids = np.arange(len(vecteurs))
+    
+    rng = np.random.default_rng(1)
+    requetes = vecteurs[rng.choice(len(vecteurs), min(args.requetes, len(vecteurs)), replace=False)]
+    
+    debut = time.perf_counter()
+    index = IndexIVF.construire(vecteurs, ids)
+    duree = time.perf_counter() - debut
+    print(f"{len(vecteurs)} livres, {index.n_listes} listes, construction {duree:.2f} s\n")
+    
+    print(f"{'méthode':<10}{'nprobe':>8}{f'rappel@{args.k}':>12}{'ms/requête':>13}")
+    for ligne in evaluer_index(index, vecteurs, ids, requetes, k=args.k):
+        nprobe = '-' if ligne['nprobe'] is None else ligne['nprobe']
+        print(f"{ligne['methode']:<10}{nprobe:>8}{ligne['rappel']:>12.3f}{ligne['ms_par_requete']:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
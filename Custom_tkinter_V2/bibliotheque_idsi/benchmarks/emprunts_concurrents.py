@@ -0,0 +1,207 @@
+"""
+Test de charge des emprunts concurrents
+Système de Gestion de Bibliothèque - IDSI
+
+Plusieurs threads (autant de postes de prêt) empruntent en même temps des
+livres à faible stock, sur une base temporaire. À la fin, le script
+vérifie les invariants et affiche le débit :
+
+- aucun stock négatif ;
+- pour chaque livre, exemplaires prêtés = emprunts en cours ;
+- aucun étudiant au-delà de ``max_loans_per_student``.
+
+    python benchmarks/emprunts_concurrents.py [--threads 16] [--tentatives 200] [--naif]
+
+``--naif`` rejoue l'ancienne logique (lecture du stock, contrôle puis
+décrément en Python) pour comparaison.
+"""
+
+import sys
+import os
+import argparse
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+import models.database as database
+from models.models import Etudiant, Livre, Emprunt
+from services.emprunts import EmpruntRefuse, emprunter_livre, compter_emprunts_en_cours, avec_reprise
+from utils.theme import APP_CONFIG
+
+
+def preparer_base(dossier, n_etudiants, n_livres, exemplaires):
+    """Créer une base temporaire avec des étudiants et des livres à faible stock"""
+    database.engine = database.create_db_engine(os.path.join(dossier, 'charge.db'))
+    database.SessionLocal.configure(bind=database.engine)
+    database.init_db()
+    
+    db = database.get_db()
+    try:
+        for i in range(n_etudiants):
+            db.add(Etudiant(
+                matricule=f"CHG{i:05d}",
+                nom=f"Nom{i}",
+                prenom=f"Prenom{i}",
+                email=f"charge{i}@inphb.ci",
+                mot_de_passe=Etudiant.hash_password(f"CHG{i:05d}")
+            ))
+        for i in range(n_livres):
+            db.add(Livre(
+                titre=f"Livre de charge {i}",
+                quantite_totale=exemplaires,
+                quantite_disponible=exemplaires
+            ))
+        db.commit()
+        return (
+            [e for e, in db.query(Etudiant.id)],
+            [l for l, in db.query(Livre.id)],
+        )
+    finally:
+        db.close()
+
+
+def emprunter_naif(db, etudiant_id, livre_id, max_emprunts):
+    """Ancienne logique : lecture, contrôles, puis décrément en Python"""
+    def operation(db):
+        livre = db.query(Livre).filter(Livre.id == livre_id).first()
+        if livre.quantite_disponible <= 0:
+            raise EmpruntRefuse("Ce livre n'est pas disponible.", 'indisponible')
+        if compter_emprunts_en_cours(db, etudiant_id) >= max_emprunts:
+            raise EmpruntRefuse("Limite atteinte.", 'limite')
+        # Fenêtre de concurrence de l'ancien code (affichage, saisie...)
+        time.sleep(0.001)
+        livre.quantite_disponible -= 1
+        db.add(Emprunt(etudiant_id=etudiant_id, livre_id=livre_id))
+        db.commit()
+    
+    try:
+        return avec_reprise(db, operation)
+    except EmpruntRefuse:
+        db.rollback()
+        raise
+
+
+def poste(etudiant_ids, livre_ids, tentatives, naif, resultats, graine):
+    """Un poste de prêt : ``tentatives`` emprunts au hasard"""
+    rng = random.Random(graine)
+    max_emprunts = APP_CONFIG['max_loans_per_student']
+    compte = Counter()
+    
+    db = database.get_db()
+    try:
+        for _ in range(tentatives):
+            etudiant_id = rng.choice(etudiant_ids)
+            livre_id = rng.choice(livre_ids)
+            try:
+                if naif:
+                    emprunter_naif(db, etudiant_id, livre_id, max_emprunts)
+                else:
+                    emprunter_livre(db, etudiant_id, livre_id, max_emprunts)
+                compte['accepte'] += 1
+            except EmpruntRefuse as e:
+                compte[e.raison] += 1
+            except OperationalError:
+                db.rollback()
+                compte['echec'] += 1
+    finally:
+        db.close()
+    
+    resultats.append(compte)
+
+
+def verifier(exemplaires):
+    """Contrôler les invariants ; retourne la liste des anomalies"""
+    max_emprunts = APP_CONFIG['max_loans_per_student']
+    anomalies = []
+    
+    db = database.get_db()
+    try:
+        ouverts = dict(
+            db.query(Emprunt.livre_id, func.count(Emprunt.id))
+            .filter(Emprunt.date_retour_effective.is_(None))
+            .group_by(Emprunt.livre_id)
+        )
+        for livre_id, disponible in db.query(Livre.id, Livre.quantite_disponible):
+            if disponible < 0:
+                anomalies.append(f"livre {livre_id} : stock négatif ({disponible})")
+            prets = ouverts.get(livre_id, 0)
+            if prets != exemplaires - disponible:
+                anomalies.append(
+                    f"livre {livre_id} : {prets} emprunts pour {exemplaires - disponible} exemplaires sortis"
+                )
+        
+        par_etudiant = (
+            db.query(Emprunt.etudiant_id, func.count(Emprunt.id))
+            .filter(Emprunt.date_retour_effective.is_(None))
+            .group_by(Emprunt.etudiant_id)
+            .having(func.count(Emprunt.id) > max_emprunts)
+        )
+        for etudiant_id, nb in par_etudiant:
+            anomalies.append(f"étudiant {etudiant_id} : {nb} emprunts (max {max_emprunts})")
+    finally:
+        db.close()
+    
+    return anomalies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge des emprunts concurrents")
+    parser.add_argument('--threads', type=int, default=16, help="postes de prêt simultanés")
+    parser.add_argument('--tentatives', type=int, default=200, help="emprunts tentés par poste")
+    parser.add_argument('--etudiants', type=int, default=100)
+    parser.add_argument('--livres', type=int, default=50)
+    parser.add_argument('--exemplaires', type=int, default=3, help="stock initial de chaque livre")
+    parser.add_argument('--naif', action='store_true', help="ancienne logique lecture-contrôle-décrément")
+    args = parser.parse_args()
+    
+    dossier = tempfile.mkdtemp(prefix='bibliotheque_charge_')
+    try:
+        etudiant_ids, livre_ids = preparer_base(dossier, args.etudiants, args.livres, args.exemplaires)
+        
+        resultats = []
+        threads = [
+            threading.Thread(
+                target=poste,
+                args=(etudiant_ids, livre_ids, args.tentatives, args.naif, resultats, graine)
+            )
+            for graine in range(args.threads)
+        ]
+        
+        debut = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duree = time.perf_counter() - debut
+        
+        total = sum(resultats, Counter())
+        n = args.threads * args.tentatives
+        print(f"{'naïf' if args.naif else 'atomique'} : {args.threads} postes × {args.tentatives} tentatives en {duree:.2f} s")
+        print(f"  {n / duree:,.0f} tentatives/s, {total['accepte'] / duree:,.0f} emprunts/s")
+        print(
+            f"  acceptés {total['accepte']}, indisponibles {total['indisponible']}, "
+            f"limite {total['limite']}, échecs (base occupée) {total['echec']}"
+        )
+        
+        anomalies = verifier(args.exemplaires)
+        if anomalies:
+            print(f"\n❌ {len(anomalies)} anomalie(s) :")
+            for anomalie in anomalies[:20]:
+                print(f"  - {anomalie}")
+        else:
+            print("\n✅ Invariants respectés (stock, emprunts en cours, limite par étudiant)")
+        return 1 if anomalies else 0
+    finally:
+        database.engine.dispose()
+        shutil.rmtree(dossier, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
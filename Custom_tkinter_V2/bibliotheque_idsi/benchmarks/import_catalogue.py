@@ -0,0 +1,157 @@
+"""
+Test de charge de l'import du catalogue
+Système de Gestion de Bibliothèque - IDSI
+
+Génère un catalogue synthétique (CSV, JSON lines ou MARC21) puis l'importe
+deux fois dans une base temporaire : le premier passage insère, le second
+met à jour (upsert par ISBN). Affiche le débit de chaque passage et vérifie
+le nombre de livres, d'auteurs et la recherche plein texte.
+
+    python benchmarks/import_catalogue.py [--titres 500000] [--format csv|jsonl|marc]
+"""
+
+import sys
+import os
+import argparse
+import csv
+import json
+import random
+import shutil
+import tempfile
+from collections import Counter
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+
+import models.database as database
+from models.models import Livre, Auteur
+from models.search import rechercher_livres
+from services.import_catalogue import importer_catalogue, lire_notices
+
+MOTS = (
+    "analyse données réseaux sécurité apprentissage statistique algorithmes "
+    "systèmes calcul probabilités optimisation cryptographie python modèles"
+).split()
+CATEGORIES = ("Data Science", "Cybersécurité", "Mathématiques", "Informatique", "Réseaux")
+
+
+def notices_synthetiques(n_titres, n_auteurs, graine=0):
+    """Notices au format commun : ISBN-13 uniques, 1 à 3 auteurs parmi ``n_auteurs``"""
+    rng = random.Random(graine)
+    for i in range(n_titres):
+        yield {
+            'isbn': f"978-{i:010d}",
+            'titre': " ".join(rng.sample(MOTS, 4)).capitalize() + f" {i}",
+            'auteurs': [f"Nom{a}, Prenom{a}" for a in rng.sample(range(n_auteurs), rng.randint(1, 3))],
+            'categorie': rng.choice(CATEGORIES),
+            'editeur': f"Éditions {rng.randint(1, 200)}",
+            'annee_publication': rng.randint(1970, 2025),
+            'nombre_pages': rng.randint(80, 900),
+        }
+
+
+def ecrire_csv(chemin, notices):
+    with open(chemin, 'w', encoding='utf-8', newline='') as fichier:
+        ecrivain = csv.writer(fichier, delimiter=';')
+        ecrivain.writerow(['ISBN', 'Titre', 'Auteurs', 'Catégorie', 'Éditeur', 'Année', 'Pages'])
+        for n in notices:
+            ecrivain.writerow([
+                n['isbn'], n['titre'], " | ".join(n['auteurs']), n['categorie'],
+                n['editeur'], n['annee_publication'], n['nombre_pages']
+            ])
+
+
+def ecrire_jsonl(chemin, notices):
+    with open(chemin, 'w', encoding='utf-8') as fichier:
+        for n in notices:
+            fichier.write(json.dumps(n, ensure_ascii=False) + "\n")
+
+
+def notice_iso2709(zones):
+    """Encoder ``[(étiquette, contenu)]`` en notice MARC21 UTF-8"""
+    repertoire, donnees = b'', b''
+    for etiquette, contenu in zones:
+        octets = contenu.encode('utf-8') + b'\x1e'
+        repertoire += f"{etiquette}{len(octets):04d}{len(donnees):05d}".encode('ascii')
+        donnees += octets
+    base = 24 + len(repertoire) + 1
+    longueur = base + len(donnees) + 1
+    guide = f"{longueur:05d}nam a22{base:05d} i 4500".encode('ascii')
+    return guide + repertoire + b'\x1e' + donnees + b'\x1d'
+
+
+def ecrire_marc(chemin, notices):
+    with open(chemin, 'wb') as fichier:
+        for n in notices:
+            controle = f"250101s{n['annee_publication']}    fr            000 0 fre d"
+            zones = [
+                ('008', controle),
+                ('020', f"  \x1fa{n['isbn'].replace('-', '')}"),
+                ('100', f"1 \x1fa{n['auteurs'][0]},"),
+                ('245', f"10\x1fa{n['titre']} /"),
+                ('264', f" 1\x1faAbidjan :\x1fb{n['editeur']},\x1fc{n['annee_publication']}."),
+                ('300', f"  \x1fa{n['nombre_pages']} p."),
+                ('650', f" 0\x1fa{n['categorie']}."),
+            ]
+            zones += [('700', f"1 \x1fa{auteur},") for auteur in n['auteurs'][1:]]
+            fichier.write(notice_iso2709(zones))
+
+
+ECRIVAINS = {'csv': ecrire_csv, 'jsonl': ecrire_jsonl, 'marc': ecrire_marc}
+EXTENSIONS = {'csv': '.csv', 'jsonl': '.jsonl', 'marc': '.mrc'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'import du catalogue")
+    parser.add_argument('--titres', type=int, default=500000)
+    parser.add_argument('--auteurs', type=int, default=50000)
+    parser.add_argument('--format', choices=sorted(ECRIVAINS), default='csv')
+    args = parser.parse_args()
+    
+    dossier = tempfile.mkdtemp(prefix='bibliotheque_import_')
+    try:
+        chemin = os.path.join(dossier, f"catalogue{EXTENSIONS[args.format]}")
+        ECRIVAINS[args.format](chemin, notices_synthetiques(args.titres, args.auteurs))
+        print(f"{args.titres:,} notices {args.format} ({os.path.getsize(chemin) / 1e6:,.0f} Mo)")
+        
+        database.engine = database.create_db_engine(os.path.join(dossier, 'import.db'))
+        database.SessionLocal.configure(bind=database.engine)
+        database.init_db()
+        
+        for passage in ("insertion", "mise à jour"):
+            rapport = importer_catalogue(database.engine, lire_notices(chemin))
+            print(
+                f"  {passage:12} {rapport.duree:6.1f} s  {rapport.debit:9,.0f} notices/s  "
+                f"(+{rapport.inserees:,} livres, ~{rapport.mises_a_jour:,}, "
+                f"+{rapport.auteurs:,} auteurs, {rapport.ignorees:,} ignorées)"
+            )
+        
+        db = database.get_db()
+        try:
+            n_livres = db.scalar(select(func.count(Livre.id)))
+            n_auteurs = db.scalar(select(func.count(Auteur.id)))
+            trouves = len(rechercher_livres(db, "Nom1 Prenom1"))
+        finally:
+            db.close()
+        
+        attendus = Counter(a for n in notices_synthetiques(args.titres, args.auteurs) for a in n['auteurs'])
+        anomalies = []
+        if n_livres != args.titres:
+            anomalies.append(f"{n_livres} livres pour {args.titres} notices")
+        if n_auteurs != len(attendus):
+            anomalies.append(f"{n_auteurs} auteurs pour {len(attendus)} distincts")
+        if not trouves:
+            anomalies.append("recherche plein texte vide après l'import")
+        
+        if anomalies:
+            print("\n❌ " + " ; ".join(anomalies))
+        else:
+            print(f"\n✅ {n_livres:,} livres, {n_auteurs:,} auteurs, catalogue indexé")
+        return 1 if anomalies else 0
+    finally:
+        database.engine.dispose()
+        shutil.rmtree(dossier, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Nombre de requêtes SQL par écran
+Système de Gestion de Bibliothèque - IDSI
+
+Vérifie que les constructeurs de ``models/queries.py`` chargent les
+relations d'avance : chaque liste des tableaux de bord doit exécuter le
+même nombre d'instructions SQL pour N lignes et pour 10·N lignes (aucun
+SELECT par ligne). Les instructions sont comptées par un écouteur
+``before_cursor_execute`` sur deux bases temporaires.
+
+    python benchmarks/requetes_bornees.py [--n 50]
+"""
+
+import sys
+import os
+import argparse
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, insert
+
+import models.database as database
+from models.models import Etudiant, Livre, Auteur, Emprunt, Recommandation, livre_auteur
+from models.queries import (
+    query_livres, query_emprunts, query_emprunts_en_cours,
+    query_emprunts_en_retard, query_recommandations
+)
+
+
+def preparer_base(chemin, n):
+    """Base avec ``n`` étudiants, livres et auteurs, 2·n emprunts (dont n en retard)"""
+    engine = database.create_db_engine(chemin)
+    database.engine = engine
+    database.SessionLocal.configure(bind=engine)
+    database.init_db()
+    
+    maintenant = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(insert(Etudiant), [
+            {'id': i, 'matricule': f"REQ{i:06d}", 'nom': f"Nom{i}", 'prenom': f"Prenom{i}",
+             'email': f"req{i}@inphb.ci", 'mot_de_passe': 'x'}
+            for i in range(1, n + 1)
+        ])
+        conn.execute(insert(Auteur), [{'id': i, 'nom': f"Auteur{i}"} for i in range(1, n + 1)])
+        conn.execute(insert(Livre), [
+            {'id': i, 'titre': f"Livre {i}", 'quantite_totale': 3, 'quantite_disponible': 3}
+            for i in range(1, n + 1)
+        ])
+        conn.execute(insert(livre_auteur), [
+            {'livre_id': i, 'auteur_id': a} for i in range(1, n + 1) for a in {i, i % n + 1}
+        ])
+        conn.execute(insert(Emprunt), [
+            {'etudiant_id': i % n + 1, 'livre_id': (i * 7) % n + 1,
+             'date_emprunt': maintenant - timedelta(days=30),
+             # Un emprunt sur deux en retard, l'autre en cours
+             'date_retour_prevue': maintenant + timedelta(days=-5 if i % 2 else 5)}
+            for i in range(2 * n)
+        ])
+        conn.execute(insert(Recommandation), [
+            {'etudiant_id': 1, 'livre_id': i, 'rang': i} for i in range(1, n + 1)
+        ])
+    return engine
+
+
+# Chargeurs des écrans : la requête et les attributs affichés par ligne
+CHARGEURS = {
+    'catalogue': lambda db: [
+        (l.titre, l.auteurs_str) for l in query_livres(db).all()
+    ],
+    'emprunts': lambda db: [
+        (e.etudiant.matricule, e.livre.titre) for e in query_emprunts(db).all()
+    ],
+    'retours': lambda db: [
+        (e.etudiant.matricule, e.livre.titre) for e in query_emprunts_en_cours(db).all()
+    ],
+    'retards': lambda db: [
+        (e.etudiant.nom_complet, e.livre.titre) for e in query_emprunts_en_retard(db).all()
+    ],
+    'recommandations': lambda db: [
+        (r.livre.titre, r.livre.auteurs_str) for r in query_recommandations(db, 1).all()
+    ],
+}
+
+
+def compter(engine, chargeur):
+    """Nombre d'instructions SQL et de lignes d'un chargement"""
+    instructions = []
+    
+    def noter(conn, cursor, statement, parameters, context, executemany):
+        instructions.append(statement)
+    
+    db = database.get_db()
+    event.listen(engine, 'before_cursor_execute', noter)
+    try:
+        lignes = chargeur(db)
+    finally:
+        event.remove(engine, 'before_cursor_execute', noter)
+        db.close()
+    return len(instructions), len(lignes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nombre de requêtes SQL par écran")
+    parser.add_argument('--n', type=int, default=50, help="taille de la petite base")
+    args = parser.parse_args()
+    
+    dossier = tempfile.mkdtemp(prefix='bibliotheque_requetes_')
+    resultats = {}
+    try:
+        for n in (args.n, 10 * args.n):
+            engine = preparer_base(os.path.join(dossier, f"base_{n}.db"), n)
+            try:
+                resultats[n] = {nom: compter(engine, chargeur) for nom, chargeur in CHARGEURS.items()}
+            finally:
+                engine.dispose()
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+    
+    petit, grand = (resultats[n] for n in sorted(resultats))
+    echecs = []
+    for nom in CHARGEURS:
+        (req_petit, lignes_petit), (req_grand, lignes_grand) = petit[nom], grand[nom]
+        ok = req_petit == req_grand and lignes_grand > lignes_petit
+        print(f"  {'✅' if ok else '❌'} {nom:16} {lignes_petit:5} lignes : {req_petit} requête(s)   "
+              f"{lignes_grand:5} lignes : {req_grand} requête(s)")
+        if not ok:
+            echecs.append(nom)
+    
+    if echecs:
+        print(f"\n❌ Nombre de requêtes dépendant du nombre de lignes : {', '.join(echecs)}")
+        return 1
+    print("\n✅ Nombre de requêtes indépendant du nombre de lignes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Mesure de la latence des scans au guichet
+Système de Gestion de Bibliothèque - IDSI
+
+Sur une base temporaire (livres aux ISBN avec tirets, étudiants), rejoue
+une session de guichet : carte étudiant, puis quelques livres empruntés,
+puis les mêmes livres rendus. Affiche la latence de chaque type de scan
+(médiane, 95e centile, maximum) à comparer à l'objectif de 50 ms.
+
+    python benchmarks/scan_circulation.py [--etudiants 2000] [--livres 20000] [--sessions 200]
+
+La latence vue au guichet ajoute au plus ``INTERVALLE_RELEVE`` (relève
+des résultats du worker par le thread Tk).
+"""
+
+import sys
+import os
+import argparse
+import random
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+
+import models.database as database
+from models.models import Etudiant, Livre
+from services.circulation import Guichet
+from utils.theme import APP_CONFIG
+from utils.worker import INTERVALLE_RELEVE
+
+# Objectif de latence par scan (ms)
+OBJECTIF_MS = 50
+
+
+def preparer_base(dossier, n_etudiants, n_livres):
+    """Créer une base temporaire ; retourne les matricules et les ISBN (sans tirets)"""
+    database.engine = database.create_db_engine(os.path.join(dossier, 'scan.db'))
+    database.SessionLocal.configure(bind=database.engine)
+    database.init_db()
+    
+    mot_de_passe = Etudiant.hash_password("scan")
+    matricules = [f"ENSEA-{i:05d}" for i in range(n_etudiants)]
+    isbns = [f"978{i:010d}" for i in range(n_livres)]
+    with database.engine.begin() as conn:
+        conn.execute(insert(Etudiant), [
+            {'matricule': m, 'nom': f"Nom{i}", 'prenom': f"Prenom{i}",
+             'email': f"scan{i}@inphb.ci", 'mot_de_passe': mot_de_passe, 'actif': True}
+            for i, m in enumerate(matricules)
+        ])
+        conn.execute(insert(Livre), [
+            {'isbn': f"{isbn[:3]}-{isbn[3:]}", 'titre': f"Livre scanné {i}",
+             'quantite_totale': 3, 'quantite_disponible': 3}
+            for i, isbn in enumerate(isbns)
+        ])
+    return matricules, isbns
+
+
+def mesurer(latences, nature, operation, db, code):
+    debut = time.perf_counter()
+    resultat = operation(db, code)
+    latences[nature].append((time.perf_counter() - debut) * 1000)
+    return resultat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence des scans au guichet")
+    parser.add_argument('--etudiants', type=int, default=2000)
+    parser.add_argument('--livres', type=int, default=20000)
+    parser.add_argument('--sessions', type=int, default=200, help="passages au guichet")
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    max_emprunts = APP_CONFIG['max_loans_per_student']
+    dossier = tempfile.mkdtemp(prefix='bibliotheque_scan_')
+    try:
+        matricules, isbns = preparer_base(dossier, args.etudiants, args.livres)
+        latences = defaultdict(list)
+        
+        db = database.get_db()
+        try:
+            for _ in range(args.sessions):
+                matricule = rng.choice(matricules)
+                livres = rng.sample(isbns, rng.randint(1, max_emprunts))
+                
+                guichet = Guichet()
+                mesurer(latences, 'carte', guichet.scanner_emprunt, db, matricule)
+                for isbn in livres:
+                    mesurer(latences, 'emprunt', guichet.scanner_emprunt, db, isbn)
+                
+                # Retour sans carte : l'ISBN seul retrouve l'emprunt
+                guichet = Guichet()
+                for isbn in livres:
+                    mesurer(latences, 'retour', guichet.scanner_retour, db, isbn)
+        finally:
+            db.close()
+        
+        print(f"{args.sessions} passages, {args.etudiants} étudiants, {args.livres} livres")
+        depasse = False
+        for nature, valeurs in latences.items():
+            valeurs.sort()
+            p50 = valeurs[len(valeurs) // 2]
+            p95 = valeurs[int(len(valeurs) * 0.95)]
+            depasse |= p95 + INTERVALLE_RELEVE > OBJECTIF_MS
+            print(f"  {nature:8} {len(valeurs):6} scans  médiane {p50:6.2f} ms  p95 {p95:6.2f} ms  max {valeurs[-1]:6.2f} ms")
+        
+        print(f"\n(+ {INTERVALLE_RELEVE} ms au plus de relève par le thread Tk)")
+        if depasse:
+            print(f"❌ Objectif de {OBJECTIF_MS} ms dépassé au 95e centile")
+        else:
+            print(f"✅ Objectif de {OBJECTIF_MS} ms tenu au 95e centile")
+        return 1 if depasse else 0
+    finally:
+        database.engine.dispose()
+        shutil.rmtree(dossier, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+Script de calcul des recommandations par lots
+Système de Gestion de Bibliothèque - IDSI
+
+Calcule les recommandations de tous les étudiants (ou de ceux passés en
+arguments) et les enregistre dans la table ``recommandations`` lue par les
+tableaux de bord. À lancer après l'import des données ou chaque nuit :
+
+    python calculer_recommandations.py [--processus N] [--n 5] [id ...]
+"""
+
+import sys
+import os
+import argparse
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models.database import init_db, get_db
+from utils.recommendation import RecommendationSystem
+
+
+def calculer_recommandations(etudiant_ids=None, n_recommendations=5, processus=None):
+    """Entraîner (ou charger) le modèle puis recalculer les recommandations"""
+    init_db()
+    db = get_db()
+
+    try:
+        debut = time.perf_counter()
+        systeme = RecommendationSystem(db)
+        systeme.entrainer()
+        nb_lignes = systeme.calculer_recommandations(etudiant_ids, n_recommendations, processus)
+        duree = time.perf_counter() - debut
+
+        print(f"✅ {nb_lignes} recommandations enregistrées en {duree:.2f} s")
+        return nb_lignes
+    except Exception as e:
+        db.rollback()
+        print(f"\n❌ Erreur: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calcul des recommandations par lots")
+    parser.add_argument('etudiant_ids', nargs='*', type=int, help="ids des étudiants (tous par défaut)")
+    parser.add_argument('--n', type=int, default=5, help="recommandations par étudiant")
+    parser.add_argument('--processus', type=int, default=None, help="nombre de processus de calcul")
+    args = parser.parse_args()
+
+    calculer_recommandations(args.etudiant_ids or None, args.n, args.processus)
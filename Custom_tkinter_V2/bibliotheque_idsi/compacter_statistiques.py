@@ -0,0 +1,49 @@
+"""
+Compaction nocturne des statistiques journalières
+Système de Gestion de Bibliothèque - IDSI
+
+Recalcule les jours écoulés depuis la dernière compaction dans la table
+``statistiques_journalieres``. À planifier chaque nuit (cron, planificateur
+de tâches) :
+
+    python compacter_statistiques.py [--depuis AAAA-MM-JJ]
+"""
+
+import sys
+import os
+import argparse
+import time
+from datetime import date
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models.database import init_db, get_db
+from services.statistiques_journalieres import compacter
+
+
+def compacter_statistiques(depuis=None):
+    """Compacter les jours non compactés (ou tous les jours depuis ``depuis``)"""
+    init_db()
+    db = get_db()
+    
+    try:
+        debut = time.perf_counter()
+        nb_jours = compacter(db, depuis=depuis)
+        duree = time.perf_counter() - debut
+        
+        print(f"✅ {nb_jours} jour(s) compacté(s) en {duree:.2f} s")
+        return nb_jours
+    except Exception as e:
+        db.rollback()
+        print(f"\n❌ Erreur: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compaction des statistiques journalières")
+    parser.add_argument('--depuis', type=date.fromisoformat, default=None,
+                        help="recalculer à partir de cette date (AAAA-MM-JJ)")
+    args = parser.parse_args()
+    
+    compacter_statistiques(args.depuis)
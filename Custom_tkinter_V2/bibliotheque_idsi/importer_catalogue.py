@@ -0,0 +1,53 @@
+"""
+Script d'import en masse du catalogue
+Système de Gestion de Bibliothèque - IDSI
+
+Importe un fichier CSV, JSON lines ou MARC21 (ISO 2709) dans le catalogue :
+les livres sont insérés, ou mis à jour s'ils existent déjà (même ISBN).
+Le format est déduit de l'extension (.csv, .jsonl/.ndjson/.json, .mrc/.marc) :
+
+    python importer_catalogue.py fichier [--format csv|jsonl|marc] [--lot 5000] [--quantite 1]
+"""
+
+import sys
+import os
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import models.database as database
+from services.import_catalogue import importer_catalogue, lire_notices, TAILLE_LOT, LECTEURS
+
+
+def importer(chemin, format=None, taille_lot=TAILLE_LOT, quantite=1):
+    """Importer le fichier ``chemin`` et afficher l'avancement (notices/s)"""
+    database.init_db()
+    
+    def afficher(rapport):
+        print(f"  {rapport.lues:,} notices lues - {rapport.debit:,.0f} notices/s", end='\r', flush=True)
+    
+    print(f"📥 Import de {chemin}")
+    try:
+        rapport = importer_catalogue(
+            database.engine, lire_notices(chemin, format), taille_lot, quantite, afficher
+        )
+    except Exception as e:
+        print(f"\n❌ Erreur: {str(e)}")
+        raise
+    
+    print(f"\n✅ {rapport.lues:,} notices en {rapport.duree:.1f} s ({rapport.debit:,.0f} notices/s)")
+    print(f"   {rapport.inserees:,} livres ajoutés, {rapport.mises_a_jour:,} mis à jour, "
+          f"{rapport.auteurs:,} nouveaux auteurs")
+    if rapport.ignorees:
+        print(f"   {rapport.ignorees:,} notices ignorées (sans ISBN ou titre, illisibles ou en double)")
+    return rapport
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import en masse du catalogue")
+    parser.add_argument('fichier', help="fichier CSV, JSON lines ou MARC21")
+    parser.add_argument('--format', choices=sorted(LECTEURS), default=None, help="format (extension par défaut)")
+    parser.add_argument('--lot', type=int, default=TAILLE_LOT, help="notices par transaction")
+    parser.add_argument('--quantite', type=int, default=1, help="exemplaires d'un nouveau livre sans quantité")
+    args = parser.parse_args()
+    
+    importer(args.fichier, args.format, args.lot, args.quantite)
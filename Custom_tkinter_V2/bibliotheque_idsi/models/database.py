@@ -3,17 +3,84 @@ Configuration de la base de données SQLAlchemy
 Système de Gestion de Bibliothèque - ENSEA
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 import os
+import sqlite3
 
 # Chemin de la base de données
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATABASE_PATH = os.path.join(BASE_DIR, 'bibliotheque_ensea.db')
 
+# Version minimale de SQLite (UPDATE / INSERT ... RETURNING)
+SQLITE_VERSION_MIN = (3, 35, 0)
+
+# Profil du moteur SQLite
+DATABASE_CONFIG = {
+    'echo': False,
+    # Connexions gardées ouvertes et réutilisées par get_db()
+    'pool_size': 5,
+    'max_overflow': 5,
+    # PRAGMA appliqués à chaque nouvelle connexion
+    'pragmas': {
+        'journal_mode': 'WAL',       # les lectures ne bloquent plus sur une écriture
+        'synchronous': 'NORMAL',     # sûr en WAL, beaucoup moins de fsync
+        'busy_timeout': 5000,        # ms d'attente sur un verrou avant SQLITE_BUSY
+        'cache_size': -65536,        # 64 Mo de cache de pages
+        'mmap_size': 268435456,      # 256 Mo lus via mmap
+        'temp_store': 'MEMORY',      # tris et tables temporaires en mémoire
+    },
+}
+
+
+# Fonctions SQL supplémentaires : nom -> (nombre d'arguments, fonction),
+# déclarées par les modèles qui les utilisent (voir ``fonction_sql``)
+SQL_FUNCTIONS = {}
+
+
+def fonction_sql(nom, n_args):
+    """
+    Décorateur : déclarer ``fonction`` comme fonction SQL ``nom``, enregistrée
+    sur chaque nouvelle connexion (les modèles sont importés avant la première)
+    """
+    def enregistrer(fonction):
+        SQL_FUNCTIONS[nom] = (n_args, fonction)
+        return fonction
+    return enregistrer
+
+
+def create_db_engine(path=DATABASE_PATH, config=DATABASE_CONFIG):
+    """Créer un moteur SQLite configuré selon le profil ``config``"""
+    db_engine = create_engine(
+        f'sqlite:///{path}',
+        echo=config['echo'],
+        poolclass=QueuePool,
+        pool_size=config['pool_size'],
+        max_overflow=config['max_overflow'],
+        # Les connexions du pool peuvent servir à plusieurs threads
+        connect_args={'check_same_thread': False},
+    )
+    
+    pragmas = config.get('pragmas', {})
+    
+    @event.listens_for(db_engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+        for name, (n_args, function) in SQL_FUNCTIONS.items():
+            dbapi_connection.create_function(name, n_args, function, deterministic=True)
+    
+    return db_engine
+
+
 # Configuration SQLAlchemy
-engine = create_engine(f'sqlite:///{DATABASE_PATH}', echo=False)
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -26,7 +93,49 @@ def get_db():
         db.close()
         raise
 
+def verifier_version_sqlite():
+    """
+    Vérifier la version de la bibliothèque SQLite liée à Python : emprunts,
+    retours et import du catalogue utilisent ``RETURNING`` (SQLite 3.35+).
+    """
+    if sqlite3.sqlite_version_info < SQLITE_VERSION_MIN:
+        minimum = '.'.join(map(str, SQLITE_VERSION_MIN))
+        raise RuntimeError(
+            f"SQLite {sqlite3.sqlite_version} est trop ancien : la version {minimum} "
+            f"ou supérieure est requise (mettre à jour Python ou la bibliothèque SQLite du système)."
+        )
+
+
 def init_db():
     """Initialiser la base de données"""
+    verifier_version_sqlite()
     from models.models import Etudiant, Bibliothecaire, Livre, Auteur, livre_auteur, Emprunt, Reservation
+    from models.search import install_fts
     Base.metadata.create_all(bind=engine)
+    upgrade_db()
+    install_fts(engine)
+
+
+def upgrade_db():
+    """
+    Mettre à niveau une base existante sans la recréer.
+
+    ``create_all`` ne crée les index qu'avec leur table : une base créée par
+    une version précédente n'aurait pas les index ajoutés depuis. Chaque
+    index déclaré sur les modèles est donc créé s'il manque (idempotent).
+    Les index existants sont lus dans ``sqlite_master`` : la réflexion de
+    SQLAlchemy ignore les index sur expression (``ix_livres_isbn_code``).
+    """
+    with engine.begin() as conn:
+        existants = {
+            nom for nom, in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")
+        }
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existants:
+                    index.create(bind=conn)
+        # Compteurs de popularité d'une base antérieure à leur ajout
+        from models.models import PopulariteLivre
+        PopulariteLivre.reconstruire_si_vide(conn)
+        # Rafraîchir les statistiques du planificateur pour les nouveaux index
+        conn.exec_driver_sql("PRAGMA optimize")
@@ -3,11 +3,30 @@ Modèles de données SQLAlchemy
 Système de Gestion de Bibliothèque - ENSEA
 """
 
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, Boolean, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, Boolean, ForeignKey, Table, Index, text, event, func, select, and_, or_, cast, bindparam, literal_column
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta
-from models.database import Base
+from models.database import Base, fonction_sql
 import hashlib
+import math
+
+
+def isbn_sans_tirets(isbn):
+    """
+    Expression SQL de l'ISBN sans tirets, forme lue par un scanner (EAN-13).
+    Les tirets sont des littéraux et non des paramètres : SQLite n'utilise
+    l'index sur expression que si la requête répète l'expression à l'identique.
+    """
+    return func.replace(isbn, literal_column("'-'"), literal_column("''"))
+
+
+def normaliser_isbn(code):
+    """ISBN saisi ou scanné, sans tirets ni espaces (X final en majuscule)"""
+    return code.replace('-', '').replace(' ', '').upper()
+
 
 # Table d'association Livre-Auteur (relation many-to-many)
 livre_auteur = Table(
@@ -59,6 +78,13 @@ class Livre(Base):
     image_url = Column(String(500))
     date_ajout = Column(DateTime, default=datetime.now)
     
+    __table_args__ = (
+        Index('ix_livres_categorie', 'categorie'),
+        Index('ix_livres_titre', 'titre'),
+        # Recherche au scanner : ISBN sans tirets
+        Index('ix_livres_isbn_code', isbn_sans_tirets(isbn)),
+    )
+    
     # Relations
     auteurs = relationship('Auteur', secondary=livre_auteur, back_populates='livres')
     emprunts = relationship('Emprunt', back_populates='livre')
@@ -92,6 +118,11 @@ class Etudiant(Base):
     date_inscription = Column(DateTime, default=datetime.now)
     actif = Column(Boolean, default=True)
     
+    __table_args__ = (
+        # Liste alphabétique paginée (nom, id)
+        Index('ix_etudiants_nom', 'nom', 'id'),
+    )
+    
     # Relations
     emprunts = relationship('Emprunt', back_populates='etudiant')
     reservations = relationship('Reservation', back_populates='etudiant')
@@ -167,6 +198,30 @@ class Emprunt(Base):
     statut = Column(String(20), default='en_cours')  # en_cours, retourne, en_retard
     notes = Column(Text)
     
+    __table_args__ = (
+        # Historique d'un étudiant, du plus récent au plus ancien
+        Index('ix_emprunts_etudiant_date', 'etudiant_id', 'date_emprunt'),
+        Index('ix_emprunts_livre', 'livre_id'),
+        # Historique global paginé (date_emprunt, id)
+        Index('ix_emprunts_date', 'date_emprunt', 'id'),
+        # Compaction des statistiques journalières (retours et échéances par jour)
+        Index('ix_emprunts_retour', 'date_retour_effective'),
+        Index('ix_emprunts_echeance', 'date_retour_prevue'),
+        # Index partiels sur les seuls emprunts non retournés
+        Index(
+            'ix_emprunts_ouverts_etudiant', 'etudiant_id',
+            sqlite_where=text('date_retour_effective IS NULL')
+        ),
+        Index(
+            'ix_emprunts_ouverts_echeance', 'date_retour_prevue',
+            sqlite_where=text('date_retour_effective IS NULL')
+        ),
+        Index(
+            'ix_emprunts_ouverts_livre', 'livre_id',
+            sqlite_where=text('date_retour_effective IS NULL')
+        ),
+    )
+    
     # Relations
     etudiant = relationship('Etudiant', back_populates='emprunts')
     livre = relationship('Livre', back_populates='emprunts')
@@ -183,7 +238,7 @@ class Emprunt(Base):
     def __repr__(self):
         return f"<Emprunt {self.id} - {self.livre.titre if self.livre else 'N/A'}>"
     
-    @property
+    @hybrid_property
     def jours_retard(self):
         """Calculer le nombre de jours de retard"""
         if self.date_retour_effective:
@@ -195,13 +250,49 @@ class Emprunt(Base):
             return (date_ref - self.date_retour_prevue).days
         return 0
     
-    @property
+    @jours_retard.expression
+    def jours_retard(cls):
+        """Même calcul en SQL : différence de julianday tronquée, au moins 0"""
+        date_ref = func.coalesce(
+            func.julianday(cls.date_retour_effective),
+            func.julianday(datetime.now())
+        )
+        return func.max(cast(date_ref - func.julianday(cls.date_retour_prevue), Integer), 0)
+    
+    @hybrid_property
     def est_en_retard(self):
         return self.jours_retard > 0
     
+    @est_en_retard.expression
+    def est_en_retard(cls):
+        return or_(
+            cls.echeance_depassee(),
+            func.julianday(cls.date_retour_effective) - func.julianday(cls.date_retour_prevue) >= 1
+        )
+    
+    @classmethod
+    def echeance_depassee(cls):
+        """
+        Condition SQL « emprunt en cours et en retard » : comparaison directe
+        de la date d'échéance, servie par l'index partiel des emprunts ouverts
+        """
+        return and_(
+            cls.date_retour_effective.is_(None),
+            cls.date_retour_prevue <= datetime.now() - timedelta(days=1)
+        )
+    
+    @hybrid_property
+    def penalite_courante(self):
+        """Pénalité due à ce jour (sans modifier ``penalite``)"""
+        return self.jours_retard * self.PENALITE_PAR_JOUR
+    
+    @penalite_courante.expression
+    def penalite_courante(cls):
+        return cls.jours_retard * cls.PENALITE_PAR_JOUR
+    
     def calculer_penalite(self):
         """Calculer la pénalité en FCFA"""
-        self.penalite = self.jours_retard * self.PENALITE_PAR_JOUR
+        self.penalite = self.penalite_courante
         return self.penalite
     
     def retourner(self):
@@ -226,6 +317,10 @@ class Reservation(Base):
     date_expiration = Column(DateTime)
     statut = Column(String(20), default='en_attente')  # en_attente, confirmee, annulee, expiree
     
+    __table_args__ = (
+        Index('ix_reservations_statut_expiration', 'statut', 'date_expiration'),
+    )
+    
     # Relations
     etudiant = relationship('Etudiant', back_populates='reservations')
     livre = relationship('Livre', back_populates='reservations')
@@ -243,3 +338,254 @@ class Reservation(Base):
     @property
     def est_expiree(self):
         return datetime.now() > self.date_expiration and self.statut == 'en_attente'
+
+
+class Recommandation(Base):
+    """Recommandations pré-calculées (une ligne par étudiant et par rang)"""
+    __tablename__ = 'recommandations'
+    
+    id = Column(Integer, primary_key=True)
+    etudiant_id = Column(Integer, ForeignKey('etudiants.id'), nullable=False)
+    livre_id = Column(Integer, ForeignKey('livres.id'), nullable=False)
+    rang = Column(Integer, nullable=False)  # 1 = meilleure recommandation
+    score = Column(Float, default=0)
+    source = Column(String(20), default='collaboratif')  # collaboratif, mixte, populaire
+    date_calcul = Column(DateTime, default=datetime.now)
+    
+    __table_args__ = (
+        Index('ix_recommandations_etudiant_rang', 'etudiant_id', 'rang'),
+    )
+    
+    # Relations
+    etudiant = relationship('Etudiant')
+    livre = relationship('Livre')
+    
+    def __repr__(self):
+        return f"<Recommandation {self.etudiant_id} #{self.rang} - {self.livre_id}>"
+
+
+@fonction_sql('logaddexp', 2)
+def logaddexp(a, b):
+    """log(exp(a) + exp(b)) sans débordement ; NULL compte pour un terme nul"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b) + math.log1p(math.exp(-abs(a - b)))
+
+
+class PopulariteLivre(Base):
+    """
+    Compteurs d'emprunts dénormalisés par livre, tenus à jour à chaque emprunt
+
+    Les fenêtres glissantes de 30 et 90 jours sont approchées par des
+    compteurs à décroissance exponentielle (constante de temps τ = 30 ou 90
+    jours). Chacun est stocké sous la forme log(compteur) + t/τ, où t est la
+    date de la mise à jour : cette clé ne dépend pas de l'instant de lecture,
+    trier par elle revient à trier par le compteur décru à la date du jour,
+    et le top N est une simple lecture d'index.
+    """
+    __tablename__ = 'popularite_livres'
+    
+    livre_id = Column(Integer, ForeignKey('livres.id'), primary_key=True)
+    nb_emprunts = Column(Integer, default=0, nullable=False)
+    cle_30j = Column(Float)
+    cle_90j = Column(Float)
+    dernier_emprunt = Column(DateTime)
+    
+    __table_args__ = (
+        Index('ix_popularite_total', 'nb_emprunts'),
+        Index('ix_popularite_30j', 'cle_30j'),
+        Index('ix_popularite_90j', 'cle_90j'),
+    )
+    
+    # Relations
+    livre = relationship('Livre')
+    
+    # Constante de temps (jours) de chaque fenêtre
+    FENETRES = {'30j': 30, '90j': 90}
+    # Origine des temps des clés
+    EPOQUE = datetime(2020, 1, 1)
+    
+    def __repr__(self):
+        return f"<PopulariteLivre {self.livre_id} - {self.nb_emprunts} emprunts>"
+    
+    @classmethod
+    def temps(cls, date, jours):
+        """Date exprimée en nombre de constantes de temps depuis EPOQUE"""
+        return (date - cls.EPOQUE).total_seconds() / 86400 / jours
+    
+    @classmethod
+    def colonne(cls, fenetre):
+        """Colonne de tri d'une fenêtre ('30j', '90j' ou 'total')"""
+        if fenetre == 'total':
+            return cls.nb_emprunts
+        if fenetre not in cls.FENETRES:
+            raise ValueError(f"Fenêtre inconnue: {fenetre}")
+        return getattr(cls, f"cle_{fenetre}")
+    
+    def emprunts_recents(self, fenetre='30j', date=None):
+        """Nombre approché d'emprunts sur la fenêtre, à la date donnée"""
+        cle = getattr(self, f"cle_{fenetre}")
+        if cle is None:
+            return 0.0
+        date = date or datetime.now()
+        return math.exp(cle - self.temps(date, self.FENETRES[fenetre]))
+    
+    @classmethod
+    def compter_emprunt(cls, connection, livre_id, date):
+        """Ajouter un emprunt aux compteurs du livre (UPSERT, une requête)"""
+        table = cls.__table__
+        valeurs = {
+            f"cle_{fenetre}": cls.temps(date, jours)
+            for fenetre, jours in cls.FENETRES.items()
+        }
+        stmt = sqlite_insert(table).values(
+            livre_id=livre_id, nb_emprunts=1, dernier_emprunt=date, **valeurs
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.livre_id],
+            set_={
+                'nb_emprunts': table.c.nb_emprunts + 1,
+                'dernier_emprunt': func.max(table.c.dernier_emprunt, stmt.excluded.dernier_emprunt),
+                **{
+                    nom: func.logaddexp(table.c[nom], stmt.excluded[nom])
+                    for nom in valeurs
+                },
+            }
+        )
+        connection.execute(stmt)
+    
+    @classmethod
+    def reconstruire_si_vide(cls, connection):
+        """
+        Calculer les compteurs depuis l'historique des emprunts si la table
+        est vide (base créée avant leur ajout). Une seule lecture des emprunts.
+        """
+        if connection.execute(select(cls.livre_id).limit(1)).first():
+            return
+        
+        compteurs = {}
+        emprunts = connection.execute(
+            select(Emprunt.livre_id, Emprunt.date_emprunt).where(Emprunt.date_emprunt.isnot(None))
+        )
+        for livre_id, date in emprunts:
+            c = compteurs.setdefault(livre_id, {'nb_emprunts': 0, 'dernier_emprunt': date})
+            c['nb_emprunts'] += 1
+            c['dernier_emprunt'] = max(c['dernier_emprunt'], date)
+            for fenetre, jours in cls.FENETRES.items():
+                nom = f"cle_{fenetre}"
+                c[nom] = logaddexp(c.get(nom), cls.temps(date, jours))
+        
+        if compteurs:
+            connection.execute(
+                cls.__table__.insert(),
+                [{'livre_id': livre_id, **c} for livre_id, c in compteurs.items()]
+            )
+
+
+class StatistiqueJournaliere(Base):
+    """
+    Compteurs quotidiens pré-agrégés par catégorie et par filière
+
+    Une ligne par (jour, catégorie, filière), '' tenant lieu de valeur
+    absente. Les emprunts et retours sont ajoutés à l'écriture ; la
+    compaction nocturne (services/statistiques_journalieres.py) recalcule
+    exactement les jours écoulés, y compris les nouveaux retards, et les
+    marque ``compacte``.
+    """
+    __tablename__ = 'statistiques_journalieres'
+    
+    jour = Column(Date, primary_key=True)
+    categorie = Column(String(100), primary_key=True, default='')
+    filiere = Column(String(100), primary_key=True, default='')
+    nb_emprunts = Column(Integer, default=0, nullable=False)
+    nb_retours = Column(Integer, default=0, nullable=False)
+    nb_retours_en_retard = Column(Integer, default=0, nullable=False)
+    nb_nouveaux_retards = Column(Integer, default=0, nullable=False)  # échéance dépassée ce jour-là
+    penalites = Column(Float, default=0, nullable=False)  # pénalités des retours du jour
+    compacte = Column(Boolean, default=False, nullable=False)
+    
+    COMPTEURS = ('nb_emprunts', 'nb_retours', 'nb_retours_en_retard', 'nb_nouveaux_retards', 'penalites')
+    
+    def __repr__(self):
+        return f"<StatistiqueJournaliere {self.jour} {self.categorie}/{self.filiere}>"
+    
+    @classmethod
+    def ajouter(cls, connection, jour, livre_id, etudiant_id, **increments):
+        """
+        Ajouter ``increments`` (ex. nb_emprunts=1) à la ligne du jour, de la
+        catégorie du livre et de la filière de l'étudiant (UPSERT, une requête)
+        """
+        colonnes = ", ".join(cls.COMPTEURS)
+        valeurs = ", ".join(f":{nom}" for nom in cls.COMPTEURS)
+        mises_a_jour = ", ".join(f"{nom} = {nom} + excluded.{nom}" for nom in increments)
+        connection.execute(
+            text(f"""
+                INSERT INTO {cls.__tablename__} (jour, categorie, filiere, {colonnes}, compacte)
+                SELECT :jour, coalesce(l.categorie, ''), coalesce(e.filiere, ''), {valeurs}, 0
+                  FROM livres l, etudiants e
+                 WHERE l.id = :livre_id AND e.id = :etudiant_id
+                ON CONFLICT (jour, categorie, filiere) DO UPDATE SET {mises_a_jour}
+            """),
+            {
+                **{nom: 0 for nom in cls.COMPTEURS},
+                **increments,
+                'jour': jour.isoformat(),
+                'livre_id': livre_id,
+                'etudiant_id': etudiant_id,
+            }
+        )
+    
+    @classmethod
+    def ajouter_retours(cls, connection, jour, emprunt_ids):
+        """
+        Ajouter les retours ``emprunt_ids`` (déjà enregistrés) aux lignes du
+        jour : une seule requête agrégée par catégorie et filière, pour les
+        retours en lot qui ne passent pas par l'ORM
+        """
+        colonnes = ", ".join(cls.COMPTEURS)
+        mises_a_jour = ", ".join(
+            f"{nom} = {nom} + excluded.{nom}"
+            for nom in ('nb_retours', 'nb_retours_en_retard', 'penalites')
+        )
+        connection.execute(
+            text(f"""
+                INSERT INTO {cls.__tablename__} (jour, categorie, filiere, {colonnes}, compacte)
+                SELECT :jour, coalesce(l.categorie, ''), coalesce(e.filiere, ''),
+                       0, count(*),
+                       sum(julianday(m.date_retour_effective) - julianday(m.date_retour_prevue) >= 1),
+                       0, coalesce(sum(m.penalite), 0), 0
+                  FROM emprunts m
+                  JOIN livres l ON l.id = m.livre_id
+                  JOIN etudiants e ON e.id = m.etudiant_id
+                 WHERE m.id IN :emprunt_ids
+                 GROUP BY coalesce(l.categorie, ''), coalesce(e.filiere, '')
+                ON CONFLICT (jour, categorie, filiere) DO UPDATE SET {mises_a_jour}
+            """).bindparams(bindparam('emprunt_ids', expanding=True)),
+            {'jour': jour.isoformat(), 'emprunt_ids': list(emprunt_ids)}
+        )
+
+
+@event.listens_for(Emprunt, 'after_insert')
+def _compter_emprunt(mapper, connection, emprunt):
+    """Compteurs de popularité et statistiques du jour, dans la transaction de l'emprunt"""
+    date_emprunt = emprunt.date_emprunt or datetime.now()
+    PopulariteLivre.compter_emprunt(connection, emprunt.livre_id, date_emprunt)
+    StatistiqueJournaliere.ajouter(
+        connection, date_emprunt.date(), emprunt.livre_id, emprunt.etudiant_id, nb_emprunts=1
+    )
+
+
+@event.listens_for(Emprunt, 'after_update')
+def _compter_retour(mapper, connection, emprunt):
+    """Statistiques du jour du retour, quand date_retour_effective vient d'être renseignée"""
+    historique = sa_inspect(emprunt).attrs.date_retour_effective.history
+    if not historique.added or historique.added[0] is None or any(historique.deleted):
+        return
+    StatistiqueJournaliere.ajouter(
+        connection, emprunt.date_retour_effective.date(), emprunt.livre_id, emprunt.etudiant_id,
+        nb_retours=1,
+        nb_retours_en_retard=1 if emprunt.est_en_retard else 0,
+        penalites=emprunt.penalite or 0
+    )
@@ -0,0 +1,70 @@
+"""
+Pagination par curseur (keyset) des requêtes SQLAlchemy
+Système de Gestion de Bibliothèque - IDSI
+
+Au lieu de ``query.all()`` ou d'un ``OFFSET`` (qui relit toutes les lignes
+sautées), chaque page repart de la clé de la dernière ligne affichée :
+``WHERE (cle) > (:curseur) ORDER BY cle LIMIT n``. Le coût d'une page reste
+constant quelle que soit sa position dans la table.
+"""
+
+from sqlalchemy import tuple_
+
+# Nombre de lignes chargées par page dans les vues
+PAGE_SIZE = 50
+
+
+class Page:
+    """Une page de résultats et le curseur permettant de charger la suivante"""
+
+    def __init__(self, items, cursor, has_more):
+        self.items = items
+        self.cursor = cursor
+        self.has_more = has_more
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return f"<Page {len(self.items)} lignes, suite={self.has_more}>"
+
+
+def _key_expression(keys):
+    return keys[0] if len(keys) == 1 else tuple_(*keys)
+
+
+def _cursor_value(keys, cursor):
+    return cursor[0] if len(keys) == 1 else tuple(cursor)
+
+
+def paginate(query, keys, cursor=None, page_size=PAGE_SIZE, descending=False):
+    """
+    Charger une page d'une requête ordonnée par les colonnes ``keys``.
+
+    ``keys`` doit identifier une ligne de façon unique (terminer par la clé
+    primaire, ex. ``(Emprunt.date_emprunt, Emprunt.id)``). ``cursor`` est le
+    curseur renvoyé par la page précédente, ``None`` pour la première page.
+    """
+    keys = list(keys)
+    key_expr = _key_expression(keys)
+
+    if cursor is not None:
+        value = _cursor_value(keys, cursor)
+        query = query.filter(key_expr < value if descending else key_expr > value)
+
+    order = [k.desc() if descending else k.asc() for k in keys]
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    rows = query.order_by(*order).limit(page_size + 1).all()
+
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+
+    next_cursor = None
+    if items:
+        last = items[-1]
+        next_cursor = tuple(getattr(last, k.key) for k in keys)
+
+    return Page(items, next_cursor if has_more else None, has_more)
@@ -0,0 +1,42 @@
+"""
+Requêtes pré-configurées pour les vues
+Système de Gestion de Bibliothèque - IDSI
+
+Les tableaux affichent pour chaque ligne des relations (étudiant et livre
+d'un emprunt, auteurs d'un livre). Chargées paresseusement, elles coûtent
+un SELECT par ligne ; ces constructeurs les chargent d'avance pour qu'un
+écran exécute un nombre fixe de requêtes quel que soit le nombre de lignes.
+"""
+
+from sqlalchemy.orm import joinedload, selectinload
+from models.models import Livre, Emprunt, Recommandation
+
+
+def query_livres(db):
+    """Livres avec leurs auteurs (un SELECT ... IN groupé pour la page)"""
+    return db.query(Livre).options(selectinload(Livre.auteurs))
+
+
+def query_emprunts(db):
+    """Emprunts avec l'étudiant et le livre joints dans la même requête"""
+    return db.query(Emprunt).options(
+        joinedload(Emprunt.etudiant),
+        joinedload(Emprunt.livre)
+    )
+
+
+def query_emprunts_en_cours(db):
+    """Emprunts non retournés, avec l'étudiant et le livre"""
+    return query_emprunts(db).filter(Emprunt.date_retour_effective.is_(None))
+
+
+def query_recommandations(db, etudiant_id):
+    """Recommandations pré-calculées d'un étudiant, avec le livre et ses auteurs"""
+    return db.query(Recommandation).options(
+        joinedload(Recommandation.livre).selectinload(Livre.auteurs)
+    ).filter(Recommandation.etudiant_id == etudiant_id).order_by(Recommandation.rang)
+
+
+def query_emprunts_en_retard(db):
+    """Emprunts en cours en retard, du plus ancien au plus récent (filtre et tri en SQL)"""
+    return query_emprunts(db).filter(Emprunt.echeance_depassee()).order_by(Emprunt.date_retour_prevue)
@@ -0,0 +1,261 @@
+"""
+Recherche plein texte du catalogue (SQLite FTS5)
+Système de Gestion de Bibliothèque - IDSI
+
+Une table virtuelle ``livres_fts`` indexe le titre, la description, la
+catégorie, l'éditeur, l'ISBN et les noms des auteurs de chaque livre. Elle
+est tenue à jour par des triggers SQL sur ``livres``, ``livre_auteur`` et
+``auteurs``, ce qui couvre aussi les insertions faites hors de l'ORM.
+
+Le tokenizer ``unicode61`` avec ``remove_diacritics 2`` replie les accents
+(« securite » trouve « Sécurité ») et les résultats sont classés par BM25.
+"""
+
+import re
+import unicodedata
+from sqlalchemy import Table, Column, Integer, Float, Text, MetaData, select, text, tuple_
+from models.models import Livre
+from models.pagination import Page, PAGE_SIZE
+from models.queries import query_livres
+from utils.cache import CacheTTL
+
+FTS_TABLE = 'livres_fts'
+
+# Poids BM25 par colonne : titre, description, categorie, editeur, isbn, auteurs
+FTS_WEIGHTS = (10.0, 1.0, 3.0, 1.0, 5.0, 6.0)
+
+# Recherche instantanée : saisies mémorisées et durée de vie (s)
+TAILLE_CACHE_RECHERCHE = 32
+DUREE_CACHE_RECHERCHE = 30
+
+# Table virtuelle vue par SQLAlchemy (hors Base.metadata : create_all l'ignore)
+livres_fts = Table(
+    FTS_TABLE,
+    MetaData(),
+    Column('rowid', Integer, primary_key=True),
+    Column('rank', Float),
+    Column(FTS_TABLE, Text),
+)
+
+# Ré-indexer les livres désignés par {where} (sur l'alias l de livres)
+_REINDEX_SQL = f"""
+    DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT l.id FROM livres l WHERE {{where}});
+    INSERT INTO {FTS_TABLE}(rowid, titre, description, categorie, editeur, isbn, auteurs)
+    SELECT l.id, l.titre, l.description, l.categorie, l.editeur, l.isbn,
+           (SELECT group_concat(coalesce(a.prenom || ' ', '') || a.nom, ' ')
+              FROM auteurs a JOIN livre_auteur la ON la.auteur_id = a.id
+             WHERE la.livre_id = l.id)
+      FROM livres l WHERE {{where}};
+"""
+
+_TRIGGERS = {
+    'livres_fts_ai': (
+        "AFTER INSERT ON livres",
+        _REINDEX_SQL.format(where="l.id = NEW.id"),
+    ),
+    'livres_fts_au': (
+        "AFTER UPDATE OF titre, description, categorie, editeur, isbn ON livres",
+        _REINDEX_SQL.format(where="l.id = NEW.id"),
+    ),
+    'livres_fts_ad': (
+        "AFTER DELETE ON livres",
+        f"DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id;",
+    ),
+    'livre_auteur_fts_ai': (
+        "AFTER INSERT ON livre_auteur",
+        _REINDEX_SQL.format(where="l.id = NEW.livre_id"),
+    ),
+    'livre_auteur_fts_ad': (
+        "AFTER DELETE ON livre_auteur",
+        _REINDEX_SQL.format(where="l.id = OLD.livre_id"),
+    ),
+    'auteurs_fts_au': (
+        "AFTER UPDATE OF nom, prenom ON auteurs",
+        _REINDEX_SQL.format(
+            where="l.id IN (SELECT livre_id FROM livre_auteur WHERE auteur_id = NEW.id)"
+        ),
+    ),
+}
+
+
+def install_fts(engine):
+    """Créer la table FTS5 et ses triggers (idempotent)"""
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+
+        conn.exec_driver_sql(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                titre, description, categorie, editeur, isbn, auteurs,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        """)
+
+        for name, (event, body) in _TRIGGERS.items():
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END"
+            )
+
+        if not exists:
+            weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+            conn.exec_driver_sql(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25({weights})')"
+            )
+            # Indexer le catalogue existant
+            _reindexer_tout(conn)
+
+
+def _reindexer_tout(conn):
+    for statement in _REINDEX_SQL.format(where="1").split(';'):
+        if statement.strip():
+            conn.exec_driver_sql(statement)
+
+
+def suspendre_fts(engine):
+    """
+    Retirer les triggers FTS avant un import en masse : chaque ligne insérée
+    dans ``livres`` puis dans ``livre_auteur`` ré-indexerait son livre. Le
+    catalogue n'est plus tenu à jour jusqu'à ``reconstruire_fts``.
+    """
+    with engine.begin() as conn:
+        for name in _TRIGGERS:
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def reconstruire_fts(engine):
+    """Ré-indexer tout le catalogue en une passe et réinstaller les triggers"""
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DELETE FROM {FTS_TABLE}")
+        _reindexer_tout(conn)
+    install_fts(engine)
+
+
+def build_match_expression(terme):
+    """
+    Traduire une saisie libre en requête FTS5 : chaque mot devient un
+    préfixe (``"mach"*``) et tous les mots doivent être présents.
+    """
+    mots = re.findall(r'\w+', terme or '')
+    if not mots:
+        return None
+    return " ".join(f'"{mot}"*' for mot in mots)
+
+
+def rechercher_livres(db, terme, cursor=None, page_size=PAGE_SIZE):
+    """
+    Rechercher des livres par pertinence (BM25), une page à la fois.
+
+    Le curseur est le couple (score, id) de la dernière ligne renvoyée.
+    """
+    expression = build_match_expression(terme)
+    if expression is None:
+        return Page([], None, False)
+
+    matches = select(
+        livres_fts.c.rowid.label('livre_id'),
+        livres_fts.c.rank.label('score')
+    ).where(livres_fts.c[FTS_TABLE].match(expression)).subquery()
+
+    query = query_livres(db).add_columns(matches.c.score).join(
+        matches, Livre.id == matches.c.livre_id
+    )
+
+    if cursor is not None:
+        query = query.filter(tuple_(matches.c.score, Livre.id) > tuple(cursor))
+
+    # BM25 : plus le score est bas, plus le livre est pertinent
+    rows = query.order_by(matches.c.score, Livre.id).limit(page_size + 1).all()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    next_cursor = None
+    if has_more:
+        livre, score = rows[-1]
+        next_cursor = (score, livre.id)
+
+    return Page([livre for livre, _ in rows], next_cursor, has_more)
+
+
+def mots_recherche(texte):
+    """Mots d'un texte tels que les voit le tokenizer : minuscules, sans accents"""
+    if not texte:
+        return ()
+    texte = unicodedata.normalize('NFKD', texte.lower())
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    return tuple(re.findall(r'\w+', texte))
+
+
+def mots_livre(livre):
+    """Mots des colonnes indexées d'un livre (pour filtrer sans requête)"""
+    auteurs = " ".join(a.nom_complet for a in livre.auteurs) if livre.auteurs else ""
+    return mots_recherche(" ".join(filter(None, (
+        livre.titre, livre.description, livre.categorie, livre.editeur, livre.isbn, auteurs
+    ))))
+
+
+def correspond(mots_document, mots):
+    """Même règle que build_match_expression : chaque mot est un préfixe présent"""
+    return all(any(m.startswith(mot) for m in mots_document) for mot in mots)
+
+
+def affine(mots_avant, mots):
+    """
+    Vrai si la recherche ``mots`` ne peut trouver qu'un sous-ensemble des
+    résultats de ``mots_avant`` (ex. « mach » après « ma », « ma inf »
+    après « ma ») : chaque mot d'avant est le préfixe d'un mot de la saisie.
+    """
+    return correspond(mots, mots_avant)
+
+
+class CacheRecherche:
+    """
+    Premières pages de la recherche instantanée, par saisie
+
+    Chaque entrée garde, pour chaque ligne, les mots du livre (``mots_livre``)
+    et la valeur affichée. Une saisie déjà vue est resservie telle quelle ;
+    une saisie qui affine une saisie dont le résultat était complet (pas de
+    page suivante) est obtenue en filtrant ce résultat, sans requête. L'ordre
+    est alors celui de la saisie d'origine, et non un nouveau classement BM25.
+    """
+
+    def __init__(self, taille=TAILLE_CACHE_RECHERCHE, ttl=DUREE_CACHE_RECHERCHE):
+        self.taille = taille
+        self._cache = CacheTTL(ttl)
+        self._saisies = []
+
+    def get(self, terme):
+        """(lignes, curseur, has_more) pour ``terme``, ou None s'il faut interroger la base"""
+        mots = mots_recherche(terme)
+        entree = self._cache.get(mots)
+        if entree is not None:
+            return entree
+
+        # Le résultat complet le plus précis que cette saisie affine
+        for avant in sorted(self._saisies, key=len, reverse=True):
+            if not affine(avant, mots):
+                continue
+            entree = self._cache.get(avant)
+            if entree is None or entree[2]:
+                continue
+            lignes = [(m, valeur) for m, valeur in entree[0] if correspond(m, mots)]
+            return lignes, None, False
+        return None
+
+    def set(self, terme, lignes, cursor, has_more):
+        """Mémoriser la première page de ``terme`` : ``lignes`` = [(mots, valeur)]"""
+        mots = mots_recherche(terme)
+        if mots in self._saisies:
+            self._saisies.remove(mots)
+        self._saisies.append(mots)
+        if len(self._saisies) > self.taille:
+            self._cache.invalider(self._saisies.pop(0))
+        self._cache.set(mots, (lignes, cursor, has_more))
+
+    def invalider(self):
+        """Oublier toutes les saisies (après une modification du catalogue)"""
+        self._saisies = []
+        self._cache.invalider()
@@ -0,0 +1,4 @@
+"""
+Services package - IDSI Library
+"""
+# Les imports sont effectués directement dans les modules qui en ont besoin
@@ -0,0 +1,185 @@
+"""
+Circulation au scanner (douchette code-barres)
+Système de Gestion de Bibliothèque - IDSI
+
+Une douchette USB se comporte comme un clavier : elle « tape » le code lu
+puis Entrée. Chaque code est résolu par une recherche sur index :
+
+- un ISBN (10 ou 13 caractères une fois les tirets retirés) par l'index
+  ``ix_livres_isbn_code`` sur l'ISBN sans tirets : la douchette lit
+  l'EAN-13 brut alors que la base conserve les tirets ;
+- sinon un matricule, par l'index unique de ``etudiants.matricule``
+  (l'autre recherche sert de repli si la première ne trouve rien).
+
+Un ``Guichet`` retient la dernière carte d'étudiant scannée : les livres
+scannés ensuite sont empruntés par cet étudiant, ou rendus par lui. Les
+scans d'un guichet doivent être traités dans l'ordre, par un seul thread
+(``DatabaseWorker`` à un thread).
+"""
+
+import re
+
+from models.models import Livre, Etudiant, Emprunt, isbn_sans_tirets, normaliser_isbn
+from services.emprunts import emprunter_livre, retourner_emprunts, compter_emprunts_en_cours, EmpruntRefuse
+
+MOTIF_ISBN = re.compile(r'\d{9}[\dX]|\d{13}')
+
+
+def est_isbn(code):
+    """Vrai si le code a la forme d'un ISBN-10 ou ISBN-13 (tirets permis)"""
+    return MOTIF_ISBN.fullmatch(normaliser_isbn(code)) is not None
+
+
+def trouver_livre(db, code):
+    """Livre d'ISBN ``code`` : ``(id, titre, quantite_disponible)`` ou None"""
+    return db.query(Livre.id, Livre.titre, Livre.quantite_disponible).filter(
+        isbn_sans_tirets(Livre.isbn) == normaliser_isbn(code)
+    ).first()
+
+
+def trouver_etudiant(db, matricule):
+    """Étudiant de matricule ``matricule`` : ``(id, matricule, prenom, nom, actif)`` ou None"""
+    return db.query(Etudiant.id, Etudiant.matricule, Etudiant.prenom, Etudiant.nom, Etudiant.actif).filter(
+        Etudiant.matricule == matricule
+    ).first()
+
+
+class ResultatScan:
+    """
+    Résultat d'un scan, en données simples (affichable depuis le thread Tk)
+    
+    ``statut`` : 'etudiant' (carte lue), 'emprunt', 'retour', 'attente'
+    (il manque la carte de l'étudiant), 'refus' ou 'inconnu'. ``details``
+    porte les valeurs utiles à la vue (ids, titre, dates...).
+    """
+    
+    def __init__(self, statut, message, **details):
+        self.statut = statut
+        self.message = message
+        self.details = details
+    
+    @property
+    def succes(self):
+        return self.statut in ('etudiant', 'emprunt', 'retour')
+
+
+class Guichet:
+    """
+    État d'un poste de prêt piloté au scanner
+    
+    ``etudiant_fixe`` réserve le guichet à un étudiant (emprunt en libre
+    service depuis son propre tableau de bord) : les autres cartes sont
+    refusées.
+    """
+    
+    def __init__(self, etudiant_fixe=None):
+        self.etudiant_fixe = etudiant_fixe
+        self.etudiant = None  # (id, matricule, nom complet)
+        if etudiant_fixe is not None:
+            self.etudiant = (etudiant_fixe.id, etudiant_fixe.matricule, etudiant_fixe.nom_complet)
+    
+    def _identifier(self, db, code):
+        """
+        ('livre', ligne), ('etudiant', ligne) ou (None, None). La forme du
+        code choisit la première recherche ; l'autre ne sert qu'en repli
+        (ISBN mal formés de la base, matricules tout en chiffres).
+        """
+        recherches = [('livre', trouver_livre), ('etudiant', trouver_etudiant)]
+        if not est_isbn(code):
+            recherches.reverse()
+        for nature, trouver in recherches:
+            ligne = trouver(db, code)
+            if ligne is not None:
+                return nature, ligne
+        return None, None
+    
+    def _carte(self, db, etudiant):
+        """Retenir l'étudiant dont la carte vient d'être scannée"""
+        if self.etudiant_fixe is not None and etudiant.id != self.etudiant_fixe.id:
+            return ResultatScan('refus', "Cette carte n'est pas la vôtre.")
+        if not etudiant.actif:
+            return ResultatScan('refus', f"Le compte de {etudiant.matricule} est désactivé.")
+        
+        self.etudiant = (etudiant.id, etudiant.matricule, f"{etudiant.prenom} {etudiant.nom}")
+        en_cours = compter_emprunts_en_cours(db, etudiant.id)
+        return ResultatScan(
+            'etudiant',
+            f"{self.etudiant[2]} ({etudiant.matricule}) : {en_cours} emprunt(s) en cours",
+            etudiant_id=etudiant.id
+        )
+    
+    def scanner_emprunt(self, db, code):
+        """Carte : changer d'étudiant ; ISBN : l'emprunter pour l'étudiant courant"""
+        nature, ligne = self._identifier(db, code)
+        if nature is None:
+            return ResultatScan('inconnu', f"Code inconnu : {code}")
+        if nature == 'etudiant':
+            return self._carte(db, ligne)
+        if self.etudiant is None:
+            return ResultatScan('attente', "Scannez d'abord la carte de l'étudiant.")
+        
+        etudiant_id, matricule, nom = self.etudiant
+        try:
+            emprunt = emprunter_livre(db, etudiant_id, ligne.id)
+        except EmpruntRefuse as e:
+            return ResultatScan('refus', f"« {ligne.titre} » : {e}", livre_id=ligne.id, raison=e.raison)
+        
+        stock = db.query(Livre.quantite_disponible).filter(Livre.id == ligne.id).scalar()
+        return ResultatScan(
+            'emprunt',
+            f"« {ligne.titre} » emprunté par {nom}, à rendre le "
+            f"{emprunt.date_retour_prevue.strftime('%d/%m/%Y')}",
+            emprunt_id=emprunt.id,
+            livre_id=ligne.id,
+            titre=ligne.titre,
+            matricule=matricule,
+            date_emprunt=emprunt.date_emprunt,
+            date_retour_prevue=emprunt.date_retour_prevue,
+            stock=stock
+        )
+    
+    def scanner_retour(self, db, code):
+        """
+        Carte : changer d'étudiant ; ISBN : rendre l'emprunt en cours de ce
+        livre (celui de l'étudiant courant si une carte a été scannée).
+        """
+        nature, ligne = self._identifier(db, code)
+        if nature is None:
+            return ResultatScan('inconnu', f"Code inconnu : {code}")
+        if nature == 'etudiant':
+            return self._carte(db, ligne)
+        
+        # Emprunts ouverts du livre : index partiel ix_emprunts_ouverts_livre
+        query = db.query(Emprunt.id).filter(
+            Emprunt.livre_id == ligne.id,
+            Emprunt.date_retour_effective.is_(None)
+        )
+        pour = ""
+        if self.etudiant is not None:
+            query = query.filter(Emprunt.etudiant_id == self.etudiant[0])
+            pour = f" pour {self.etudiant[2]}"
+        ouverts = [emprunt_id for emprunt_id, in query.order_by(Emprunt.date_emprunt, Emprunt.id).limit(2)]
+        
+        if not ouverts:
+            return ResultatScan('inconnu', f"« {ligne.titre} » : aucun emprunt en cours{pour}.")
+        if len(ouverts) > 1 and self.etudiant is None:
+            return ResultatScan(
+                'attente',
+                f"« {ligne.titre} » est emprunté par plusieurs étudiants : scannez la carte de l'emprunteur."
+            )
+        
+        # Plusieurs exemplaires chez le même étudiant : le plus ancien d'abord
+        emprunt_id = ouverts[0]
+        penalites = retourner_emprunts(db, [emprunt_id])
+        if emprunt_id not in penalites:
+            return ResultatScan('inconnu', f"« {ligne.titre} » : déjà retourné entre-temps.", emprunt_id=emprunt_id)
+        
+        message = f"« {ligne.titre} » retourné"
+        if penalites[emprunt_id] > 0:
+            message += f", pénalité {penalites[emprunt_id]:,.0f} FCFA"
+        return ResultatScan(
+            'retour', message,
+            emprunt_id=emprunt_id,
+            livre_id=ligne.id,
+            penalite=penalites[emprunt_id]
+        )
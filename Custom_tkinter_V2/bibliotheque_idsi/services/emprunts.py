@@ -0,0 +1,219 @@
+"""
+Service d'emprunt des livres
+Système de Gestion de Bibliothèque - IDSI
+
+Un emprunt est une seule transaction qui commence par écrire :
+
+1. ``UPDATE livres SET quantite_disponible = quantite_disponible - 1
+   WHERE id = :livre AND quantite_disponible > 0`` : le test du stock et
+   la décrémentation sont une seule instruction, deux postes ne peuvent
+   plus prêter le même dernier exemplaire ;
+2. cette écriture prend le verrou d'écriture de SQLite : le nombre
+   d'emprunts en cours de l'étudiant, compté ensuite, ne peut plus changer
+   avant la validation, et la limite ``max_loans_per_student`` est sûre ;
+3. l'emprunt est inséré par l'ORM (compteurs de popularité, statistiques
+   journalières et recommandations restent tenus à jour par les listeners).
+
+Un refus annule la transaction et lève ``EmpruntRefuse``. Une base occupée
+(SQLITE_BUSY, « database is locked ») au-delà du ``busy_timeout`` est
+retentée avec un délai exponentiel.
+
+Les opérations en lot (``emprunter_livres``, ``retourner_emprunts``)
+traitent N livres ou N emprunts dans une seule transaction, avec une seule
+UPDATE par table au lieu d'un aller-retour ORM par ligne.
+"""
+
+import random
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import update, func, case, cast, Integer
+from sqlalchemy.exc import OperationalError
+
+from models.models import Livre, Emprunt, StatistiqueJournaliere
+from services.statistiques import invalider_statistiques
+from utils.theme import APP_CONFIG
+
+# Reprises sur SQLITE_BUSY : nombre de tentatives et premier délai (s)
+TENTATIVES_MAX = 5
+DELAI_REPRISE = 0.05
+
+
+class EmpruntRefuse(Exception):
+    """Emprunt refusé par une règle de gestion (message affichable)"""
+    
+    def __init__(self, message, raison):
+        super().__init__(message)
+        self.raison = raison  # 'indisponible' ou 'limite'
+
+
+def base_occupee(erreur):
+    """Vrai si l'erreur SQLAlchemy est un verrou SQLite (SQLITE_BUSY / LOCKED)"""
+    message = str(getattr(erreur, 'orig', erreur)).lower()
+    return isinstance(erreur, OperationalError) and ('locked' in message or 'busy' in message)
+
+
+def avec_reprise(db, operation, tentatives=TENTATIVES_MAX, delai=DELAI_REPRISE):
+    """
+    Exécuter ``operation(db)`` (qui valide elle-même sa transaction) en la
+    retentant si la base est occupée. Le délai double à chaque tentative,
+    avec une part aléatoire pour que les postes en conflit se décalent.
+    """
+    for tentative in range(tentatives):
+        try:
+            return operation(db)
+        except OperationalError as e:
+            db.rollback()
+            if not base_occupee(e) or tentative == tentatives - 1:
+                raise
+            time.sleep(delai * (2 ** tentative) * (0.5 + random.random()))
+
+
+def compter_emprunts_en_cours(db, etudiant_id):
+    """Emprunts non retournés de l'étudiant (index partiel des emprunts ouverts)"""
+    return db.query(func.count(Emprunt.id)).filter(
+        Emprunt.etudiant_id == etudiant_id,
+        Emprunt.date_retour_effective.is_(None)
+    ).scalar()
+
+
+def _emprunter(db, etudiant_id, livre_id, max_emprunts):
+    # 1. Décrément conditionnel : aucune ligne modifiée = plus d'exemplaire
+    resultat = db.execute(
+        update(Livre)
+        .where(Livre.id == livre_id, Livre.quantite_disponible > 0)
+        .values(quantite_disponible=Livre.quantite_disponible - 1)
+        .execution_options(synchronize_session=False)
+    )
+    if resultat.rowcount != 1:
+        db.rollback()
+        raise EmpruntRefuse("Ce livre n'est pas disponible.", 'indisponible')
+    
+    # 2. Limite d'emprunts, sous le verrou d'écriture pris par l'UPDATE
+    if compter_emprunts_en_cours(db, etudiant_id) >= max_emprunts:
+        db.rollback()
+        raise EmpruntRefuse(
+            f"Vous avez atteint le nombre maximum d'emprunts ({max_emprunts}).",
+            'limite'
+        )
+    
+    # 3. L'emprunt lui-même
+    emprunt = Emprunt(etudiant_id=etudiant_id, livre_id=livre_id)
+    db.add(emprunt)
+    db.commit()
+    return emprunt
+
+
+def emprunter_livre(db, etudiant_id, livre_id, max_emprunts=None):
+    """
+    Enregistrer l'emprunt du livre ``livre_id`` par l'étudiant, de façon
+    atomique. Valide la transaction et retourne l'``Emprunt`` créé ; lève
+    ``EmpruntRefuse`` si le livre n'est plus disponible ou si l'étudiant a
+    atteint sa limite d'emprunts.
+    """
+    if max_emprunts is None:
+        max_emprunts = APP_CONFIG['max_loans_per_student']
+    return avec_reprise(db, lambda s: _emprunter(s, etudiant_id, livre_id, max_emprunts))
+
+
+def _emprunter_lot(db, etudiant_id, livre_ids, max_emprunts):
+    # 1. Décrément conditionnel de tous les livres demandés en une instruction
+    stocks = dict(db.execute(
+        update(Livre)
+        .where(Livre.id.in_(livre_ids), Livre.quantite_disponible > 0)
+        .values(quantite_disponible=Livre.quantite_disponible - 1)
+        .returning(Livre.id, Livre.quantite_disponible)
+        .execution_options(synchronize_session=False)
+    ).all())
+    if not stocks:
+        db.rollback()
+        raise EmpruntRefuse("Aucun de ces livres n'est disponible.", 'indisponible')
+    
+    # 2. Limite d'emprunts pour tout le lot, sous le verrou d'écriture
+    en_cours = compter_emprunts_en_cours(db, etudiant_id)
+    if en_cours + len(stocks) > max_emprunts:
+        db.rollback()
+        raise EmpruntRefuse(
+            f"Ces {len(stocks)} emprunts dépasseraient le maximum autorisé "
+            f"({max_emprunts}, dont {en_cours} en cours).",
+            'limite'
+        )
+    
+    # 3. Les emprunts, insérés par l'ORM (listeners) en un seul flush
+    emprunts = [
+        Emprunt(etudiant_id=etudiant_id, livre_id=livre_id)
+        for livre_id in livre_ids if livre_id in stocks
+    ]
+    db.add_all(emprunts)
+    db.commit()
+    
+    indisponibles = [livre_id for livre_id in livre_ids if livre_id not in stocks]
+    return emprunts, indisponibles, stocks
+
+
+def emprunter_livres(db, etudiant_id, livre_ids, max_emprunts=None):
+    """
+    Emprunter plusieurs livres pour un étudiant dans une seule transaction.
+    
+    Les livres sans exemplaire disponible sont écartés ; le lot entier est
+    refusé (``EmpruntRefuse``) s'il ferait dépasser la limite d'emprunts.
+    Retourne ``(emprunts, indisponibles, stocks)`` : les ``Emprunt`` créés,
+    les ids des livres écartés et le nouveau stock de chaque livre emprunté.
+    """
+    if max_emprunts is None:
+        max_emprunts = APP_CONFIG['max_loans_per_student']
+    livre_ids = list(dict.fromkeys(livre_ids))
+    return avec_reprise(db, lambda s: _emprunter_lot(s, etudiant_id, livre_ids, max_emprunts))
+
+
+def _retourner_lot(db, emprunt_ids, date):
+    # 1. Dates de retour, statuts et pénalités : une UPDATE sur les emprunts ouverts
+    jours_retard = func.max(
+        cast(func.julianday(date) - func.julianday(Emprunt.date_retour_prevue), Integer), 0
+    )
+    retours = db.execute(
+        update(Emprunt)
+        .where(Emprunt.id.in_(emprunt_ids), Emprunt.date_retour_effective.is_(None))
+        .values(
+            date_retour_effective=date,
+            statut='retourne',
+            penalite=jours_retard * Emprunt.PENALITE_PAR_JOUR
+        )
+        .returning(Emprunt.id, Emprunt.livre_id, Emprunt.penalite)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not retours:
+        db.rollback()
+        return {}
+    
+    # 2. Stock : une UPDATE, chaque livre augmenté de son nombre de retours
+    par_livre = Counter(livre_id for _, livre_id, _ in retours)
+    db.execute(
+        update(Livre)
+        .where(Livre.id.in_(par_livre))
+        .values(quantite_disponible=Livre.quantite_disponible + case(par_livre, value=Livre.id, else_=0))
+        .execution_options(synchronize_session=False)
+    )
+    
+    # 3. Statistiques du jour (l'écouteur ORM des retours ne voit pas ces UPDATE)
+    StatistiqueJournaliere.ajouter_retours(db.connection(), date.date(), [r.id for r in retours])
+    db.commit()
+    invalider_statistiques()
+    
+    return {emprunt_id: penalite for emprunt_id, _, penalite in retours}
+
+
+def retourner_emprunts(db, emprunt_ids, date=None):
+    """
+    Enregistrer le retour de plusieurs emprunts dans une seule transaction.
+    
+    Les emprunts déjà retournés (ex. par un autre poste) sont ignorés.
+    Retourne ``{emprunt_id: pénalité}`` pour les emprunts effectivement
+    retournés.
+    """
+    emprunt_ids = list(dict.fromkeys(emprunt_ids))
+    if not emprunt_ids:
+        return {}
+    date = date or datetime.now()
+    return avec_reprise(db, lambda s: _retourner_lot(s, emprunt_ids, date))
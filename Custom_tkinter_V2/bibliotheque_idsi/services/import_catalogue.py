@@ -0,0 +1,437 @@
+"""
+Import en masse du catalogue (CSV, JSON lines, MARC21)
+Système de Gestion de Bibliothèque - IDSI
+
+Le fichier est lu en flux et traité par lots de ``TAILLE_LOT`` notices, une
+transaction par lot, en SQL Core (``executemany``) plutôt qu'objet par
+objet dans l'ORM :
+
+1. les ISBN du lot sont cherchés en une requête par l'index
+   ``ix_livres_isbn_code`` (ISBN sans tirets) : un livre déjà présent est
+   mis à jour, les autres sont insérés (upsert par ISBN) ;
+2. les auteurs sont dédoublonnés par un dictionnaire nom -> id chargé une
+   fois au départ : seuls les auteurs inconnus sont insérés ;
+3. les liens livre-auteur du lot sont insérés en une instruction.
+
+Les triggers FTS sont retirés pendant l'import et le catalogue est
+ré-indexé en une passe à la fin. Ces écritures ne passent pas par l'ORM :
+le cache des statistiques est vidé explicitement, et les caches de
+recherche des tableaux de bord ouverts expirent d'eux-mêmes.
+
+Les notices sans ISBN ou sans titre sont ignorées : sans clé, un nouvel
+import les dupliquerait.
+
+Les ids des livres et auteurs insérés sont relus par ``INSERT ... RETURNING``
+dans l'ordre des paramètres : SQLite 3.35+ et SQLAlchemy 2.0.10+.
+"""
+
+import csv
+import json
+import os
+import re
+import time
+from itertools import islice
+
+from sqlalchemy import select, insert, update, bindparam, func
+
+from models.database import verifier_version_sqlite
+from models.models import Livre, Auteur, livre_auteur, isbn_sans_tirets, normaliser_isbn
+from models.search import suspendre_fts, reconstruire_fts
+from services.statistiques import invalider_statistiques
+
+# Notices par transaction
+TAILLE_LOT = 5000
+
+# Colonnes d'un livre renseignées par une notice (mises à jour si présentes)
+COLONNES_LIVRE = (
+    'titre', 'categorie', 'editeur', 'annee_publication', 'langue', 'nombre_pages', 'description'
+)
+
+# En-têtes CSV / clés JSON acceptés pour chaque champ
+ALIAS_CHAMPS = {
+    'isbn': ('isbn', 'isbn13', 'isbn_13', 'isbn10', 'isbn_10'),
+    'titre': ('titre', 'title'),
+    'auteurs': ('auteurs', 'auteur', 'authors', 'author'),
+    'categorie': ('categorie', 'catégorie', 'category', 'sujet', 'subject'),
+    'editeur': ('editeur', 'éditeur', 'publisher'),
+    'annee_publication': ('annee_publication', 'annee', 'année', 'year', 'publication_year'),
+    'langue': ('langue', 'language'),
+    'nombre_pages': ('nombre_pages', 'pages', 'num_pages'),
+    'description': ('description', 'resume', 'résumé', 'summary'),
+    'quantite': ('quantite', 'quantité', 'exemplaires', 'copies', 'quantity'),
+}
+_CHAMP_PAR_ALIAS = {alias: champ for champ, alias_ in ALIAS_CHAMPS.items() for alias in alias_}
+
+# Extensions reconnues
+FORMATS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.json': 'jsonl',
+    '.mrc': 'marc',
+    '.marc': 'marc',
+}
+
+# Codes de langue MARC (008/35-37) les plus courants
+LANGUES_MARC = {
+    'fre': 'Français',
+    'eng': 'Anglais',
+    'spa': 'Espagnol',
+    'ger': 'Allemand',
+    'ita': 'Italien',
+    'por': 'Portugais',
+    'ara': 'Arabe',
+}
+
+_LANGUE_DEFAUT = Livre.__table__.c.langue.default.arg
+
+
+# ============================================
+# NOTICES
+# ============================================
+
+def separer_nom(auteur):
+    """
+    ``(prenom, nom)`` d'un nom d'auteur : « Nom, Prénom » (forme des
+    catalogues) ou « Prénom Nom » (comme la saisie d'un livre).
+    """
+    auteur = auteur.strip().rstrip('.,;')
+    if ',' in auteur:
+        nom, prenom = (partie.strip() for partie in auteur.split(',', 1))
+    elif ' ' in auteur:
+        prenom, nom = auteur.split(' ', 1)
+    else:
+        prenom, nom = '', auteur
+    return prenom, nom.strip()
+
+
+def _entier(valeur):
+    """Premier nombre d'une valeur (« 2019 », « c2019. », « 350 p. »), sinon None"""
+    if isinstance(valeur, int):
+        return valeur
+    nombre = re.search(r'\d+', str(valeur or ''))
+    return int(nombre.group()) if nombre else None
+
+
+def normaliser_notice(brute):
+    """
+    Notice du format commun à partir d'un dict (ligne CSV ou objet JSON) ;
+    les clés reconnues sont listées dans ``ALIAS_CHAMPS``.
+    """
+    notice = {}
+    for cle, valeur in brute.items():
+        champ = _CHAMP_PAR_ALIAS.get(str(cle).strip().lower())
+        if champ is None:
+            continue
+        if isinstance(valeur, str):
+            valeur = valeur.strip()
+        if valeur not in (None, '', []):
+            notice[champ] = valeur
+    
+    isbn = re.match(r'[\dXx-]+', str(notice.get('isbn', '')))
+    notice['isbn'] = isbn.group() if isbn else None
+    
+    auteurs = notice.get('auteurs') or []
+    if isinstance(auteurs, str):
+        auteurs = re.split(r'[;|]', auteurs)
+    notice['auteurs'] = [a.strip() for a in auteurs if a and a.strip()]
+    
+    for champ in ('annee_publication', 'nombre_pages', 'quantite'):
+        if champ in notice:
+            notice[champ] = _entier(notice[champ])
+    return notice
+
+
+def lire_csv(chemin):
+    """Notices d'un fichier CSV (séparateur , ; ou tabulation détecté)"""
+    with open(chemin, encoding='utf-8-sig', newline='') as fichier:
+        try:
+            dialecte = csv.Sniffer().sniff(fichier.read(65536), delimiters=',;\t')
+        except csv.Error:
+            dialecte = csv.excel
+        fichier.seek(0)
+        for ligne in csv.DictReader(fichier, dialect=dialecte):
+            yield normaliser_notice(ligne)
+
+
+def lire_jsonl(chemin):
+    """Notices d'un fichier JSON lines (un objet par ligne) ; None si ligne illisible"""
+    with open(chemin, encoding='utf-8') as fichier:
+        for ligne in fichier:
+            if not ligne.strip():
+                continue
+            try:
+                objet = json.loads(ligne)
+            except ValueError:
+                yield None
+                continue
+            yield normaliser_notice(objet) if isinstance(objet, dict) else None
+
+
+# Séparateurs ISO 2709
+FIN_NOTICE = b'\x1d'
+FIN_ZONE = b'\x1e'
+SOUS_ZONE = '\x1f'
+
+
+def _notices_iso2709(fichier, taille_bloc=1 << 20):
+    """Notices MARC brutes, lues par blocs sans charger le fichier"""
+    reste = b''
+    while True:
+        bloc = fichier.read(taille_bloc)
+        if not bloc:
+            break
+        *notices, reste = (reste + bloc).split(FIN_NOTICE)
+        yield from notices
+    if reste.strip():
+        yield reste
+
+
+def _zones_marc(notice):
+    """``{étiquette: [contenu, ...]}`` d'une notice MARC21 (ISO 2709)"""
+    base = int(notice[12:17])
+    # Position 9 du guide : 'a' = UTF-8, sinon MARC-8 (lu en latin-1)
+    encodage = 'utf-8' if notice[9:10] == b'a' else 'latin-1'
+    repertoire = notice[24:base - 1]
+    
+    zones = {}
+    for i in range(0, len(repertoire) // 12 * 12, 12):
+        etiquette = repertoire[i:i + 3].decode('ascii')
+        longueur = int(repertoire[i + 3:i + 7])
+        debut = base + int(repertoire[i + 7:i + 12])
+        contenu = notice[debut:debut + longueur].rstrip(FIN_ZONE)
+        zones.setdefault(etiquette, []).append(contenu.decode(encodage, errors='replace'))
+    return zones
+
+
+def _sous_zone(zones, etiquettes, code):
+    """Première sous-zone ``code`` des zones ``etiquettes`` (ex. '260', '264')"""
+    for etiquette in etiquettes:
+        for zone in zones.get(etiquette, ()):
+            for partie in zone.split(SOUS_ZONE)[1:]:
+                if partie[:1] == code and partie[1:].strip():
+                    return partie[1:].strip()
+    return None
+
+
+def _ponctuation(valeur):
+    """Retirer la ponctuation ISBD de fin de sous-zone (« Titre / », « Paris : »)"""
+    return valeur.rstrip(' /:;,.=') if valeur else valeur
+
+
+def notice_marc(notice):
+    """Notice du format commun à partir d'une notice MARC21 brute"""
+    zones = _zones_marc(notice)
+    
+    titre = _ponctuation(_sous_zone(zones, ('245',), 'a'))
+    sous_titre = _ponctuation(_sous_zone(zones, ('245',), 'b'))
+    if titre and sous_titre:
+        titre = f"{titre} : {sous_titre}"
+    
+    auteurs = []
+    for etiquette in ('100', '700'):
+        for zone in zones.get(etiquette, ()):
+            for partie in zone.split(SOUS_ZONE)[1:]:
+                if partie[:1] == 'a':
+                    auteurs.append(_ponctuation(partie[1:].strip()))
+    
+    controle = (zones.get('008') or [''])[0]
+    langue = LANGUES_MARC.get(controle[35:38], controle[35:38].strip() or None)
+    
+    return normaliser_notice({
+        'isbn': _sous_zone(zones, ('020',), 'a'),
+        'titre': titre,
+        'auteurs': auteurs,
+        'categorie': _ponctuation(_sous_zone(zones, ('650',), 'a')),
+        'editeur': _ponctuation(_sous_zone(zones, ('260', '264'), 'b')),
+        'annee_publication': _sous_zone(zones, ('260', '264'), 'c') or controle[7:11],
+        'langue': langue,
+        'nombre_pages': _sous_zone(zones, ('300',), 'a'),
+        'description': _sous_zone(zones, ('520',), 'a'),
+    })
+
+
+def lire_marc(chemin):
+    """Notices d'un fichier MARC21 (ISO 2709) ; None si notice illisible"""
+    with open(chemin, 'rb') as fichier:
+        for brute in _notices_iso2709(fichier):
+            brute = brute.lstrip(b'\r\n')
+            if not brute:
+                continue
+            try:
+                yield notice_marc(brute)
+            except (ValueError, IndexError):
+                yield None
+
+
+LECTEURS = {
+    'csv': lire_csv,
+    'jsonl': lire_jsonl,
+    'marc': lire_marc,
+}
+
+
+def lire_notices(chemin, format=None):
+    """Notices du fichier ``chemin`` ; le format est déduit de l'extension par défaut"""
+    if format is None:
+        format = FORMATS.get(os.path.splitext(chemin)[1].lower())
+    if format not in LECTEURS:
+        raise ValueError(f"Format non reconnu pour {chemin} (csv, jsonl ou marc)")
+    return LECTEURS[format](chemin)
+
+
+# ============================================
+# IMPORT
+# ============================================
+
+class RapportImport:
+    """Compteurs d'un import ; ``debit`` en notices lues par seconde"""
+    
+    def __init__(self):
+        self.lues = 0
+        self.inserees = 0
+        self.mises_a_jour = 0
+        self.ignorees = 0
+        self.auteurs = 0
+        self.debut = time.perf_counter()
+        self.duree = 0.0
+    
+    @property
+    def debit(self):
+        return self.lues / self.duree if self.duree else 0.0
+    
+    def chronometrer(self):
+        self.duree = time.perf_counter() - self.debut
+
+
+def charger_auteurs(conn):
+    """Dictionnaire ``(prenom, nom) -> id`` de tous les auteurs (une requête)"""
+    return {
+        (prenom or '', nom): auteur_id
+        for auteur_id, prenom, nom in conn.execute(select(Auteur.id, Auteur.prenom, Auteur.nom))
+    }
+
+
+def par_lots(iterable, taille):
+    """Listes successives de ``taille`` éléments au plus"""
+    iterateur = iter(iterable)
+    while lot := list(islice(iterateur, taille)):
+        yield lot
+
+
+def _importer_lot(conn, lot, auteurs, quantite_defaut, rapport):
+    """Importer un lot dans la transaction ``conn`` ; retourne les auteurs créés"""
+    # Dernière notice par ISBN ; sans ISBN ou sans titre : ignorée
+    par_isbn = {}
+    for notice in lot:
+        if notice and notice.get('isbn') and notice.get('titre'):
+            par_isbn[normaliser_isbn(notice['isbn'])] = notice
+    rapport.lues += len(lot)
+    rapport.ignorees += len(lot) - len(par_isbn)
+    if not par_isbn:
+        return {}
+    
+    # 1. Livres déjà au catalogue : une requête sur l'index de l'ISBN sans tirets
+    existants = dict(conn.execute(
+        select(isbn_sans_tirets(Livre.isbn), Livre.id)
+        .where(isbn_sans_tirets(Livre.isbn).in_(list(par_isbn)))
+    ).all())
+    
+    # 2. Auteurs inconnus du dictionnaire
+    nouveaux_auteurs = {}
+    for notice in par_isbn.values():
+        for nom in notice['auteurs']:
+            cle = separer_nom(nom)
+            if cle[1] and cle not in auteurs:
+                nouveaux_auteurs[cle] = None
+    if nouveaux_auteurs:
+        ids = conn.execute(
+            insert(Auteur).returning(Auteur.id, sort_by_parameter_order=True),
+            [{'prenom': prenom or None, 'nom': nom} for prenom, nom in nouveaux_auteurs]
+        ).scalars().all()
+        nouveaux_auteurs = dict(zip(nouveaux_auteurs, ids))
+    
+    # 3. Mise à jour des livres existants : une valeur absente garde l'ancienne
+    mises_a_jour = [
+        {'b_id': existants[isbn], **{f"b_{col}": notice.get(col) for col in COLONNES_LIVRE}}
+        for isbn, notice in par_isbn.items() if isbn in existants
+    ]
+    if mises_a_jour:
+        conn.execute(
+            update(Livre)
+            .where(Livre.id == bindparam('b_id'))
+            .values({
+                col: func.coalesce(bindparam(f"b_{col}"), getattr(Livre, col))
+                for col in COLONNES_LIVRE
+            }),
+            mises_a_jour
+        )
+    
+    # 4. Insertion des nouveaux livres, ids retournés dans l'ordre des notices
+    nouveaux = [(isbn, notice) for isbn, notice in par_isbn.items() if isbn not in existants]
+    if nouveaux:
+        lignes = []
+        for _, notice in nouveaux:
+            quantite = notice.get('quantite') or quantite_defaut
+            lignes.append({
+                'isbn': notice['isbn'],
+                **{col: notice.get(col) for col in COLONNES_LIVRE},
+                'langue': notice.get('langue') or _LANGUE_DEFAUT,
+                'quantite_totale': quantite,
+                'quantite_disponible': quantite,
+            })
+        ids = conn.execute(
+            insert(Livre).returning(Livre.id, sort_by_parameter_order=True), lignes
+        ).scalars().all()
+        existants.update((isbn, livre_id) for (isbn, _), livre_id in zip(nouveaux, ids))
+    
+    # 5. Liens livre-auteur (ceux déjà présents sont conservés)
+    liens = {
+        (existants[isbn], auteurs.get(cle) or nouveaux_auteurs[cle])
+        for isbn, notice in par_isbn.items()
+        for cle in map(separer_nom, notice['auteurs']) if cle[1]
+    }
+    if liens:
+        conn.execute(
+            livre_auteur.insert().prefix_with('OR IGNORE'),
+            [{'livre_id': livre_id, 'auteur_id': auteur_id} for livre_id, auteur_id in liens]
+        )
+    
+    rapport.inserees += len(nouveaux)
+    rapport.mises_a_jour += len(mises_a_jour)
+    return nouveaux_auteurs
+
+
+def importer_catalogue(engine, notices, taille_lot=TAILLE_LOT, quantite_defaut=1, progression=None):
+    """
+    Importer les ``notices`` (voir ``lire_notices``) dans le catalogue.
+    
+    Chaque lot est validé séparément : une erreur laisse en base les lots
+    précédents, et relancer l'import les met simplement à jour.
+    ``progression(rapport)`` est appelé après chaque lot. Retourne le
+    ``RapportImport``.
+    """
+    verifier_version_sqlite()
+    rapport = RapportImport()
+    with engine.connect() as conn:
+        auteurs = charger_auteurs(conn)
+    
+    suspendre_fts(engine)
+    try:
+        for lot in par_lots(notices, taille_lot):
+            with engine.begin() as conn:
+                nouveaux_auteurs = _importer_lot(conn, lot, auteurs, quantite_defaut, rapport)
+            # Après validation seulement : un lot annulé n'a créé aucun auteur
+            auteurs.update(nouveaux_auteurs)
+            rapport.auteurs += len(nouveaux_auteurs)
+            rapport.chronometrer()
+            if progression:
+                progression(rapport)
+    finally:
+        reconstruire_fts(engine)
+        invalider_statistiques()
+    
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA optimize")
+    rapport.chronometrer()
+    return rapport
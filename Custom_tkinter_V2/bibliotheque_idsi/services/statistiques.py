@@ -0,0 +1,150 @@
+"""
+Service de statistiques des tableaux de bord
+Système de Gestion de Bibliothèque - IDSI
+
+Tous les indicateurs sont calculés par deux requêtes agrégées : une ligne
+de totaux sur les emprunts, puis les répartitions par catégorie et par
+filière réunies par UNION ALL. Les résultats sont mis en cache et le cache
+est vidé dès qu'une transaction modifiant les emprunts, les livres ou les
+étudiants est validée.
+"""
+
+from sqlalchemy import select, func, case, literal, union_all, event
+from sqlalchemy.orm import Session
+
+from models.models import Emprunt, Livre, Etudiant
+from utils.cache import CacheTTL
+
+# Durée de vie des statistiques en cache (s) : les retards évoluent avec l'heure
+DUREE_CACHE_STATISTIQUES = 120
+
+# Nombre de catégories dans ``categories_populaires``
+N_CATEGORIES_POPULAIRES = 5
+
+_cache = CacheTTL(DUREE_CACHE_STATISTIQUES)
+# Caches vidés avec les statistiques (dont celui des livres populaires)
+_caches_lies = [_cache]
+
+# Modèles dont la modification invalide les statistiques
+_MODELES_SUIVIS = (Emprunt, Livre, Etudiant)
+_CLE_MODIFIE = 'statistiques_modifiees'
+
+
+def _compteurs_emprunts():
+    """Colonnes agrégées communes : emprunts, en cours, en retard"""
+    return (
+        func.count(Emprunt.id),
+        func.coalesce(func.sum(case((Emprunt.date_retour_effective.is_(None), 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Emprunt.echeance_depassee(), 1), else_=0)), 0),
+    )
+
+
+def _calculer_statistiques(db):
+    stats = {}
+    
+    # 1. Totaux (les comptes de livres et d'étudiants en sous-requêtes scalaires)
+    total, en_cours, en_retard = _compteurs_emprunts()
+    ligne = db.execute(select(
+        total, en_cours, en_retard,
+        func.coalesce(func.sum(Emprunt.penalite), 0),
+        func.coalesce(func.sum(case(
+            (Emprunt.date_retour_effective.is_(None), Emprunt.penalite_courante), else_=0
+        )), 0),
+        select(func.count(Livre.id)).scalar_subquery(),
+        select(func.count(Etudiant.id)).scalar_subquery(),
+    )).one()
+    
+    (
+        stats['total_emprunts'], stats['emprunts_en_cours'], stats['emprunts_en_retard'],
+        stats['penalites_totales'], stats['penalites_en_cours'],
+        stats['total_livres'], stats['total_etudiants'],
+    ) = ligne
+    
+    # 2. Répartitions par catégorie et par filière en une requête
+    par_categorie = select(
+        literal('categorie').label('axe'), Livre.categorie.label('valeur'), *_compteurs_emprunts()
+    ).join(Livre, Emprunt.livre_id == Livre.id).group_by(Livre.categorie)
+    
+    par_filiere = select(
+        literal('filiere').label('axe'), Etudiant.filiere.label('valeur'), *_compteurs_emprunts()
+    ).join(Etudiant, Emprunt.etudiant_id == Etudiant.id).group_by(Etudiant.filiere)
+    
+    stats['par_categorie'] = {}
+    stats['par_filiere'] = {}
+    for axe, valeur, nb, nb_en_cours, nb_en_retard in db.execute(union_all(par_categorie, par_filiere)):
+        if valeur is None:
+            continue
+        stats[f"par_{axe}"][valeur] = {
+            'emprunts': nb,
+            'en_cours': nb_en_cours,
+            'en_retard': nb_en_retard,
+        }
+    
+    # Même forme que l'ancien statistiques_emprunts : [(catégorie, nombre)]
+    stats['categories_populaires'] = sorted(
+        ((cat, v['emprunts']) for cat, v in stats['par_categorie'].items()),
+        key=lambda c: -c[1]
+    )[:N_CATEGORIES_POPULAIRES]
+    
+    return stats
+
+
+def statistiques_bibliotheque(db):
+    """
+    Indicateurs globaux : total_livres, total_etudiants, total_emprunts,
+    emprunts_en_cours, emprunts_en_retard, penalites_totales (enregistrées),
+    penalites_en_cours, categories_populaires, par_categorie, par_filiere
+    """
+    return _cache.get_or_compute('bibliotheque', lambda: _calculer_statistiques(db))
+
+
+def statistiques_etudiant(db, etudiant_id):
+    """
+    Indicateurs d'un étudiant en une requête : emprunts_en_cours,
+    emprunts_en_retard, penalites (dues sur les emprunts en cours), total_emprunts
+    """
+    def calculer():
+        ouvert = Emprunt.date_retour_effective.is_(None)
+        total, en_cours, en_retard = _compteurs_emprunts()
+        ligne = db.execute(select(
+            total, en_cours, en_retard,
+            func.coalesce(func.sum(case((ouvert, Emprunt.penalite_courante), else_=0)), 0),
+        ).where(Emprunt.etudiant_id == etudiant_id)).one()
+        return {
+            'total_emprunts': ligne[0],
+            'emprunts_en_cours': ligne[1],
+            'emprunts_en_retard': ligne[2],
+            'penalites': ligne[3],
+        }
+    
+    return _cache.get_or_compute(('etudiant', etudiant_id), calculer)
+
+
+def lier_cache(cache):
+    """Vider aussi ``cache`` à chaque invalidation des statistiques ; retourne ``cache``"""
+    _caches_lies.append(cache)
+    return cache
+
+
+def invalider_statistiques():
+    """Vider les caches (à appeler après une écriture faite hors de l'ORM)"""
+    for cache in _caches_lies:
+        cache.invalider()
+
+
+@event.listens_for(Session, 'after_flush')
+def _noter_modifications(session, flush_context):
+    objets = (*session.new, *session.dirty, *session.deleted)
+    if any(isinstance(objet, _MODELES_SUIVIS) for objet in objets):
+        session.info[_CLE_MODIFIE] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalider_apres_commit(session):
+    if session.info.pop(_CLE_MODIFIE, False):
+        invalider_statistiques()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _oublier_modifications(session):
+    session.info.pop(_CLE_MODIFIE, None)
@@ -0,0 +1,117 @@
+"""
+Statistiques journalières pré-agrégées (rapports et graphiques historiques)
+Système de Gestion de Bibliothèque - IDSI
+
+La table ``statistiques_journalieres`` reçoit les emprunts et les retours
+au fil de l'eau (écouteurs de models/models.py). La compaction, lancée
+chaque nuit par ``compacter_statistiques.py``, recalcule exactement les
+jours écoulés depuis la dernière compaction à partir des emprunts (ce qui
+couvre aussi les écritures faites hors de l'ORM) et ajoute les nouveaux
+retards, qui dépendent de l'heure et non d'une écriture.
+
+Les tendances se lisent ensuite sur quelques centaines de lignes agrégées
+au lieu de parcourir toute la table des emprunts.
+"""
+
+from datetime import date, timedelta
+from sqlalchemy import func, text
+
+from models.models import StatistiqueJournaliere
+
+_TABLE = StatistiqueJournaliere.__tablename__
+
+# Événements datés (emprunts, retours, échéances dépassées) de [:debut, :fin),
+# regroupés par jour, catégorie et filière
+_COMPACTION_SQL = f"""
+    INSERT INTO {_TABLE} (jour, categorie, filiere, nb_emprunts, nb_retours,
+                          nb_retours_en_retard, nb_nouveaux_retards, penalites, compacte)
+    SELECT ev.jour, coalesce(l.categorie, ''), coalesce(et.filiere, ''),
+           sum(ev.emprunt), sum(ev.retour), sum(ev.retour_en_retard),
+           sum(ev.nouveau_retard), sum(ev.penalite), 1
+      FROM (
+            SELECT date(date_emprunt) AS jour, livre_id, etudiant_id,
+                   1 AS emprunt, 0 AS retour, 0 AS retour_en_retard,
+                   0 AS nouveau_retard, 0.0 AS penalite
+              FROM emprunts
+             WHERE date_emprunt >= :debut AND date_emprunt < :fin
+            UNION ALL
+            SELECT date(date_retour_effective), livre_id, etudiant_id, 0, 1,
+                   julianday(date_retour_effective) - julianday(date_retour_prevue) >= 1,
+                   0, coalesce(penalite, 0)
+              FROM emprunts
+             WHERE date_retour_effective >= :debut AND date_retour_effective < :fin
+            UNION ALL
+            SELECT date(date_retour_prevue, '+1 day'), livre_id, etudiant_id, 0, 0, 0, 1, 0.0
+              FROM emprunts
+             WHERE date_retour_prevue >= :debut_echeance AND date_retour_prevue < :fin_echeance
+               AND (date_retour_effective IS NULL
+                    OR julianday(date_retour_effective) - julianday(date_retour_prevue) >= 1)
+           ) AS ev
+      JOIN livres l ON l.id = ev.livre_id
+      JOIN etudiants et ON et.id = ev.etudiant_id
+     GROUP BY ev.jour, coalesce(l.categorie, ''), coalesce(et.filiere, '')
+"""
+
+
+def _premier_jour_a_compacter(db):
+    """Lendemain du dernier jour compacté, ou jour du premier emprunt"""
+    dernier = db.query(func.max(StatistiqueJournaliere.jour)).filter(
+        StatistiqueJournaliere.compacte.is_(True)
+    ).scalar()
+    if dernier is not None:
+        return dernier + timedelta(days=1)
+    
+    premier = db.execute(text("SELECT min(date(date_emprunt)) FROM emprunts")).scalar()
+    return date.fromisoformat(premier) if premier else None
+
+
+def compacter(db, depuis=None, jusqu_a=None):
+    """
+    Recalculer les jours de ``depuis`` (par défaut le premier jour non
+    compacté) à ``jusqu_a`` inclus (par défaut hier), en une transaction.
+    Retourne le nombre de jours recalculés.
+    """
+    debut = depuis or _premier_jour_a_compacter(db)
+    fin = (jusqu_a or date.today() - timedelta(days=1)) + timedelta(days=1)
+    if debut is None or debut >= fin:
+        return 0
+    
+    db.query(StatistiqueJournaliere).filter(
+        StatistiqueJournaliere.jour >= debut,
+        StatistiqueJournaliere.jour < fin
+    ).delete(synchronize_session=False)
+    
+    db.execute(text(_COMPACTION_SQL), {
+        'debut': debut.isoformat(),
+        'fin': fin.isoformat(),
+        # Un emprunt passe en retard le lendemain de son échéance
+        'debut_echeance': (debut - timedelta(days=1)).isoformat(),
+        'fin_echeance': (fin - timedelta(days=1)).isoformat(),
+    })
+    db.commit()
+    return (fin - debut).days
+
+
+def serie_journaliere(db, depuis=None, jusqu_a=None, axe=None):
+    """
+    Compteurs par jour, ou par (jour, valeur de l'axe) si ``axe`` vaut
+    'categorie' ou 'filiere'. Retourne des dicts triés par jour.
+    """
+    S = StatistiqueJournaliere
+    colonnes = [S.jour]
+    if axe is not None:
+        if axe not in ('categorie', 'filiere'):
+            raise ValueError(f"Axe inconnu: {axe}")
+        colonnes.append(getattr(S, axe))
+    
+    query = db.query(
+        *colonnes,
+        *(func.sum(getattr(S, nom)).label(nom) for nom in S.COMPTEURS)
+    )
+    if depuis is not None:
+        query = query.filter(S.jour >= depuis)
+    if jusqu_a is not None:
+        query = query.filter(S.jour <= jusqu_a)
+    
+    lignes = query.group_by(*colonnes).order_by(*colonnes).all()
+    return [ligne._asdict() for ligne in lignes]
@@ -0,0 +1,218 @@
+"""
+Index de plus proches voisins approchés (ANN)
+Système de Gestion de Bibliothèque - IDSI
+
+Index de type IVF (inverted file) en NumPy pur : les vecteurs des livres
+sont répartis par k-means en ``n_listes`` groupes ; une requête n'examine
+que les vecteurs des ``nprobe`` groupes dont le centre est le plus proche.
+Le coût d'une requête passe de O(n) à environ O(n × nprobe / n_listes).
+
+Les vecteurs sont L2-normalisés : le produit scalaire est la similarité
+cosinus, comme pour l'index de contenu TF-IDF.
+"""
+
+import json
+import os
+import shutil
+import time
+import numpy as np
+
+from utils.recommendation import kmeans
+
+# À incrémenter à chaque changement du format sauvegardé
+ANN_VERSION = 2
+
+# Dimension des vecteurs denses obtenus par projection aléatoire
+DIMENSION_PROJECTION = 128
+
+
+def normaliser(vecteurs):
+    """Normaliser chaque ligne (norme L2 = 1, les lignes nulles restent nulles)"""
+    vecteurs = np.asarray(vecteurs, dtype=np.float32)
+    normes = np.linalg.norm(vecteurs, axis=1, keepdims=True)
+    normes[normes == 0] = 1.0
+    return vecteurs / normes
+
+
+def projection_aleatoire(vecteurs, dimension=DIMENSION_PROJECTION, graine=0):
+    """
+    Réduire des vecteurs (creux ou denses, ex. TF-IDF) à ``dimension``
+    composantes par une projection gaussienne aléatoire, qui conserve
+    approximativement les produits scalaires (Johnson-Lindenstrauss).
+    """
+    rng = np.random.default_rng(graine)
+    projection = rng.standard_normal((vecteurs.shape[1], dimension)).astype(np.float32)
+    projection /= np.sqrt(dimension)
+    return normaliser(vecteurs @ projection)
+
+
+class IndexIVF:
+    """
+    Index IVF sur des vecteurs normalisés
+    
+    Les vecteurs sont rangés groupe par groupe (``indptr`` donne les bornes
+    de chaque groupe), si bien que les candidats d'un groupe se lisent en
+    une tranche contiguë.
+    """
+    
+    def __init__(self, centres, indptr, vecteurs, ids, nprobe=8):
+        self.centres = centres
+        self.indptr = indptr
+        self.vecteurs = vecteurs
+        self.ids = ids
+        self.nprobe = nprobe
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    @property
+    def n_listes(self):
+        return len(self.centres)
+    
+    @classmethod
+    def construire(cls, vecteurs, ids, n_listes=None, nprobe=8, rng=None):
+        """
+        Construire l'index. Par défaut n_listes ≈ √n ; le k-means passe en
+        mini-lots sur les grands catalogues.
+        """
+        vecteurs = normaliser(vecteurs)
+        ids = np.asarray(ids, dtype=np.int64)
+        n = len(vecteurs)
+        if n_listes is None:
+            n_listes = max(1, int(np.sqrt(n)))
+        n_listes = min(n_listes, n)
+        
+        taille_lot = 4096 if n > 50000 else None
+        labels, centres = kmeans(
+            vecteurs, n_listes, max_iter=25, tol=1e-3,
+            taille_lot=taille_lot, rng=rng or np.random.default_rng(0)
+        )
+        
+        ordre = np.argsort(labels, kind='stable')
+        indptr = np.zeros(n_listes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_listes), out=indptr[1:])
+        
+        return cls(
+            centres.astype(np.float32),
+            indptr,
+            np.ascontiguousarray(vecteurs[ordre]),
+            ids[ordre],
+            nprobe
+        )
+    
+    def _candidats(self, requete, nprobe):
+        """Positions des vecteurs des nprobe groupes les plus proches"""
+        proximites = self.centres @ requete
+        nprobe = min(nprobe, self.n_listes)
+        groupes = np.argpartition(-proximites, nprobe - 1)[:nprobe]
+        return np.concatenate([
+            np.arange(self.indptr[g], self.indptr[g + 1]) for g in groupes
+        ])
+    
+    def rechercher(self, requete, k=10, nprobe=None):
+        """
+        Les k vecteurs les plus proches de ``requete``.
+        Retourne (ids, scores) du plus proche au moins proche.
+        """
+        requete = normaliser(np.asarray(requete, dtype=np.float32)[None, :])[0]
+        candidats = self._candidats(requete, nprobe or self.nprobe)
+        if len(candidats) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        scores = self.vecteurs[candidats] @ requete
+        if len(scores) > k:
+            meilleurs = np.argpartition(-scores, k - 1)[:k]
+            candidats, scores = candidats[meilleurs], scores[meilleurs]
+        ordre = np.argsort(-scores, kind='stable')
+        return self.ids[candidats[ordre]], scores[ordre]
+    
+    def rechercher_lot(self, requetes, k=10, nprobe=None):
+        """Recherche de plusieurs requêtes : liste de (ids, scores)"""
+        return [self.rechercher(r, k, nprobe) for r in requetes]
+    
+    def sauvegarder(self, chemin):
+        """Écrire l'index dans le dossier ``chemin`` (un .npy par tableau, manifeste JSON)"""
+        temporaire = f"{chemin}.tmp-{os.getpid()}"
+        shutil.rmtree(temporaire, ignore_errors=True)
+        os.makedirs(temporaire)
+        
+        for nom in ('centres', 'indptr', 'vecteurs', 'ids'):
+            np.save(os.path.join(temporaire, f"{nom}.npy"), getattr(self, nom))
+        with open(os.path.join(temporaire, 'manifeste.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': ANN_VERSION, 'nprobe': int(self.nprobe)}, f)
+        
+        shutil.rmtree(chemin, ignore_errors=True)
+        os.replace(temporaire, chemin)
+    
+    @classmethod
+    def charger(cls, chemin):
+        """
+        Charger un index sauvegardé (tableaux en memory-mapping, lecture
+        seule). Retourne None si le dossier est absent ou d'une autre version.
+        """
+        chemin_manifeste = os.path.join(chemin, 'manifeste.json')
+        if not os.path.exists(chemin_manifeste):
+            return None
+        with open(chemin_manifeste, encoding='utf-8') as f:
+            manifeste = json.load(f)
+        if manifeste.get('version') != ANN_VERSION:
+            return None
+        
+        t = {
+            nom: np.load(os.path.join(chemin, f"{nom}.npy"), mmap_mode='r', allow_pickle=False)
+            for nom in ('centres', 'indptr', 'vecteurs', 'ids')
+        }
+        return cls(t['centres'], t['indptr'], t['vecteurs'], t['ids'], manifeste['nprobe'])
+
+
+def recherche_exacte(vecteurs, ids, requete, k=10):
+    """Recherche exhaustive (référence) : (ids, scores) des k meilleurs"""
+    scores = vecteurs @ requete
+    if len(scores) > k:
+        meilleurs = np.argpartition(-scores, k - 1)[:k]
+    else:
+        meilleurs = np.arange(len(scores))
+    meilleurs = meilleurs[np.argsort(-scores[meilleurs], kind='stable')]
+    return ids[meilleurs], scores[meilleurs]
+
+
+def evaluer_index(index, vecteurs, ids, requetes, k=10, nprobes=(1, 2, 4, 8, 16, 32)):
+    """
+    Rappel@k et latence de l'index pour plusieurs valeurs de nprobe,
+    comparés à la recherche exacte sur les mêmes requêtes.
+    Retourne une liste de dicts (une ligne par réglage, exacte en premier).
+    """
+    vecteurs = normaliser(vecteurs)
+    requetes = normaliser(requetes)
+    ids = np.asarray(ids, dtype=np.int64)
+    
+    debut = time.perf_counter()
+    references = [set(recherche_exacte(vecteurs, ids, r, k)[0].tolist()) for r in requetes]
+    duree_exacte = time.perf_counter() - debut
+    
+    resultats = [{
+        'methode': 'exacte',
+        'nprobe': None,
+        'rappel': 1.0,
+        'ms_par_requete': 1000 * duree_exacte / len(requetes),
+    }]
+    
+    for nprobe in nprobes:
+        if nprobe > index.n_listes:
+            break
+        debut = time.perf_counter()
+        trouves = index.rechercher_lot(requetes, k, nprobe)
+        duree = time.perf_counter() - debut
+        
+        rappel = np.mean([
+            len(reference & set(t[0].tolist())) / max(1, len(reference))
+            for reference, t in zip(references, trouves)
+        ])
+        resultats.append({
+            'methode': 'ivf',
+            'nprobe': nprobe,
+            'rappel': float(rappel),
+            'ms_par_requete': 1000 * duree / len(requetes),
+        })
+    
+    return resultats
@@ -0,0 +1,67 @@
+"""
+Cache en mémoire à durée de vie limitée
+Système de Gestion de Bibliothèque - IDSI
+"""
+
+import threading
+import time
+
+
+class CacheTTL:
+    """
+    Cache clé -> valeur dont chaque entrée expire après ``ttl`` secondes
+    
+    Partagé entre threads (un verrou protège le dictionnaire). Les entrées
+    expirées sont retirées à la lecture.
+    
+    Chaque invalidation incrémente une génération : une valeur calculée par
+    ``get_or_compute`` pendant une invalidation (donc peut-être à partir de
+    données déjà périmées) est retournée mais n'est pas mise en cache.
+    """
+    
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._entrees = {}
+        self._generation = 0
+        self._verrou = threading.Lock()
+    
+    def get(self, cle, defaut=None):
+        """Valeur en cache, ou ``defaut`` si elle est absente ou expirée"""
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                return defaut
+            valeur, expiration = entree
+            if time.monotonic() >= expiration:
+                del self._entrees[cle]
+                return defaut
+            return valeur
+    
+    def set(self, cle, valeur, ttl=None):
+        with self._verrou:
+            self._entrees[cle] = (valeur, time.monotonic() + (self.ttl if ttl is None else ttl))
+    
+    def get_or_compute(self, cle, calcul):
+        """
+        Valeur en cache, sinon ``calcul()`` mise en cache si aucune
+        invalidation n'a eu lieu pendant le calcul
+        """
+        manquant = object()
+        with self._verrou:
+            generation = self._generation
+        valeur = self.get(cle, manquant)
+        if valeur is manquant:
+            valeur = calcul()
+            with self._verrou:
+                if self._generation == generation:
+                    self._entrees[cle] = (valeur, time.monotonic() + self.ttl)
+        return valeur
+    
+    def invalider(self, cle=None):
+        """Oublier une entrée, ou tout le cache si ``cle`` est None"""
+        with self._verrou:
+            self._generation += 1
+            if cle is None:
+                self._entrees.clear()
+            else:
+                self._entrees.pop(cle, None)
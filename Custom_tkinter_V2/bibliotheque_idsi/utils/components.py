@@ -108,13 +108,45 @@ class ModernCard(ctk.CTkFrame):
 
 
 class ModernTable(ctk.CTkFrame):
-    """Tableau moderne avec scrollbar"""
+    """
+    Tableau moderne virtualisé
+
+    Les lignes sont conservées dans un modèle en mémoire (``self.rows``) et
+    seuls les widgets de la zone visible sont créés ; ils sont recyclés au
+    défilement. Le coût d'affichage dépend de la hauteur du tableau et non
+    du nombre de lignes.
+
+    Chaque ligne peut porter une clé non affichée (``self.row_keys``, en
+    général l'id en base) : les actions sur la sélection s'appuient sur
+    ``get_selected_key()`` plutôt que sur les valeurs affichées.
+
+    Avec ``multi_select``, Ctrl+clic ajoute ou retire une ligne de la
+    sélection et Maj+clic sélectionne une plage (``get_selected_keys()``).
+    """
+    
+    ROW_HEIGHT = 44
+    WHEEL_STEP = 3
+    SKELETON_ROWS = 5
+    
+    # Masques de event.state
+    CONTROL_MASK = 0x0004
+    SHIFT_MASK = 0x0001
     
-    def __init__(self, parent, columns, height=400, **kwargs):
+    def __init__(self, parent, columns, height=400, multi_select=False, **kwargs):
         super().__init__(parent, fg_color=COLORS['surface'], corner_radius=DIMENSIONS['border_radius'])
         
         self.columns = columns
         self.rows = []
+        self.row_keys = []
+        self.selected_idx = None
+        self.multi_select = multi_select
+        self.selected_indices = set()
+        
+        self._pool = []
+        self._offset = 0
+        self._visible_count = max(1, height // self.ROW_HEIGHT)
+        self._render_job = None
+        self._loading = False
         
         # Header
         self.header_frame = ctk.CTkFrame(self, fg_color=COLORS['primary'], corner_radius=0)
@@ -130,79 +162,253 @@ class ModernTable(ctk.CTkFrame):
             )
             header_label.grid(row=0, column=i, padx=10, pady=12, sticky='w')
         
-        # Scrollable frame pour les données avec hauteur fixe
-        self.scroll_frame = ctk.CTkScrollableFrame(
-            self, 
-            fg_color='transparent',
-            height=height,
-            scrollbar_button_color=COLORS['primary'],
-            scrollbar_button_hover_color=COLORS['primary_light']
+        # Zone des données à hauteur fixe : pool de lignes + scrollbar
+        self.body = ctk.CTkFrame(self, fg_color='transparent', height=height)
+        self.body.pack(fill='both', expand=True)
+        self.body.pack_propagate(False)
+        
+        self.scrollbar = ctk.CTkScrollbar(
+            self.body,
+            command=self._on_scrollbar,
+            button_color=COLORS['primary'],
+            button_hover_color=COLORS['primary_light']
         )
-        self.scroll_frame.pack(fill='both', expand=True)
-        
-        # Configurer les colonnes
-        for i in range(len(columns)):
-            self.scroll_frame.columnconfigure(i, weight=1)
-    
-    def insert(self, values):
-        """Insérer une ligne"""
-        row_idx = len(self.rows)
-        row_bg = COLORS['white'] if row_idx % 2 == 0 else COLORS['background']
-        
-        row_frame = ctk.CTkFrame(self.scroll_frame, fg_color=row_bg, corner_radius=0)
-        row_frame.grid(row=row_idx, column=0, columnspan=len(self.columns), sticky='ew', pady=1)
-        
-        for i, (col_id, col_config) in enumerate(self.columns.items()):
-            value = values[i] if i < len(values) else ''
-            cell_label = ctk.CTkLabel(
-                row_frame,
-                text=str(value),
-                font=ctk.CTkFont(family=FONTS['family'], size=13),
-                text_color=COLORS['text_primary'],
-                width=col_config.get('width', 100),
-                anchor='w'
-            )
-            cell_label.grid(row=0, column=i, padx=10, pady=10, sticky='w')
+        self.scrollbar.pack(side='right', fill='y')
         
-        self.rows.append((row_frame, values))
+        self.rows_frame = ctk.CTkFrame(self.body, fg_color='transparent', corner_radius=0)
+        self.rows_frame.pack(side='left', fill='both', expand=True)
+        self.rows_frame.columnconfigure(0, weight=1)
+        self.rows_frame.bind('<Configure>', self._on_resize)
+        self._bind_wheel(self.rows_frame)
         
-        # Effet hover
-        row_frame.bind('<Enter>', lambda e, f=row_frame: f.configure(fg_color=COLORS['primary_light']))
-        row_frame.bind('<Leave>', lambda e, f=row_frame, bg=row_bg: f.configure(fg_color=bg))
+        self._ensure_pool(self._visible_count)
+        self._render()
+    
+    def _bind_wheel(self, widget):
+        """Faire défiler le tableau avec la molette"""
+        widget.bind('<MouseWheel>', self._on_mouse_wheel)
+        widget.bind('<Button-4>', self._on_mouse_wheel)
+        widget.bind('<Button-5>', self._on_mouse_wheel)
+    
+    def _ensure_pool(self, count):
+        """Créer les widgets de ligne manquants pour couvrir la zone visible"""
+        while len(self._pool) < count:
+            slot = len(self._pool)
+            row_frame = ctk.CTkFrame(self.rows_frame, corner_radius=0, height=self.ROW_HEIGHT - 2)
+            row_frame.grid_propagate(False)
+            
+            labels = []
+            for i, (col_id, col_config) in enumerate(self.columns.items()):
+                cell_label = ctk.CTkLabel(
+                    row_frame,
+                    text='',
+                    font=ctk.CTkFont(family=FONTS['family'], size=13),
+                    text_color=COLORS['text_primary'],
+                    width=col_config.get('width', 100),
+                    anchor='w'
+                )
+                cell_label.grid(row=0, column=i, padx=10, pady=8, sticky='w')
+                labels.append(cell_label)
+            
+            # Effet hover
+            row_frame.bind('<Enter>', lambda e, s=slot: self._on_row_hover(s, True))
+            row_frame.bind('<Leave>', lambda e, s=slot: self._on_row_hover(s, False))
+            
+            # Bind click et molette
+            for widget in [row_frame] + labels:
+                widget.bind('<Button-1>', lambda e, s=slot: self._on_row_click(s, e))
+                self._bind_wheel(widget)
+            
+            self._pool.append((row_frame, labels))
+    
+    def _row_colors(self, idx):
+        """Couleurs (fond, texte) d'une ligne du modèle"""
+        if idx in self.selected_indices:
+            return COLORS['primary'], COLORS['white']
+        bg = COLORS['white'] if idx % 2 == 0 else COLORS['background']
+        return bg, COLORS['text_primary']
+    
+    def _schedule_render(self):
+        """Regrouper les rafraîchissements en un seul passage"""
+        if self._render_job is None:
+            self._render_job = self.after_idle(self._render)
+    
+    def _render(self):
+        """Lier les widgets du pool à la fenêtre visible du modèle"""
+        self._render_job = None
+        
+        max_offset = max(0, len(self.rows) - self._visible_count)
+        self._offset = max(0, min(self._offset, max_offset))
+        
+        if self._loading and not self.rows:
+            self._render_skeleton()
+            return
+        
+        for slot, (row_frame, labels) in enumerate(self._pool):
+            idx = self._offset + slot
+            if slot >= self._visible_count or idx >= len(self.rows):
+                row_frame.grid_remove()
+                continue
+            
+            values = self.rows[idx]
+            bg, fg = self._row_colors(idx)
+            row_frame.configure(fg_color=bg)
+            for i, cell_label in enumerate(labels):
+                value = values[i] if i < len(values) else ''
+                cell_label.configure(text=str(value), text_color=fg)
+            row_frame.grid(row=slot, column=0, sticky='ew', pady=1)
+        
+        if self.rows:
+            start = self._offset / len(self.rows)
+            end = min(1.0, (self._offset + self._visible_count) / len(self.rows))
+            self.scrollbar.set(start, end)
+        else:
+            self.scrollbar.set(0, 1)
+    
+    def _render_skeleton(self):
+        """Lignes fantômes affichées pendant le chargement"""
+        count = min(self._visible_count, self.SKELETON_ROWS)
+        for slot, (row_frame, labels) in enumerate(self._pool):
+            if slot >= count:
+                row_frame.grid_remove()
+                continue
+            
+            row_frame.configure(fg_color=COLORS['white'] if slot % 2 == 0 else COLORS['background'])
+            for i, cell_label in enumerate(labels):
+                width = list(self.columns.values())[i].get('width', 100)
+                cell_label.configure(text='▬' * max(2, width // 20), text_color=COLORS['border'])
+            row_frame.grid(row=slot, column=0, sticky='ew', pady=1)
         
-        # Bind click
-        row_frame.bind('<Button-1>', lambda e, idx=row_idx: self._on_row_click(idx))
-        for child in row_frame.winfo_children():
-            child.bind('<Button-1>', lambda e, idx=row_idx: self._on_row_click(idx))
+        self.scrollbar.set(0, 1)
     
-    def _on_row_click(self, idx):
+    def _scroll_to(self, offset):
+        """Positionner la première ligne visible"""
+        max_offset = max(0, len(self.rows) - self._visible_count)
+        offset = max(0, min(offset, max_offset))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+    
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == 'moveto':
+            self._scroll_to(round(float(value) * len(self.rows)))
+        else:
+            step = self._visible_count if unit == 'pages' else 1
+            self._scroll_to(self._offset + int(value) * step)
+    
+    def _on_mouse_wheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self._scroll_to(self._offset - self.WHEEL_STEP)
+        else:
+            self._scroll_to(self._offset + self.WHEEL_STEP)
+        # Ne pas faire défiler la page en même temps que le tableau
+        return 'break'
+    
+    def _on_resize(self, event):
+        visible = max(1, event.height // self.ROW_HEIGHT)
+        if visible != self._visible_count:
+            self._visible_count = visible
+            self._ensure_pool(visible)
+            self._schedule_render()
+    
+    def _on_row_hover(self, slot, inside):
+        idx = self._offset + slot
+        if idx >= len(self.rows) or idx in self.selected_indices:
+            return
+        bg = COLORS['primary_light'] if inside else self._row_colors(idx)[0]
+        self._pool[slot][0].configure(fg_color=bg)
+    
+    def _on_row_click(self, slot, event=None):
         """Gérer le clic sur une ligne"""
+        idx = self._offset + slot
+        if idx >= len(self.rows):
+            return
+        
+        state = getattr(event, 'state', 0) if self.multi_select else 0
+        if state & self.CONTROL_MASK:
+            self.selected_indices ^= {idx}
+        elif state & self.SHIFT_MASK and self.selected_idx is not None:
+            # Plage depuis la dernière ligne cliquée, qui reste l'ancre
+            start, end = sorted((self.selected_idx, idx))
+            self.selected_indices = set(range(start, end + 1))
+            self._render()
+            return
+        else:
+            self.selected_indices = {idx}
         self.selected_idx = idx
-        # Réinitialiser les couleurs
-        for i, (frame, _) in enumerate(self.rows):
-            bg = COLORS['white'] if i % 2 == 0 else COLORS['background']
-            if i == idx:
-                frame.configure(fg_color=COLORS['primary'])
-                for child in frame.winfo_children():
-                    child.configure(text_color=COLORS['white'])
-            else:
-                frame.configure(fg_color=bg)
-                for child in frame.winfo_children():
-                    child.configure(text_color=COLORS['text_primary'])
+        self._render()
+    
+    def insert(self, values, key=None, index=None):
+        """
+        Insérer une ligne (à la fin, ou à la position ``index``) ; ``key``
+        identifie la ligne sans être affichée
+        """
+        if index is None:
+            self.rows.append(values)
+            self.row_keys.append(key)
+        else:
+            self.rows.insert(index, values)
+            self.row_keys.insert(index, key)
+            # La sélection suit les lignes décalées
+            self.selected_indices = {i + 1 if i >= index else i for i in self.selected_indices}
+            if self.selected_idx is not None and self.selected_idx >= index:
+                self.selected_idx += 1
+        self._schedule_render()
     
     def clear(self):
         """Vider le tableau"""
-        for frame, _ in self.rows:
-            frame.destroy()
         self.rows = []
+        self.row_keys = []
         self.selected_idx = None
+        self.selected_indices = set()
+        self._offset = 0
+        self._schedule_render()
     
     def get_selected(self):
         """Obtenir l'élément sélectionné"""
-        if hasattr(self, 'selected_idx') and self.selected_idx is not None:
-            if self.selected_idx < len(self.rows):
-                return self.rows[self.selected_idx][1]
+        if self.selected_idx in self.selected_indices and self.selected_idx < len(self.rows):
+            return self.rows[self.selected_idx]
+        return None
+    
+    def get_selected_key(self):
+        """Clé de la ligne sélectionnée (None si aucune sélection ou ligne sans clé)"""
+        if self.selected_idx in self.selected_indices and self.selected_idx < len(self.rows):
+            return self.row_keys[self.selected_idx]
         return None
+    
+    def get_selected_keys(self):
+        """Clés de toutes les lignes sélectionnées, dans l'ordre du tableau"""
+        return [self.row_keys[idx] for idx in sorted(self.selected_indices) if idx < len(self.rows)]
+    
+    def update_row(self, key, values):
+        """Remplacer les valeurs de la ligne de clé ``key`` (sans recharger le tableau)"""
+        for idx, row_key in enumerate(self.row_keys):
+            if row_key == key:
+                self.rows[idx] = values
+                self._schedule_render()
+                return True
+        return False
+    
+    def remove_keys(self, keys):
+        """Retirer les lignes dont la clé est dans ``keys`` ; la sélection est vidée"""
+        keys = set(keys)
+        kept = [(row, key) for row, key in zip(self.rows, self.row_keys) if key not in keys]
+        self.rows = [row for row, _ in kept]
+        self.row_keys = [key for _, key in kept]
+        self.selected_idx = None
+        self.selected_indices = set()
+        self._schedule_render()
+    
+    def set_loading(self, loading=True):
+        """Afficher (ou retirer) les lignes fantômes tant qu'aucune ligne n'est chargée"""
+        self._loading = loading
+        self._schedule_render()
+    
+    def destroy(self):
+        if self._render_job is not None:
+            self.after_cancel(self._render_job)
+            self._render_job = None
+        super().destroy()
 
 
 class Sidebar(ctk.CTkFrame):
@@ -356,23 +562,48 @@ class StatCard(ctk.CTkFrame):
         )
         title_label.pack(side='right')
         
-        # Valeur
-        value_label = ctk.CTkLabel(
+        # Valeur (None : carte en cours de chargement)
+        self.color = color
+        self.value_label = ctk.CTkLabel(
             inner,
-            text=str(value),
+            text='',
             font=ctk.CTkFont(family=FONTS['family'], size=36, weight='bold'),
             text_color=color
         )
-        value_label.pack(pady=(15, 0))
+        self.value_label.pack(pady=(15, 0))
+        
+        if value is None:
+            self.set_loading()
+        else:
+            self.set_value(value)
+    
+    def set_loading(self):
+        """Afficher une valeur fantôme en attendant les données"""
+        self.value_label.configure(text='▬▬', text_color=COLORS['border'])
+    
+    def set_value(self, value):
+        """Afficher la valeur"""
+        self.value_label.configure(text=str(value), text_color=self.color)
 
 
 class SearchBar(ctk.CTkFrame):
-    """Barre de recherche moderne"""
+    """
+    Barre de recherche moderne
+    
+    En mode ``live``, la recherche part pendant la frappe, une fois que
+    l'utilisateur s'est arrêté ``delay`` ms (debounce) : une seule recherche
+    par pause au lieu d'une par touche. Entrée et le bouton recherchent
+    immédiatement.
+    """
     
-    def __init__(self, parent, placeholder='Rechercher...', on_search=None, **kwargs):
+    def __init__(self, parent, placeholder='Rechercher...', on_search=None, live=False,
+                 delay=ANIMATIONS['search_debounce'], **kwargs):
         super().__init__(parent, fg_color='transparent')
         
         self.on_search = on_search
+        self.delay = delay
+        self._search_job = None
+        self._last_search = ''
         
         # Container
         container = ctk.CTkFrame(
@@ -422,13 +653,169 @@ class SearchBar(ctk.CTkFrame):
         
         # Bind Enter
         self.entry.bind('<Return>', lambda e: self._on_search())
+        if live:
+            self.entry.bind('<KeyRelease>', self._on_key_release)
     
-    def _on_search(self):
+    def _on_key_release(self, event):
+        """Relancer le délai de debounce si le texte a changé"""
+        if event.keysym in ('Return', 'KP_Enter'):
+            return
+        if self.entry.get() == self._last_search:
+            self._cancel_pending()
+            return
+        self._cancel_pending()
+        self._search_job = self.after(self.delay, self._fire)
+    
+    def _cancel_pending(self):
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+            self._search_job = None
+    
+    def _fire(self):
+        self._search_job = None
+        self._last_search = self.entry.get()
         if self.on_search:
-            self.on_search(self.entry.get())
+            self.on_search(self._last_search)
+    
+    def _on_search(self):
+        self._cancel_pending()
+        self._fire()
     
     def get(self):
         return self.entry.get()
+    
+    def destroy(self):
+        self._cancel_pending()
+        super().destroy()
+
+
+class ScanBar(ctk.CTkFrame):
+    """
+    Saisie pour douchette code-barres
+    
+    Une douchette USB « tape » le code lu puis Entrée : à chaque Entrée, le
+    champ est vidé aussitôt (le scan suivant peut arriver) et
+    ``on_scan(code)`` est appelé. ``set_status`` affiche le résultat du
+    dernier scan sous le champ.
+    """
+    
+    STATUS_COLORS = {
+        'success': COLORS['accent'],
+        'warning': COLORS['warning'],
+        'danger': COLORS['danger'],
+        'info': COLORS['text_secondary'],
+    }
+    
+    def __init__(self, parent, placeholder='Scanner un code...', on_scan=None, **kwargs):
+        super().__init__(parent, fg_color='transparent')
+        
+        self.on_scan = on_scan
+        
+        container = ctk.CTkFrame(
+            self,
+            fg_color=COLORS['white'],
+            border_width=2,
+            border_color=COLORS['primary'],
+            corner_radius=DIMENSIONS['border_radius']
+        )
+        container.pack(fill='x')
+        
+        ctk.CTkLabel(
+            container,
+            text=ICONS['barcode'],
+            font=ctk.CTkFont(size=16),
+            text_color=COLORS['text_secondary']
+        ).pack(side='left', padx=(15, 5))
+        
+        self.entry = ctk.CTkEntry(
+            container,
+            placeholder_text=placeholder,
+            font=ctk.CTkFont(family=FONTS['family'], size=14),
+            fg_color='transparent',
+            border_width=0,
+            text_color=COLORS['text_primary'],
+            placeholder_text_color=COLORS['text_disabled'],
+            height=40
+        )
+        self.entry.pack(side='left', fill='x', expand=True, padx=5, pady=2)
+        
+        self.status_label = ctk.CTkLabel(
+            self,
+            text="",
+            font=ctk.CTkFont(family=FONTS['family'], size=13),
+            text_color=COLORS['text_secondary'],
+            anchor='w'
+        )
+        self.status_label.pack(fill='x', padx=5, pady=(5, 0))
+        
+        self.entry.bind('<Return>', self._on_scan)
+        self.entry.bind('<KP_Enter>', self._on_scan)
+    
+    def _on_scan(self, event=None):
+        code = self.entry.get().strip()
+        self.entry.delete(0, 'end')
+        if code and self.on_scan:
+            self.on_scan(code)
+    
+    def focus(self):
+        """Donner le focus au champ (la douchette écrit dans le widget actif)"""
+        self.entry.focus_set()
+    
+    def set_status(self, text, kind='info'):
+        """Afficher le résultat du dernier scan (success, warning, danger, info)"""
+        self.status_label.configure(
+            text=text,
+            text_color=self.STATUS_COLORS.get(kind, COLORS['text_secondary'])
+        )
+
+
+class LoadMoreBar(ctk.CTkFrame):
+    """Pied de tableau paginé : compteur de lignes et bouton « Charger plus »"""
+    
+    def __init__(self, parent, on_load_more=None, **kwargs):
+        super().__init__(parent, fg_color='transparent')
+        
+        self.on_load_more = on_load_more
+        
+        self.count_label = ctk.CTkLabel(
+            self,
+            text="",
+            font=ctk.CTkFont(family=FONTS['family'], size=12),
+            text_color=COLORS['text_secondary']
+        )
+        self.count_label.pack(side='left', padx=5)
+        
+        self.load_btn = AnimatedButton(
+            self,
+            text="Charger plus",
+            style='outline',
+            icon=ICONS['arrow_down'],
+            command=self._on_load_more,
+            width=160,
+            height=35
+        )
+        
+        self.set_state(0, False)
+    
+    def _on_load_more(self):
+        if self.on_load_more:
+            self.on_load_more()
+    
+    def set_loading(self):
+        """Indiquer un chargement en cours (le bouton est masqué)"""
+        self.count_label.configure(text="Chargement...")
+        self.load_btn.pack_forget()
+    
+    def set_state(self, count, has_more):
+        """Mettre à jour le compteur et afficher le bouton s'il reste des pages"""
+        self.has_more = has_more
+        suffix = "+" if has_more else ""
+        self.count_label.configure(text=f"{count}{suffix} ligne(s) affichée(s)")
+        
+        if has_more:
+            self.load_btn.pack(side='right', padx=5)
+        else:
+            self.load_btn.pack_forget()
 
 
 class BackgroundFrame(ctk.CTkFrame):
@@ -509,13 +896,20 @@ class BackgroundFrame(ctk.CTkFrame):
 class PasswordChangeDialog(ctk.CTkToplevel):
     """Dialog pour changer le mot de passe"""
     
-    def __init__(self, parent, user, user_type, on_success=None):
+    def __init__(self, parent, user, user_type, on_success=None, worker=None):
         super().__init__(parent)
         
         self.user = user
         self.user_type = user_type
         self.on_success = on_success
         
+        # Écriture hors du thread Tk : worker de la vue appelante, sinon le sien
+        self._own_worker = worker is None
+        if worker is None:
+            from utils.worker import DatabaseWorker
+            worker = DatabaseWorker(self, nb_threads=1)
+        self.worker = worker
+        
         # Configuration de la fenêtre
         self.title("Modifier le mot de passe")
         self.geometry("450x400")
@@ -614,7 +1008,6 @@ class PasswordChangeDialog(ctk.CTkToplevel):
     
     def _save_password(self):
         """Enregistrer le nouveau mot de passe"""
-        from models.database import get_db
         from models.models import Etudiant, Bibliothecaire
         from tkinter import messagebox
         
@@ -641,40 +1034,51 @@ class PasswordChangeDialog(ctk.CTkToplevel):
             return
         
         # Mettre à jour en base
-        db = get_db()
-        try:
-            if self.user_type == 'etudiant':
-                user = db.query(Etudiant).filter(Etudiant.id == self.user.id).first()
-                user.mot_de_passe = Etudiant.hash_password(new)
-            else:
-                user = db.query(Bibliothecaire).filter(Bibliothecaire.id == self.user.id).first()
-                user.mot_de_passe = Bibliothecaire.hash_password(new)
-            
+        user_id = self.user.id
+        modele = Etudiant if self.user_type == 'etudiant' else Bibliothecaire
+        
+        def save(db):
+            user = db.query(modele).filter(modele.id == user_id).first()
+            user.mot_de_passe = modele.hash_password(new)
             db.commit()
+            return user.mot_de_passe
+        
+        def done(mot_de_passe):
+            # Mettre à jour l'objet local (détaché)
+            self.user.mot_de_passe = mot_de_passe
             messagebox.showinfo("Succès", "Mot de passe modifié avec succès !")
             
             if self.on_success:
                 self.on_success()
             
-            self.destroy()
-            
-        except Exception as e:
-            db.rollback()
-            messagebox.showerror("Erreur", f"Erreur: {e}")
-        finally:
-            db.close()
+            if self.winfo_exists():
+                self.destroy()
+        
+        self.worker.soumettre(save, done, lambda e: messagebox.showerror("Erreur", f"Erreur: {e}"))
+    
+    def destroy(self):
+        if self._own_worker:
+            self.worker.arreter()
+        super().destroy()
 
 
 class ProfileEditDialog(ctk.CTkToplevel):
     """Dialog pour modifier le profil"""
     
-    def __init__(self, parent, user, user_type, on_success=None):
+    def __init__(self, parent, user, user_type, on_success=None, worker=None):
         super().__init__(parent)
         
         self.user = user
         self.user_type = user_type
         self.on_success = on_success
         
+        # Écriture hors du thread Tk : worker de la vue appelante, sinon le sien
+        self._own_worker = worker is None
+        if worker is None:
+            from utils.worker import DatabaseWorker
+            worker = DatabaseWorker(self, nb_threads=1)
+        self.worker = worker
+        
         # Configuration de la fenêtre
         self.title("Modifier le profil")
         self.geometry("500x550")
@@ -774,7 +1178,6 @@ class ProfileEditDialog(ctk.CTkToplevel):
     
     def _save_profile(self):
         """Enregistrer les modifications du profil"""
-        from models.database import get_db
         from models.models import Etudiant, Bibliothecaire
         from tkinter import messagebox
         
@@ -793,20 +1196,18 @@ class ProfileEditDialog(ctk.CTkToplevel):
             return
         
         # Mettre à jour en base
-        db = get_db()
-        try:
-            if self.user_type == 'etudiant':
-                user = db.query(Etudiant).filter(Etudiant.id == self.user.id).first()
-            else:
-                user = db.query(Bibliothecaire).filter(Bibliothecaire.id == self.user.id).first()
-            
+        user_id = self.user.id
+        modele = Etudiant if self.user_type == 'etudiant' else Bibliothecaire
+        
+        def save(db):
+            user = db.query(modele).filter(modele.id == user_id).first()
             user.prenom = prenom
             user.nom = nom
             user.email = email
             user.telephone = telephone
-            
             db.commit()
-            
+        
+        def done(_):
             # Mettre à jour l'objet local
             self.user.prenom = prenom
             self.user.nom = nom
@@ -818,10 +1219,12 @@ class ProfileEditDialog(ctk.CTkToplevel):
             if self.on_success:
                 self.on_success()
             
-            self.destroy()
-            
-        except Exception as e:
-            db.rollback()
-            messagebox.showerror("Erreur", f"Erreur: {e}")
-        finally:
-            db.close()
+            if self.winfo_exists():
+                self.destroy()
+        
+        self.worker.soumettre(save, done, lambda e: messagebox.showerror("Erreur", f"Erreur: {e}"))
+    
+    def destroy(self):
+        if self._own_worker:
+            self.worker.arreter()
+        super().destroy()
@@ -4,11 +4,502 @@ Système de Gestion de Bibliothèque - ENSEA
 """
 
 import numpy as np
-from collections import defaultdict
+from scipy import sparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import pickle
+from itertools import repeat
+import json
+import re
+import shutil
+import unicodedata
+import threading
+import weakref
 import os
 
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models.database import DATABASE_PATH
+from models.models import Emprunt
+from services.statistiques import lier_cache
+from utils.cache import CacheTTL
+
+# Snapshots du modèle entraîné, à côté de la base de données
+SNAPSHOT_DIR = os.path.join(os.path.dirname(DATABASE_PATH), 'recommandations')
+# À incrémenter à chaque changement du contenu des snapshots
+SNAPSHOT_VERSION = 3
+
+# Au-delà de ce nombre d'étudiants, le k-means passe en mini-lots
+SEUIL_MINI_LOTS = 10000
+TAILLE_MINI_LOT = 1024
+
+# Recommandations par lots : blocs d'étudiants scorés ensemble, répartis
+# sur plusieurs processus au-delà de SEUIL_PROCESSUS étudiants
+TAILLE_BLOC_ETUDIANTS = 1000
+SEUIL_PROCESSUS = 5000
+# Emprunts lus par requête lors du rattrapage d'un snapshot en retard
+TAILLE_LOT_REJEU = 5000
+# Valeurs max. d'un tableau dense de scores mixtes (étudiants × catalogue)
+TAILLE_SOUS_BLOC_DENSE = 2 ** 24
+
+# Au-delà de ce nombre de livres, les voisins de contenu passent par l'index ANN
+SEUIL_ANN = 20000
+
+# ids des livres populaires, par (n, fenêtre), gardés DUREE_CACHE_POPULAIRES secondes
+# et oubliés avec les statistiques dès qu'un emprunt est validé
+DUREE_CACHE_POPULAIRES = 60
+_cache_populaires = lier_cache(CacheTTL(DUREE_CACHE_POPULAIRES))
+
+# Mots ignorés par l'index de contenu (après suppression des accents)
+MOTS_VIDES = frozenset("""
+    a au aux avec ce ces dans de des du elle en et il ils la le les leur lui
+    mais ou par pour qu que qui sa se ses son sur un une vos votre nous vous
+    an and are as at be by for from in into is it of on or the to with
+""".split())
+
+
+def _distances_carrees(points, centres):
+    """Matrice n × k des distances euclidiennes au carré (sans boucle Python)"""
+    d = (
+        np.einsum('ij,ij->i', points, points)[:, None]
+        - 2.0 * points @ centres.T
+        + np.einsum('ij,ij->i', centres, centres)[None, :]
+    )
+    return np.maximum(d, 0.0)
+
+
+def _init_kmeans_plus_plus(points, n_clusters, rng):
+    """Initialisation k-means++ : centres tirés proportionnellement à D²"""
+    centres = np.empty((n_clusters, points.shape[1]), dtype=points.dtype)
+    centres[0] = points[rng.integers(len(points))]
+    d2 = _distances_carrees(points, centres[:1]).ravel()
+    
+    for c in range(1, n_clusters):
+        total = d2.sum()
+        if total <= 0:
+            # Tous les points restants coïncident avec un centre
+            centres[c:] = points[rng.choice(len(points), n_clusters - c)]
+            break
+        centres[c] = points[rng.choice(len(points), p=d2 / total)]
+        d2 = np.minimum(d2, _distances_carrees(points, centres[c:c + 1]).ravel())
+    
+    return centres
+
+
+def kmeans(points, n_clusters, max_iter=100, tol=1e-4, taille_lot=None, rng=None):
+    """
+    k-means vectorisé (initialisation k-means++, arrêt quand les centres
+    bougent de moins de ``tol``). Avec ``taille_lot``, chaque itération ne
+    traite qu'un échantillon (k-means par mini-lots de Sculley).
+    
+    Retourne (labels, centres).
+    """
+    rng = rng or np.random.default_rng()
+    points = np.asarray(points, dtype=np.float64)
+    centres = _init_kmeans_plus_plus(points, n_clusters, rng)
+    comptes = np.zeros(n_clusters)
+    
+    for _ in range(max_iter):
+        if taille_lot:
+            lot = points[rng.choice(len(points), min(taille_lot, len(points)), replace=False)]
+        else:
+            lot = points
+        
+        labels = _distances_carrees(lot, centres).argmin(axis=1)
+        
+        # Sommes et effectifs par cluster en une passe
+        sommes = np.zeros_like(centres)
+        np.add.at(sommes, labels, lot)
+        effectifs = np.bincount(labels, minlength=n_clusters).astype(np.float64)
+        
+        nouveaux = centres.copy()
+        presents = effectifs > 0
+        if taille_lot:
+            # Taux d'apprentissage 1/n par centre
+            comptes += effectifs
+            taux = np.divide(effectifs, comptes, out=np.zeros_like(comptes), where=comptes > 0)
+            moyennes = sommes[presents] / effectifs[presents, None]
+            nouveaux[presents] += taux[presents, None] * (moyennes - centres[presents])
+        else:
+            nouveaux[presents] = sommes[presents] / effectifs[presents, None]
+        
+        deplacement = np.sqrt(((nouveaux - centres) ** 2).sum(axis=1)).max()
+        centres = nouveaux
+        if deplacement < tol:
+            break
+    
+    labels = _distances_carrees(points, centres).argmin(axis=1)
+    return labels, centres
+
+
+def _k_meilleurs(colonnes, valeurs, k):
+    """Les k plus grandes valeurs (et leurs colonnes), triées par ordre décroissant"""
+    if len(valeurs) > k:
+        meilleurs = np.argpartition(-valeurs, k - 1)[:k]
+        colonnes, valeurs = colonnes[meilleurs], valeurs[meilleurs]
+    ordre = np.argsort(-valeurs, kind='stable')
+    return colonnes[ordre], valeurs[ordre]
+
+
+def _k_meilleurs_par_ligne(lignes, colonnes, valeurs, k):
+    """
+    Garder, pour des triplets (ligne, colonne, valeur), les k plus grandes
+    valeurs de chaque ligne. Retourne (lignes, colonnes, valeurs, rangs),
+    triés par ligne puis par valeur décroissante.
+    """
+    ordre = np.lexsort((-valeurs, lignes))
+    lignes, colonnes, valeurs = lignes[ordre], colonnes[ordre], valeurs[ordre]
+    if len(lignes) == 0:
+        return lignes, colonnes, valeurs, np.empty(0, dtype=np.int64)
+    
+    debuts = np.flatnonzero(np.r_[True, lignes[1:] != lignes[:-1]])
+    tailles = np.diff(np.r_[debuts, len(lignes)])
+    rangs = np.arange(len(lignes)) - np.repeat(debuts, tailles)
+    garder = rangs < k
+    return lignes[garder], colonnes[garder], valeurs[garder], rangs[garder]
+
+
+def _recommander_bloc(matrice, lignes, n_voisins, n, contenu=None, poids_contenu=0.0):
+    """
+    Recommandations collaboratives d'un bloc d'étudiants (lignes de la
+    matrice), avec les mêmes règles que RecommendationSystem._scores_collaboratifs
+    mais en produits creux sur tout le bloc : similarités X[bloc]·Xᵀ, n_voisins
+    plus proches par ligne, scores poids·X, livres déjà empruntés exclus.
+    
+    Avec ``contenu`` = (vecteurs TF-IDF du catalogue, ligne du catalogue de
+    chaque colonne de la matrice), les scores sont mélangés au contenu comme
+    dans RecommendationSystem._scores_mixtes et les colonnes retournées sont
+    des lignes du catalogue.
+    
+    Retourne (lignes, colonnes, scores, rangs) des n meilleurs livres par étudiant.
+    """
+    profils = matrice[lignes]
+    similarites = (profils @ matrice.T).tocoo()
+    garder = (similarites.col != lignes[similarites.row]) & (similarites.data > 0)
+    r, c, v, _ = _k_meilleurs_par_ligne(
+        similarites.row[garder], similarites.col[garder], similarites.data[garder], n_voisins
+    )
+    poids = sparse.csr_matrix((v, (r, c)), shape=similarites.shape)
+    
+    scores = _sans_deja_lus(poids @ matrice, profils)
+    if contenu is not None:
+        vecteurs, positions = contenu
+        r, c, v, rangs = _meilleurs_mixtes(profils, scores, vecteurs, positions, poids_contenu, n)
+    else:
+        r, c, v, rangs = _k_meilleurs_par_ligne(scores.row, scores.col, scores.data, n)
+    return lignes[r], c, v, rangs
+
+
+def _sans_deja_lus(scores, deja_lus):
+    """Scores (COO) strictement positifs, hors des couples (ligne, colonne) de ``deja_lus``"""
+    scores, deja_lus = scores.tocoo(), deja_lus.tocoo()
+    n_colonnes = scores.shape[1]
+    garder = (scores.data > 0) & ~np.isin(
+        scores.row.astype(np.int64) * n_colonnes + scores.col,
+        deja_lus.row.astype(np.int64) * n_colonnes + deja_lus.col
+    )
+    return sparse.coo_matrix(
+        (scores.data[garder], (scores.row[garder], scores.col[garder])), shape=scores.shape
+    )
+
+
+def _meilleurs_mixtes(profils, scores, vecteurs, positions, poids_contenu, n):
+    """
+    Version par bloc de RecommendationSystem._scores_mixtes : les scores
+    collaboratifs (COO, livres déjà lus exclus) passent dans l'espace du
+    catalogue et sont ramenés à [0, 1] par ligne, puis mélangés à la
+    similarité cosinus de chaque livre avec le profil de contenu de
+    l'étudiant (V·pᵀ, p = X[bloc]·V normalisé).
+    
+    Le score de contenu est non nul pour une grande partie du catalogue :
+    il est calculé en tableau dense, par sous-blocs d'au plus
+    TAILLE_SOUS_BLOC_DENSE valeurs. Retourne (lignes, colonnes, scores,
+    rangs) comme _k_meilleurs_par_ligne, colonnes = lignes du catalogue.
+    """
+    n_catalogue = vecteurs.shape[0]
+    connus = np.flatnonzero(positions >= 0)
+    # Colonnes de la matrice d'interactions -> lignes du catalogue
+    passage = sparse.csr_matrix(
+        (np.ones(len(connus), dtype=np.float32), (connus, positions[connus])),
+        shape=(len(positions), n_catalogue)
+    )
+    collaboratifs = (scores.tocsr() @ passage).tocsr()
+    emprunts = (profils @ passage).tocsr()
+    
+    taille = max(1, TAILLE_SOUS_BLOC_DENSE // max(n_catalogue, vecteurs.shape[1]))
+    morceaux = []
+    for debut in range(0, profils.shape[0], taille):
+        fin = min(debut + taille, profils.shape[0])
+        
+        collaboratif = collaboratifs[debut:fin].toarray()
+        maxima = collaboratif.max(axis=1, initial=0)
+        maxima[maxima <= 0] = 1.0
+        collaboratif /= maxima[:, None]
+        
+        lus = emprunts[debut:fin]
+        profil_contenu = (lus @ vecteurs).toarray()
+        normes = np.sqrt((profil_contenu ** 2).sum(axis=1))
+        normes[normes == 0] = 1.0
+        contenu = (vecteurs @ (profil_contenu / normes[:, None]).T).T
+        
+        mixtes = ((1 - poids_contenu) * collaboratif + poids_contenu * contenu).astype(np.float32)
+        lus = lus.tocoo()
+        mixtes[lus.row, lus.col] = 0
+        
+        k = min(n, n_catalogue)
+        colonnes = np.argpartition(-mixtes, k - 1, axis=1)[:, :k]
+        valeurs = np.take_along_axis(mixtes, colonnes, axis=1)
+        lignes = np.repeat(np.arange(debut, fin), k)
+        garder = valeurs.ravel() > 0
+        morceaux.append((lignes[garder], colonnes.ravel()[garder], valeurs.ravel()[garder]))
+    
+    if not morceaux:
+        vide = np.empty(0, dtype=np.int64)
+        return vide, vide, np.empty(0, dtype=np.float32), vide
+    lignes, colonnes, valeurs = (np.concatenate(t) for t in zip(*morceaux))
+    return _k_meilleurs_par_ligne(lignes, colonnes, valeurs, n)
+
+
+# Matrice d'interactions (et contenu du catalogue) reçus une fois par processus de calcul
+_matrice_processus = None
+_contenu_processus = None
+
+
+def _initialiser_processus(data, indices, indptr, forme, contenu=None):
+    global _matrice_processus, _contenu_processus
+    _matrice_processus = sparse.csr_matrix((data, indices, indptr), shape=forme)
+    _contenu_processus = contenu
+
+
+def _recommander_bloc_processus(lignes, n_voisins, n, poids_contenu=0.0):
+    return _recommander_bloc(
+        _matrice_processus, lignes, n_voisins, n, _contenu_processus, poids_contenu
+    )
+
+
+def _position_creuse(indptr, indices, ligne, colonne):
+    """
+    Position de (ligne, colonne) dans une structure CSR/CSC aux indices
+    triés, et si l'élément y est déjà présent.
+    """
+    debut, fin = indptr[ligne], indptr[ligne + 1]
+    position = debut + int(np.searchsorted(indices[debut:fin], colonne))
+    return position, bool(position < fin and indices[position] == colonne)
+
+
+class IndexSimilariteLivres:
+    """
+    Index de similarité livre-livre pré-calculé
+    
+    Pour chaque livre, seuls les K voisins les plus proches sont conservés
+    (tableaux ``voisins`` et ``scores`` de forme n_livres × K, complétés par
+    -1 / 0). Une requête coûte O(K) au lieu d'un parcours des emprunts.
+    """
+    
+    METRIQUES = ('jaccard', 'cosinus')
+    
+    def __init__(self, livre_ids, voisins, scores, metrique='jaccard'):
+        self.livre_ids = np.asarray(livre_ids, dtype=np.int64)
+        self.voisins = voisins
+        self.scores = scores
+        self.metrique = metrique
+        self._position = {int(lid): i for i, lid in enumerate(self.livre_ids)}
+    
+    @property
+    def k(self):
+        return self.voisins.shape[1]
+    
+    @classmethod
+    def construire(cls, interactions, livre_ids, k=20, metrique='jaccard'):
+        """
+        Construire l'index à partir d'une matrice creuse étudiants × livres.
+        
+        Les co-emprunts de toutes les paires sont obtenus en un seul produit
+        creux Xᵀ·X ; seules les paires ayant au moins un lecteur commun
+        existent dans le résultat.
+        """
+        if metrique not in cls.METRIQUES:
+            raise ValueError(f"Métrique inconnue: {metrique}")
+        
+        binaire = (interactions > 0).astype(np.float32).tocsr()
+        lecteurs = np.asarray(binaire.sum(axis=0)).ravel()
+        
+        co_emprunts = (binaire.T @ binaire).tocoo()
+        hors_diagonale = co_emprunts.row != co_emprunts.col
+        lignes = co_emprunts.row[hors_diagonale]
+        colonnes = co_emprunts.col[hors_diagonale]
+        communs = co_emprunts.data[hors_diagonale]
+        
+        if metrique == 'jaccard':
+            valeurs = communs / (lecteurs[lignes] + lecteurs[colonnes] - communs)
+        else:
+            valeurs = communs / np.sqrt(lecteurs[lignes] * lecteurs[colonnes])
+        
+        similarite = sparse.csr_matrix(
+            (valeurs.astype(np.float32), (lignes, colonnes)),
+            shape=co_emprunts.shape
+        )
+        
+        return cls.depuis_similarite(similarite, livre_ids, k, metrique)
+    
+    @classmethod
+    def depuis_similarite(cls, similarite, livre_ids, k=20, metrique='jaccard'):
+        """Garder les K meilleurs voisins de chaque ligne d'une matrice creuse"""
+        n = similarite.shape[0]
+        voisins = np.full((n, k), -1, dtype=np.int64)
+        scores = np.zeros((n, k), dtype=np.float32)
+        livre_ids = np.asarray(livre_ids, dtype=np.int64)
+        
+        for i in range(n):
+            debut, fin = similarite.indptr[i], similarite.indptr[i + 1]
+            if debut == fin:
+                continue
+            cols, vals = _k_meilleurs(
+                similarite.indices[debut:fin], similarite.data[debut:fin], k
+            )
+            voisins[i, :len(cols)] = livre_ids[cols]
+            scores[i, :len(cols)] = vals
+        
+        return cls(livre_ids, voisins, scores, metrique)
+    
+    def voisins_de(self, livre_id, k=None):
+        """Liste [(livre_id, score)] des voisins d'un livre, du plus proche au moins proche"""
+        i = self._position.get(int(livre_id))
+        if i is None:
+            return []
+        k = self.k if k is None else min(k, self.k)
+        return [
+            (int(v), float(s))
+            for v, s in zip(self.voisins[i, :k], self.scores[i, :k])
+            if v >= 0
+        ]
+    
+    def voisins_multiples(self, livre_ids, k=None):
+        """Voisins de plusieurs livres : {livre_id: [(voisin_id, score)]}"""
+        return {int(lid): self.voisins_de(lid, k) for lid in livre_ids}
+    
+    def livres_voisins_de(self, livre_id):
+        """ids des livres dont la liste de voisins contient ``livre_id``"""
+        lignes = np.flatnonzero((self.voisins == int(livre_id)).any(axis=1))
+        return self.livre_ids[lignes].tolist()
+    
+    def remplacer_voisins(self, livre_id, voisins, scores):
+        """Remplacer la liste des voisins d'un livre (ajouté à l'index s'il est nouveau)"""
+        i = self._position.get(int(livre_id))
+        if i is None:
+            i = len(self.livre_ids)
+            self.livre_ids = np.append(self.livre_ids, np.int64(livre_id))
+            self.voisins = np.vstack([self.voisins, np.full((1, self.k), -1, dtype=np.int64)])
+            self.scores = np.vstack([self.scores, np.zeros((1, self.k), dtype=np.float32)])
+            self._position[int(livre_id)] = i
+        
+        n = min(len(voisins), self.k)
+        self.voisins[i] = -1
+        self.scores[i] = 0
+        self.voisins[i, :n] = voisins[:n]
+        self.scores[i, :n] = scores[:n]
+
+
+def _mots(texte):
+    """Mots d'un texte, en minuscules et sans accents, hors mots vides"""
+    if not texte:
+        return []
+    texte = unicodedata.normalize('NFKD', texte.lower())
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    return [m for m in re.findall(r'\w+', texte) if len(m) > 1 and m not in MOTS_VIDES]
+
+
+class IndexContenuLivres:
+    """
+    Vecteurs TF-IDF des livres construits à partir de leurs métadonnées
+    
+    Chaque livre est une ligne L2-normalisée d'une matrice creuse CSR en
+    float32 : le produit scalaire de deux lignes est leur similarité
+    cosinus. Un livre jamais emprunté a donc déjà des voisins.
+    """
+    
+    # Nombre de répétitions des mots de chaque champ (poids relatif)
+    POIDS_CHAMPS = {'titre': 2, 'description': 1, 'categorie': 2, 'auteurs': 2}
+    
+    def __init__(self, livre_ids, vecteurs, vocabulaire):
+        self.livre_ids = np.asarray(livre_ids, dtype=np.int64)
+        self.vecteurs = vecteurs
+        self.vocabulaire = vocabulaire
+        self._position = {int(lid): i for i, lid in enumerate(self.livre_ids)}
+    
+    def __len__(self):
+        return len(self.livre_ids)
+    
+    @classmethod
+    def construire(cls, livres):
+        """
+        Construire l'index depuis des dicts {'id', 'titre', 'description',
+        'categorie', 'auteurs'}. tf = 1 + log(n), idf = log((1 + N) / (1 + df)) + 1.
+        """
+        vocabulaire = {}
+        livre_ids, lignes, colonnes, comptes = [], [], [], []
+        
+        for i, livre in enumerate(livres):
+            livre_ids.append(livre['id'])
+            compte_mots = {}
+            for champ, poids in cls.POIDS_CHAMPS.items():
+                for mot in _mots(livre.get(champ)):
+                    compte_mots[mot] = compte_mots.get(mot, 0) + poids
+            for mot, n in compte_mots.items():
+                lignes.append(i)
+                colonnes.append(vocabulaire.setdefault(mot, len(vocabulaire)))
+                comptes.append(n)
+        
+        n_livres = len(livre_ids)
+        colonnes = np.asarray(colonnes, dtype=np.int32)
+        df = np.bincount(colonnes, minlength=len(vocabulaire))
+        idf = np.log((1.0 + n_livres) / (1.0 + df)) + 1.0
+        valeurs = (1.0 + np.log(np.asarray(comptes, dtype=np.float64))) * idf[colonnes]
+        
+        vecteurs = sparse.csr_matrix(
+            (valeurs.astype(np.float32), (lignes, colonnes)),
+            shape=(n_livres, len(vocabulaire)),
+            dtype=np.float32
+        )
+        normes = np.sqrt(np.asarray(vecteurs.multiply(vecteurs).sum(axis=1)).ravel())
+        normes[normes == 0] = 1.0
+        vecteurs = sparse.diags((1.0 / normes).astype(np.float32)) @ vecteurs
+        
+        return cls(livre_ids, vecteurs.tocsr(), vocabulaire)
+    
+    def positions(self, livre_ids):
+        """Lignes de l'index des livres donnés (-1 pour un livre absent)"""
+        return np.array([self._position.get(int(lid), -1) for lid in livre_ids], dtype=np.int64)
+    
+    def scores(self, livre_ids, poids=None):
+        """
+        Similarité cosinus de tous les livres avec le profil formé par la
+        somme (pondérée par ``poids``) des vecteurs de ``livre_ids``.
+        """
+        positions = self.positions(livre_ids)
+        connus = positions >= 0
+        if not connus.any():
+            return np.zeros(len(self), dtype=np.float32)
+        
+        poids = np.ones(len(positions), dtype=np.float32) if poids is None else np.asarray(poids, dtype=np.float32)
+        profil = sparse.csr_matrix(poids[connus][None, :]) @ self.vecteurs[positions[connus]]
+        norme = np.sqrt(profil.multiply(profil).sum())
+        if norme == 0:
+            return np.zeros(len(self), dtype=np.float32)
+        
+        return np.asarray((self.vecteurs @ (profil.T / norme)).todense(), dtype=np.float32).ravel()
+    
+    def voisins_de(self, livre_id, k=10):
+        """Liste [(livre_id, score)] des livres au contenu le plus proche"""
+        i = self._position.get(int(livre_id))
+        if i is None:
+            return []
+        scores = self.scores([livre_id])
+        scores[i] = 0
+        candidats = np.flatnonzero(scores > 0)
+        candidats, valeurs = _k_meilleurs(candidats, scores[candidats], k)
+        return [(int(self.livre_ids[c]), float(v)) for c, v in zip(candidats, valeurs)]
+
 
 class RecommendationSystem:
     """
@@ -16,37 +507,324 @@ class RecommendationSystem:
     et le clustering des utilisateurs
     """
     
-    def __init__(self, db_session):
+    # Nombre d'étudiants voisins retenus pour le filtrage collaboratif
+    N_VOISINS = 10
+    # Le poids d'un emprunt est divisé par 2 tous les DEMI_VIE_JOURS
+    DEMI_VIE_JOURS = 180
+    # Part du score de contenu dans le score mixte (0 : collaboratif seul)
+    POIDS_CONTENU = 0.3
+    
+    def __init__(self, db_session, snapshot_dir=None):
         self.db = db_session
+        self.snapshot_dir = snapshot_dir or SNAPSHOT_DIR
         self.user_item_matrix = None
         self.item_similarity = None
         self.user_clusters = None
+        self.content_index = None
+        self.ann_index = None
+        # Nombre d'emprunts de chaque case de la matrice (aligné sur .data)
+        self._comptes = None
+        # Filigrane des emprunts pris en compte par le modèle en mémoire
+        self._filigrane_modele = None
+        self._verrou = threading.Lock()
+        # Tenu à jour par les emprunts validés (voir _propager_emprunts)
+        _SYSTEMES_ACTIFS.add(self)
+    
+    # ------------------------------------------------------------------
+    # Entraînement et snapshots
+    # ------------------------------------------------------------------
+    
+    def _filigrane(self):
+        """
+        Filigrane de la table des emprunts : (nombre, id max). Il change dès
+        qu'un emprunt est ajouté ou supprimé, ce qui rend le snapshot périmé.
+        """
+        from models.models import Emprunt
+        from sqlalchemy import func
+        
+        nombre, id_max = self.db.query(func.count(Emprunt.id), func.max(Emprunt.id)).one()
+        return (int(nombre), int(id_max or 0))
+    
+    def entrainer(self, force=False):
+        """
+        Charger le snapshot s'il est à jour. S'il est seulement en retard
+        (emprunts ajoutés depuis, aucun supprimé), le charger, rejouer les
+        emprunts manquants et le réécrire. Sinon (absent, autre version,
+        emprunts supprimés) recalculer la matrice, l'index de similarité et
+        les clusters puis les sauvegarder.
+        Retourne True si le modèle a été recalculé.
+        """
+        filigrane = self._filigrane()
+        if not force:
+            if self.charger_snapshot(filigrane):
+                return False
+            if self.rattraper_snapshot(filigrane):
+                self.sauvegarder_snapshot(self._filigrane_modele)
+                return False
+        
+        self._construire_matrice()
+        self.construire_index_similarite()
+        self.clustering_etudiants()
+        self._filigrane_modele = filigrane
+        self.sauvegarder_snapshot(filigrane)
+        return True
+    
+    def sauvegarder_snapshot(self, filigrane=None):
+        """
+        Écrire les artefacts entraînés dans ``snapshot_dir`` : un fichier
+        .npy par tableau (lisible par mmap) et un manifeste JSON versionné.
+        L'écriture se fait dans un dossier temporaire renommé à la fin.
+        """
+        matrice = self._matrice_interactions()
+        filigrane = filigrane or self._filigrane_modele or self._filigrane()
+        
+        tableaux = {
+            'matrice_data': matrice.data,
+            'matrice_indices': matrice.indices,
+            'matrice_indptr': matrice.indptr,
+            'matrice_comptes': self._comptes,
+            'etudiant_ids': self._etudiant_ids,
+            'livre_ids': self._livre_ids,
+        }
+        if self.item_similarity is not None:
+            tableaux['similarite_livre_ids'] = self.item_similarity.livre_ids
+            tableaux['similarite_voisins'] = self.item_similarity.voisins
+            tableaux['similarite_scores'] = self.item_similarity.scores
+        if self.user_clusters:
+            tableaux['clusters_etudiants'] = np.array(list(self.user_clusters.keys()), dtype=np.int64)
+            tableaux['clusters_labels'] = np.array(list(self.user_clusters.values()), dtype=np.int32)
+        
+        manifeste = {
+            'version': SNAPSHOT_VERSION,
+            'filigrane': [int(x) for x in filigrane],
+            'forme': [int(x) for x in matrice.shape],
+            'metrique': self.item_similarity.metrique if self.item_similarity else None,
+            'tableaux': sorted(tableaux),
+            'date': datetime.now().isoformat(timespec='seconds'),
+        }
+        
+        temporaire = f"{self.snapshot_dir}.tmp-{os.getpid()}"
+        ancien = f"{self.snapshot_dir}.old-{os.getpid()}"
+        shutil.rmtree(temporaire, ignore_errors=True)
+        os.makedirs(temporaire)
+        
+        for nom, tableau in tableaux.items():
+            np.save(os.path.join(temporaire, f"{nom}.npy"), np.ascontiguousarray(tableau))
+        with open(os.path.join(temporaire, 'manifeste.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifeste, f)
+        
+        if os.path.exists(self.snapshot_dir):
+            os.replace(self.snapshot_dir, ancien)
+        os.replace(temporaire, self.snapshot_dir)
+        shutil.rmtree(ancien, ignore_errors=True)
+    
+    def _lire_manifeste(self):
+        """Manifeste du snapshot s'il existe et a la bonne version, sinon None"""
+        chemin_manifeste = os.path.join(self.snapshot_dir, 'manifeste.json')
+        if not os.path.exists(chemin_manifeste):
+            return None
+        
+        try:
+            with open(chemin_manifeste, encoding='utf-8') as f:
+                manifeste = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if manifeste.get('version') != SNAPSHOT_VERSION:
+            return None
+        return manifeste
+    
+    def charger_snapshot(self, filigrane=None):
+        """
+        Charger le snapshot par memory-mapping s'il existe, a la bonne
+        version et correspond au filigrane courant des emprunts.
+        Retourne False (sans rien modifier) si le snapshot est absent ou périmé.
+        """
+        manifeste = self._lire_manifeste()
+        filigrane = filigrane or self._filigrane()
+        if manifeste is None or manifeste.get('filigrane') != list(filigrane):
+            return False
+        
+        # mmap en copie-sur-écriture : pages lues à la demande, jamais réécrites sur disque
+        self._charger_tableaux(manifeste, mmap_mode='c')
+        return True
+    
+    def rattraper_snapshot(self, filigrane=None):
+        """
+        Charger un snapshot en retard sur les emprunts et rejouer, par
+        enregistrer_emprunt, ceux d'id supérieur à son id max. Possible
+        seulement si aucun emprunt qu'il couvre n'a été supprimé depuis.
+        Retourne False (sans rien modifier) si le snapshot est absent, d'une
+        autre version ou si des emprunts ont été supprimés.
+        """
+        from models.models import Emprunt
+        from sqlalchemy import func
+        
+        manifeste = self._lire_manifeste()
+        if manifeste is None:
+            return False
+        
+        nombre, id_max = manifeste['filigrane']
+        filigrane = filigrane or self._filigrane()
+        if filigrane[1] < id_max or filigrane[0] < nombre:
+            return False
+        # Emprunts couverts par le snapshot encore présents
+        couverts = self.db.query(func.count(Emprunt.id)).filter(Emprunt.id <= id_max).scalar()
+        if couverts != nombre:
+            return False
+        
+        # Tableaux copiés en mémoire : le dossier du snapshot est réécrit ensuite
+        self._charger_tableaux(manifeste, mmap_mode=None)
+        self._filigrane_modele = (nombre, id_max)
+        
+        nouveaux = self.db.query(Emprunt.id, Emprunt.etudiant_id, Emprunt.livre_id).filter(
+            Emprunt.id > id_max
+        ).order_by(Emprunt.id).yield_per(TAILLE_LOT_REJEU)
+        for emprunt_id, etudiant_id, livre_id in nouveaux:
+            self.enregistrer_emprunt(etudiant_id, livre_id, emprunt_id)
+        return True
+    
+    def _charger_tableaux(self, manifeste, mmap_mode):
+        """Installer les tableaux du snapshot (aucun objet Python désérialisé)"""
+        t = {
+            nom: np.load(
+                os.path.join(self.snapshot_dir, f"{nom}.npy"), mmap_mode=mmap_mode, allow_pickle=False
+            )
+            for nom in manifeste['tableaux']
+        }
+        
+        self.user_item_matrix = sparse.csr_matrix(
+            (t['matrice_data'], t['matrice_indices'], t['matrice_indptr']),
+            shape=tuple(manifeste['forme']),
+            copy=False
+        )
+        self._comptes = t['matrice_comptes']
+        self._indexer(t['etudiant_ids'], t['livre_ids'])
+        self._filigrane_modele = tuple(manifeste['filigrane'])
+        
+        if 'similarite_voisins' in t:
+            self.item_similarity = IndexSimilariteLivres(
+                t['similarite_livre_ids'], t['similarite_voisins'], t['similarite_scores'],
+                manifeste.get('metrique') or 'jaccard'
+            )
+        if 'clusters_etudiants' in t:
+            self.user_clusters = {
+                int(e): int(c) for e, c in zip(t['clusters_etudiants'], t['clusters_labels'])
+            }
+    
+    # ------------------------------------------------------------------
+    # Matrice d'interactions
+    # ------------------------------------------------------------------
     
-    def _get_emprunt_data(self):
-        """Récupérer les données d'emprunts pour l'analyse"""
-        from models.models import Emprunt, Etudiant, Livre
+    def _poids_implicites(self, nb_emprunts, derniers_emprunts):
+        """
+        Poids implicite d'un couple étudiant-livre : les emprunts répétés
+        comptent de façon logarithmique et le poids décroît avec l'ancienneté
+        du dernier emprunt.
+        """
+        maintenant = datetime.now()
+        ages = np.array([
+            (maintenant - date).total_seconds() / 86400 if date else 0.0
+            for date in derniers_emprunts
+        ], dtype=np.float32)
+        recence = np.power(0.5, np.clip(ages, 0, None) / self.DEMI_VIE_JOURS)
+        return (self._poids_repetition(nb_emprunts) * recence).astype(np.float32)
+    
+    @staticmethod
+    def _poids_repetition(nb_emprunts):
+        """Les emprunts répétés d'un même livre comptent de façon logarithmique"""
+        return 1.0 + np.log(np.asarray(nb_emprunts, dtype=np.float32))
+    
+    def _matrice_interactions(self):
+        """
+        Matrice creuse CSR étudiants × livres des poids implicites, chargée
+        depuis le snapshot ou recalculée s'il est périmé, puis gardée en cache.
+        """
+        if self.user_item_matrix is None:
+            self.entrainer()
+        return self.user_item_matrix
+    
+    def _indexer(self, etudiant_ids, livre_ids):
+        """Correspondances id ↔ ligne/colonne de la matrice"""
+        self._etudiant_ids = etudiant_ids
+        self._livre_ids = livre_ids
+        self._index_etudiants = {int(e): i for i, e in enumerate(etudiant_ids)}
+        self._index_livres = {int(l): i for i, l in enumerate(livre_ids)}
+        # Copie par colonnes pour lire rapidement les lecteurs d'un livre
+        # (seule sa structure sert : ses poids ne sont pas tenus à jour)
+        self._matrice_colonnes = self.user_item_matrix.tocsc()
+    
+    def _construire_matrice(self):
+        """Construire la matrice en une seule requête agrégée sur les emprunts"""
+        from models.models import Emprunt
+        from sqlalchemy import func
         
-        emprunts = self.db.query(Emprunt).all()
+        couples = self.db.query(
+            Emprunt.etudiant_id,
+            Emprunt.livre_id,
+            func.count(Emprunt.id),
+            func.max(Emprunt.date_emprunt)
+        ).group_by(Emprunt.etudiant_id, Emprunt.livre_id).all()
         
-        # Créer une matrice utilisateur-livre
-        user_books = defaultdict(list)
-        book_users = defaultdict(list)
+        etudiant_ids = np.array(sorted({c[0] for c in couples}), dtype=np.int64)
+        livre_ids = np.array(sorted({c[1] for c in couples}), dtype=np.int64)
+        index_etudiants = {int(e): i for i, e in enumerate(etudiant_ids)}
+        index_livres = {int(l): i for i, l in enumerate(livre_ids)}
         
-        for emprunt in emprunts:
-            user_books[emprunt.etudiant_id].append(emprunt.livre_id)
-            book_users[emprunt.livre_id].append(emprunt.etudiant_id)
+        lignes = np.array([index_etudiants[c[0]] for c in couples], dtype=np.int64)
+        colonnes = np.array([index_livres[c[1]] for c in couples], dtype=np.int64)
+        comptes = np.array([c[2] for c in couples], dtype=np.int32)
+        poids = self._poids_implicites(comptes, [c[3] for c in couples])
         
-        return user_books, book_users
+        # CSR canonique (indices triés par ligne) construit directement, pour
+        # garder les comptes alignés sur les poids et permettre les insertions
+        ordre = np.lexsort((colonnes, lignes))
+        indptr = np.zeros(len(etudiant_ids) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(lignes, minlength=len(etudiant_ids)), out=indptr[1:])
+        
+        self.user_item_matrix = sparse.csr_matrix(
+            (poids[ordre], colonnes[ordre].astype(np.int32), indptr),
+            shape=(len(etudiant_ids), len(livre_ids))
+        )
+        self._comptes = comptes[ordre]
+        self._indexer(etudiant_ids, livre_ids)
+        return self.user_item_matrix
+    
+    def construire_index_similarite(self, k=20, metrique='jaccard'):
+        """Pré-calculer les K plus proches voisins de chaque livre"""
+        matrice = self._matrice_interactions()
+        self.item_similarity = IndexSimilariteLivres.construire(
+            matrice, self._livre_ids, k=k, metrique=metrique
+        )
+        return self.item_similarity
+    
+    def voisins_livres(self, livre_ids, k=10):
+        """
+        Voisins pré-calculés d'un ou plusieurs livres.
+        Retourne [(livre_id, score)] pour un id, {livre_id: [...]} pour une liste.
+        """
+        self._matrice_interactions()
+        if self.item_similarity is None:
+            self.construire_index_similarite()
+        
+        if isinstance(livre_ids, (list, tuple, set, np.ndarray)):
+            return self.item_similarity.voisins_multiples(livre_ids, k)
+        return self.item_similarity.voisins_de(livre_ids, k)
+    
+    def livres_similaires(self, livre_id, n=5):
+        """Livres les plus souvent empruntés avec ``livre_id``"""
+        ids = [lid for lid, _ in self.voisins_livres(livre_id, n)]
+        return self._livres_par_ids(ids)
     
     def calculer_similarite_livres(self, livre_id1, livre_id2):
         """
         Calculer la similarité entre deux livres basée sur les co-emprunts
         Utilise le coefficient de Jaccard
         """
-        _, book_users = self._get_emprunt_data()
+        self._matrice_interactions()
         
-        users1 = set(book_users.get(livre_id1, []))
-        users2 = set(book_users.get(livre_id2, []))
+        users1 = self._lecteurs(livre_id1)
+        users2 = self._lecteurs(livre_id2)
         
         if not users1 or not users2:
             return 0.0
@@ -56,72 +834,485 @@ class RecommendationSystem:
         
         return intersection / union if union > 0 else 0.0
     
+    def _lecteurs(self, livre_id):
+        """Indices des étudiants ayant emprunté un livre"""
+        j = self._index_livres.get(livre_id)
+        if j is None:
+            return set()
+        debut, fin = self._matrice_colonnes.indptr[j], self._matrice_colonnes.indptr[j + 1]
+        return set(self._matrice_colonnes.indices[debut:fin].tolist())
+    
+    # ------------------------------------------------------------------
+    # Mises à jour incrémentales
+    # ------------------------------------------------------------------
+    
+    def enregistrer_emprunt(self, etudiant_id, livre_id, emprunt_id=None):
+        """
+        Prendre en compte un nouvel emprunt sans ré-entraîner le modèle.
+        
+        La case (étudiant, livre) de la matrice est créée ou incrémentée sur
+        place ; si l'étudiant lit ce livre pour la première fois, ses
+        co-emprunts changent et seules les listes de voisins touchées sont
+        recalculées. Sans modèle chargé, il n'y a rien à faire.
+        Retourne True si le modèle en mémoire a été mis à jour.
+        """
+        with self._verrou:
+            if self.user_item_matrix is None:
+                return False
+            
+            i = self._ligne_etudiant(etudiant_id)
+            j = self._colonne_livre(livre_id)
+            nouveau_lecteur = self._incrementer(i, j)
+            
+            if nouveau_lecteur and self.item_similarity is not None:
+                self._mettre_a_jour_voisins(i, j)
+            
+            if self._filigrane_modele is not None and emprunt_id is not None:
+                nombre, id_max = self._filigrane_modele
+                self._filigrane_modele = (nombre + 1, max(id_max, int(emprunt_id)))
+            return True
+    
+    def _ligne_etudiant(self, etudiant_id):
+        """Ligne de l'étudiant, ajoutée (vide) en bas de la matrice s'il est nouveau"""
+        i = self._index_etudiants.get(etudiant_id)
+        if i is not None:
+            return i
+        
+        matrice = self.user_item_matrix
+        i = matrice.shape[0]
+        indptr = np.append(matrice.indptr, matrice.indptr[-1])
+        self.user_item_matrix = sparse.csr_matrix(
+            (matrice.data, matrice.indices, indptr),
+            shape=(i + 1, matrice.shape[1]),
+            copy=False
+        )
+        colonnes = self._matrice_colonnes
+        self._matrice_colonnes = sparse.csc_matrix(
+            (colonnes.data, colonnes.indices, colonnes.indptr),
+            shape=(i + 1, colonnes.shape[1]),
+            copy=False
+        )
+        self._etudiant_ids = np.append(self._etudiant_ids, np.int64(etudiant_id))
+        self._index_etudiants[int(etudiant_id)] = i
+        return i
+    
+    def _colonne_livre(self, livre_id):
+        """Colonne du livre, ajoutée (vide) à droite de la matrice s'il est nouveau"""
+        j = self._index_livres.get(livre_id)
+        if j is not None:
+            return j
+        
+        matrice = self.user_item_matrix
+        j = matrice.shape[1]
+        self.user_item_matrix = sparse.csr_matrix(
+            (matrice.data, matrice.indices, matrice.indptr),
+            shape=(matrice.shape[0], j + 1),
+            copy=False
+        )
+        colonnes = self._matrice_colonnes
+        indptr = np.append(colonnes.indptr, colonnes.indptr[-1])
+        self._matrice_colonnes = sparse.csc_matrix(
+            (colonnes.data, colonnes.indices, indptr),
+            shape=(colonnes.shape[0], j + 1),
+            copy=False
+        )
+        self._livre_ids = np.append(self._livre_ids, np.int64(livre_id))
+        self._index_livres[int(livre_id)] = j
+        return j
+    
+    def _incrementer(self, i, j):
+        """
+        Ajouter un emprunt à la case (i, j). Un emprunt qui vient d'avoir lieu
+        n'est pas atténué : le poids vaut 1 + log(n). Retourne True si la
+        case n'existait pas (nouveau couple étudiant-livre).
+        """
+        matrice = self.user_item_matrix
+        position, existe = _position_creuse(matrice.indptr, matrice.indices, i, j)
+        
+        if existe:
+            self._comptes[position] += 1
+            matrice.data[position] = self._poids_repetition(self._comptes[position])
+            return False
+        
+        # Insertion dans les deux structures : décalage des tableaux en O(nnz),
+        # sans requête ni recalcul des similarités
+        poids = self._poids_repetition(1)
+        indptr = matrice.indptr.copy()
+        indptr[i + 1:] += 1
+        self.user_item_matrix = sparse.csr_matrix(
+            (
+                np.insert(matrice.data, position, poids),
+                np.insert(matrice.indices, position, j),
+                indptr
+            ),
+            shape=matrice.shape,
+            copy=False
+        )
+        self._comptes = np.insert(self._comptes, position, 1)
+        
+        colonnes = self._matrice_colonnes
+        position, _ = _position_creuse(colonnes.indptr, colonnes.indices, j, i)
+        indptr = colonnes.indptr.copy()
+        indptr[j + 1:] += 1
+        self._matrice_colonnes = sparse.csc_matrix(
+            (
+                np.insert(colonnes.data, position, poids),
+                np.insert(colonnes.indices, position, i),
+                indptr
+            ),
+            shape=colonnes.shape,
+            copy=False
+        )
+        return True
+    
+    def _mettre_a_jour_voisins(self, i, j):
+        """
+        Recalculer les voisins des livres dont les similarités ont changé
+        quand l'étudiant i devient lecteur du livre j : j lui-même, les autres
+        livres de l'étudiant (co-emprunt +1 avec j) et les livres qui avaient
+        j parmi leurs voisins (le nombre de lecteurs de j a changé).
+        """
+        matrice = self.user_item_matrix
+        index = self.item_similarity
+        
+        touches = set(matrice.indices[matrice.indptr[i]:matrice.indptr[i + 1]].tolist())
+        touches.update(
+            self._index_livres[lid]
+            for lid in index.livres_voisins_de(self._livre_ids[j])
+            if lid in self._index_livres
+        )
+        
+        for c in touches:
+            voisins, scores = self._voisins_exacts(c, index.k, index.metrique)
+            index.remplacer_voisins(self._livre_ids[c], voisins, scores)
+    
+    def _voisins_exacts(self, c, k, metrique):
+        """
+        Les k voisins de la colonne c, calculés sur ses seuls lecteurs : les
+        co-emprunts sont le nombre d'apparitions de chaque livre dans leurs
+        lignes. Mêmes valeurs que IndexSimilariteLivres.construire.
+        """
+        matrice = self.user_item_matrix
+        colonnes = self._matrice_colonnes
+        lecteurs = colonnes.indices[colonnes.indptr[c]:colonnes.indptr[c + 1]]
+        if len(lecteurs) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        livres = np.concatenate([
+            matrice.indices[matrice.indptr[r]:matrice.indptr[r + 1]] for r in lecteurs
+        ])
+        communs = np.bincount(livres, minlength=matrice.shape[1]).astype(np.float32)
+        communs[c] = 0
+        candidats = np.flatnonzero(communs)
+        
+        nb_lecteurs = np.diff(colonnes.indptr).astype(np.float32)
+        if metrique == 'jaccard':
+            valeurs = communs[candidats] / (nb_lecteurs[c] + nb_lecteurs[candidats] - communs[candidats])
+        else:
+            valeurs = communs[candidats] / np.sqrt(nb_lecteurs[c] * nb_lecteurs[candidats])
+        
+        candidats, valeurs = _k_meilleurs(candidats, valeurs.astype(np.float32), k)
+        return self._livre_ids[candidats], valeurs
+    
+    def _scores_collaboratifs(self, ligne):
+        """
+        Scores de tous les livres pour l'étudiant de la ligne ``ligne``.
+        
+        Similarité avec les autres étudiants : produit creux X·u. Score des
+        livres : somme pondérée des profils des N_VOISINS plus proches,
+        Xᵀ[voisins]·sim[voisins]. Les livres déjà empruntés valent 0.
+        """
+        matrice = self.user_item_matrix
+        profil = matrice.getrow(ligne)
+        
+        similarites = np.asarray((matrice @ profil.T).todense()).ravel()
+        similarites[ligne] = 0
+        
+        candidats = np.flatnonzero(similarites > 0)
+        if len(candidats) > self.N_VOISINS:
+            meilleurs = np.argpartition(-similarites[candidats], self.N_VOISINS - 1)
+            candidats = candidats[meilleurs[:self.N_VOISINS]]
+        
+        scores = matrice[candidats].T @ similarites[candidats]
+        scores[profil.indices] = 0
+        return scores
+    
+    def _meilleurs_livres(self, scores, n, livre_ids=None):
+        """ids des n livres au score strictement positif le plus élevé"""
+        livre_ids = self._livre_ids if livre_ids is None else livre_ids
+        positifs = np.flatnonzero(scores > 0)
+        if len(positifs) > n:
+            positifs = positifs[np.argpartition(-scores[positifs], n - 1)[:n]]
+        ordre = positifs[np.argsort(-scores[positifs], kind='stable')]
+        return [int(livre_ids[j]) for j in ordre]
+    
+    def _livres_par_ids(self, livre_ids):
+        """Objets Livre dans l'ordre des ids donnés"""
+        from models.models import Livre
+        
+        if not livre_ids:
+            return []
+        livres = {l.id: l for l in self.db.query(Livre).filter(Livre.id.in_(livre_ids)).all()}
+        return [livres[lid] for lid in livre_ids if lid in livres]
+    
     def recommander_pour_etudiant(self, etudiant_id, n_recommendations=5):
         """
         Recommander des livres pour un étudiant basé sur ses emprunts précédents
         et ceux des étudiants similaires
         """
-        from models.models import Livre, Emprunt
-        
-        user_books, book_users = self._get_emprunt_data()
+        self._matrice_interactions()
         
-        # Livres déjà empruntés par l'étudiant
-        livres_empruntes = set(user_books.get(etudiant_id, []))
-        
-        if not livres_empruntes:
+        ligne = self._index_etudiants.get(etudiant_id)
+        if ligne is None:
             # Si l'étudiant n'a pas d'historique, recommander les livres populaires
             return self.livres_populaires(n_recommendations)
         
-        # Trouver les étudiants similaires (qui ont emprunté les mêmes livres)
-        etudiants_similaires = defaultdict(int)
-        for livre_id in livres_empruntes:
-            for autre_etudiant in book_users.get(livre_id, []):
-                if autre_etudiant != etudiant_id:
-                    etudiants_similaires[autre_etudiant] += 1
-        
-        # Trier par similarité
-        etudiants_similaires = sorted(
-            etudiants_similaires.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:10]  # Top 10 étudiants similaires
-        
-        # Collecter les livres recommandés
-        livres_recommandes = defaultdict(float)
-        for autre_etudiant, score_similarite in etudiants_similaires:
-            for livre_id in user_books.get(autre_etudiant, []):
-                if livre_id not in livres_empruntes:
-                    livres_recommandes[livre_id] += score_similarite
-        
-        # Trier et retourner les top N
-        recommendations = sorted(
-            livres_recommandes.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:n_recommendations]
-        
-        # Récupérer les objets Livre
-        livre_ids = [lid for lid, _ in recommendations]
+        scores = self._scores_collaboratifs(ligne)
+        if self.POIDS_CONTENU > 0:
+            scores, catalogue = self._scores_mixtes(ligne, scores)
+            livre_ids = self._meilleurs_livres(scores, n_recommendations, catalogue)
+        else:
+            livre_ids = self._meilleurs_livres(scores, n_recommendations)
         if not livre_ids:
             return self.livres_populaires(n_recommendations)
         
-        livres = self.db.query(Livre).filter(Livre.id.in_(livre_ids)).all()
-        return livres
+        return self._livres_par_ids(livre_ids)
     
-    def livres_populaires(self, n=5):
-        """Retourner les livres les plus empruntés"""
-        from models.models import Livre, Emprunt
-        from sqlalchemy import func
+    # ------------------------------------------------------------------
+    # Recommandations par le contenu
+    # ------------------------------------------------------------------
+    
+    def construire_index_contenu(self):
+        """Construire l'index TF-IDF du catalogue (deux requêtes)"""
+        from models.models import Livre, Auteur, livre_auteur
         
-        # Compter les emprunts par livre
-        popular = self.db.query(
-            Livre,
-            func.count(Emprunt.id).label('nb_emprunts')
-        ).outerjoin(Emprunt).group_by(Livre.id).order_by(
-            func.count(Emprunt.id).desc()
-        ).limit(n).all()
+        auteurs = {}
+        for livre_id, prenom, nom in self.db.query(
+            livre_auteur.c.livre_id, Auteur.prenom, Auteur.nom
+        ).join(Auteur, Auteur.id == livre_auteur.c.auteur_id):
+            auteurs.setdefault(livre_id, []).append(f"{prenom or ''} {nom}")
+        
+        livres = (
+            {
+                'id': livre_id,
+                'titre': titre,
+                'description': description,
+                'categorie': categorie,
+                'auteurs': " ".join(auteurs.get(livre_id, [])),
+            }
+            for livre_id, titre, description, categorie in self.db.query(
+                Livre.id, Livre.titre, Livre.description, Livre.categorie
+            ).order_by(Livre.id)
+        )
+        
+        self.content_index = IndexContenuLivres.construire(livres)
+        return self.content_index
+    
+    def _index_contenu(self):
+        if self.content_index is None:
+            self.construire_index_contenu()
+        return self.content_index
+    
+    def construire_index_ann(self, nprobe=8):
+        """
+        Index ANN (IVF) sur les vecteurs de contenu réduits par projection
+        aléatoire, pour les catalogues où la recherche exhaustive est trop lente.
+        """
+        from utils.ann import IndexIVF, projection_aleatoire
+        
+        index = self._index_contenu()
+        # Vecteurs denses alignés sur les lignes de l'index de contenu
+        self._vecteurs_ann = projection_aleatoire(index.vecteurs)
+        self.ann_index = IndexIVF.construire(self._vecteurs_ann, index.livre_ids, nprobe=nprobe)
+        return self.ann_index
+    
+    def livres_similaires_contenu(self, livre_id, n=5):
+        """Livres dont les métadonnées ressemblent le plus à celles de ``livre_id``"""
+        index = self._index_contenu()
+        if len(index) > SEUIL_ANN:
+            if self.ann_index is None:
+                self.construire_index_ann()
+            position = index.positions([livre_id])[0]
+            if position < 0:
+                return []
+            trouves, _ = self.ann_index.rechercher(self._vecteurs_ann[position], n + 1)
+            ids = [int(lid) for lid in trouves if lid != livre_id][:n]
+        else:
+            ids = [lid for lid, _ in index.voisins_de(livre_id, n)]
+        return self._livres_par_ids(ids)
+    
+    def _scores_mixtes(self, ligne, scores_collaboratifs):
+        """
+        Score mixte de tous les livres du catalogue pour l'étudiant de la
+        ligne ``ligne`` : (1 - POIDS_CONTENU) × score collaboratif ramené à
+        [0, 1] + POIDS_CONTENU × similarité cosinus avec le profil de contenu
+        de ses emprunts. Retourne (scores, livre_ids) alignés sur l'index de contenu.
+        """
+        index = self._index_contenu()
+        profil = self.user_item_matrix.getrow(ligne)
+        lus = self._livre_ids[profil.indices]
+        
+        collaboratif = np.zeros(len(index), dtype=np.float32)
+        positions = index.positions(self._livre_ids)
+        connus = positions >= 0
+        collaboratif[positions[connus]] = scores_collaboratifs[connus]
+        if collaboratif.max() > 0:
+            collaboratif /= collaboratif.max()
+        
+        contenu = index.scores(lus, profil.data)
+        scores = (1 - self.POIDS_CONTENU) * collaboratif + self.POIDS_CONTENU * contenu
+        
+        deja_lus = index.positions(lus)
+        scores[deja_lus[deja_lus >= 0]] = 0
+        return scores, index.livre_ids
+    
+    def recommander_en_lot(self, etudiant_ids=None, n_recommendations=5, processus=None):
+        """
+        Recommandations de plusieurs étudiants (tous par défaut) en une seule
+        passe vectorisée, par blocs de TAILLE_BLOC_ETUDIANTS.
+        
+        Les scores sont mélangés au contenu (POIDS_CONTENU) comme dans
+        recommander_pour_etudiant. ``processus`` fixe le nombre de processus
+        de calcul ; par défaut un pool est utilisé au-delà de SEUIL_PROCESSUS
+        étudiants. Les étudiants sans historique reçoivent les livres populaires.
+        Retourne {etudiant_id: [(livre_id, score, source)]}.
+        """
+        from models.models import Etudiant
+        
+        matrice = self._matrice_interactions()
+        if etudiant_ids is None:
+            etudiant_ids = [e for (e,) in self.db.query(Etudiant.id).all()]
+        
+        lignes = np.array(
+            [self._index_etudiants[e] for e in etudiant_ids if e in self._index_etudiants],
+            dtype=np.int64
+        )
+        blocs = [
+            lignes[i:i + TAILLE_BLOC_ETUDIANTS]
+            for i in range(0, len(lignes), TAILLE_BLOC_ETUDIANTS)
+        ]
+        
+        # Colonnes des résultats : livres de la matrice, ou du catalogue avec le contenu
+        if self.POIDS_CONTENU > 0:
+            index = self._index_contenu()
+            contenu = (index.vecteurs, index.positions(self._livre_ids))
+            livre_ids, source = index.livre_ids, 'mixte'
+        else:
+            contenu = None
+            livre_ids, source = self._livre_ids, 'collaboratif'
+        
+        if processus is None:
+            processus = os.cpu_count() if len(lignes) > SEUIL_PROCESSUS else 1
+        
+        if processus > 1 and len(blocs) > 1:
+            with ProcessPoolExecutor(
+                max_workers=processus,
+                initializer=_initialiser_processus,
+                initargs=(matrice.data, matrice.indices, matrice.indptr, matrice.shape, contenu)
+            ) as pool:
+                morceaux = list(pool.map(
+                    _recommander_bloc_processus, blocs,
+                    repeat(self.N_VOISINS), repeat(n_recommendations), repeat(self.POIDS_CONTENU)
+                ))
+        else:
+            morceaux = [
+                _recommander_bloc(
+                    matrice, bloc, self.N_VOISINS, n_recommendations, contenu, self.POIDS_CONTENU
+                )
+                for bloc in blocs
+            ]
+        
+        resultats = {int(e): [] for e in etudiant_ids}
+        for bloc_lignes, bloc_colonnes, bloc_scores, _ in morceaux:
+            for ligne, colonne, score in zip(bloc_lignes, bloc_colonnes, bloc_scores):
+                resultats[int(self._etudiant_ids[ligne])].append(
+                    (int(livre_ids[colonne]), float(score), source)
+                )
+        
+        populaires = None
+        for etudiant_id, recommandations in resultats.items():
+            if not recommandations:
+                if populaires is None:
+                    populaires = [
+                        (livre.id, 0.0, 'populaire')
+                        for livre in self.livres_populaires(n_recommendations)
+                    ]
+                resultats[etudiant_id] = list(populaires)
+        
+        return resultats
+    
+    def enregistrer_recommandations(self, resultats):
+        """
+        Remplacer en base les recommandations des étudiants de ``resultats``
+        (suppression puis insertion groupée, dans une seule transaction).
+        Retourne le nombre de lignes écrites.
+        """
+        from models.models import Recommandation
+        from sqlalchemy import delete, insert
+        
+        maintenant = datetime.now()
+        etudiant_ids = list(resultats)
+        
+        for i in range(0, len(etudiant_ids), 500):
+            self.db.execute(
+                delete(Recommandation).where(
+                    Recommandation.etudiant_id.in_(etudiant_ids[i:i + 500])
+                )
+            )
+        
+        lignes = [
+            {
+                'etudiant_id': etudiant_id,
+                'livre_id': livre_id,
+                'rang': rang,
+                'score': score,
+                'source': source,
+                'date_calcul': maintenant,
+            }
+            for etudiant_id, recommandations in resultats.items()
+            for rang, (livre_id, score, source) in enumerate(recommandations, start=1)
+        ]
+        if lignes:
+            self.db.execute(insert(Recommandation), lignes)
+        self.db.commit()
+        return len(lignes)
+    
+    def calculer_recommandations(self, etudiant_ids=None, n_recommendations=5, processus=None):
+        """Calculer par lots puis enregistrer les recommandations lues par les tableaux de bord"""
+        resultats = self.recommander_en_lot(etudiant_ids, n_recommendations, processus)
+        return self.enregistrer_recommandations(resultats)
+    
+    def livres_populaires(self, n=5, fenetre='total'):
+        """
+        Retourner les livres les plus empruntés.
+        
+        ``fenetre`` : 'total' (tous les emprunts, par défaut), '30j' ou '90j'
+        (popularité récente, à décroissance exponentielle). Le classement est
+        lu sur l'index des compteurs de PopulariteLivre et mis en cache jusqu'au
+        prochain emprunt validé (au plus DUREE_CACHE_POPULAIRES secondes).
+        """
+        ids = _cache_populaires.get_or_compute(
+            (n, fenetre), lambda: self._ids_populaires(n, fenetre)
+        )
+        return self._livres_par_ids(ids)
+    
+    def _ids_populaires(self, n, fenetre):
+        """Top N des compteurs, complété par d'autres livres s'il y en a moins de N"""
+        from models.models import Livre, PopulariteLivre
         
-        return [livre for livre, _ in popular]
+        colonne = PopulariteLivre.colonne(fenetre)
+        ids = [
+            livre_id for (livre_id,) in self.db.query(PopulariteLivre.livre_id).filter(
+                colonne.isnot(None)
+            ).order_by(colonne.desc()).limit(n)
+        ]
+        if len(ids) < n:
+            ids += [
+                livre_id for (livre_id,) in self.db.query(Livre.id).filter(
+                    Livre.id.notin_(ids)
+                ).order_by(Livre.id).limit(n - len(ids))
+            ]
+        return ids
     
     def livres_par_categorie(self, categorie, n=5):
         """Recommander des livres d'une catégorie spécifique"""
@@ -132,107 +1323,104 @@ class RecommendationSystem:
             Livre.quantite_disponible > 0
         ).limit(n).all()
     
-    def clustering_etudiants(self, n_clusters=3):
+    def _profils_categories(self):
         """
-        Regrouper les étudiants en clusters basés sur leurs habitudes d'emprunt
-        Utilise un algorithme simple de clustering basé sur les catégories
+        Matrice étudiants × catégories des nombres d'emprunts, obtenue par
+        une seule requête agrégée (GROUP BY étudiant, catégorie).
         """
-        from models.models import Etudiant, Emprunt, Livre
-        
-        etudiants = self.db.query(Etudiant).all()
+        from models.models import Emprunt, Livre
+        from sqlalchemy import func
         
-        # Créer un profil pour chaque étudiant basé sur les catégories empruntées
-        profils = {}
-        categories = set()
+        comptes = self.db.query(
+            Emprunt.etudiant_id,
+            Livre.categorie,
+            func.count(Emprunt.id)
+        ).join(Livre, Emprunt.livre_id == Livre.id).filter(
+            Livre.categorie.isnot(None)
+        ).group_by(Emprunt.etudiant_id, Livre.categorie).all()
         
-        for etudiant in etudiants:
-            cat_count = defaultdict(int)
-            for emprunt in etudiant.emprunts:
-                if emprunt.livre and emprunt.livre.categorie:
-                    cat_count[emprunt.livre.categorie] += 1
-                    categories.add(emprunt.livre.categorie)
-            profils[etudiant.id] = cat_count
+        etudiant_ids = sorted({e for e, _, _ in comptes})
+        categories = sorted({c for _, c, _ in comptes})
+        index_etudiants = {e: i for i, e in enumerate(etudiant_ids)}
+        index_categories = {c: j for j, c in enumerate(categories)}
         
-        categories = list(categories)
+        features = np.zeros((len(etudiant_ids), len(categories)), dtype=np.float64)
+        for etudiant_id, categorie, n in comptes:
+            features[index_etudiants[etudiant_id], index_categories[categorie]] = n
         
-        if not categories:
-            return {}
+        return etudiant_ids, categories, features
+    
+    def clustering_etudiants(self, n_clusters=3, max_iter=100, tol=1e-4, taille_lot=None):
+        """
+        Regrouper les étudiants en clusters basés sur leurs habitudes d'emprunt
+        (k-means vectorisé sur les profils de catégories)
         
-        # Créer la matrice de features
-        features = []
-        etudiant_ids = []
-        for etudiant_id, cat_count in profils.items():
-            if sum(cat_count.values()) > 0:
-                feature_vector = [cat_count.get(cat, 0) for cat in categories]
-                features.append(feature_vector)
-                etudiant_ids.append(etudiant_id)
+        ``taille_lot`` active le k-means par mini-lots ; par défaut il est
+        utilisé automatiquement au-delà de SEUIL_MINI_LOTS étudiants.
+        """
+        etudiant_ids, categories, features = self._profils_categories()
         
-        if not features:
+        if not categories or not etudiant_ids:
             return {}
         
-        # Clustering simple (k-means simplifié)
-        features = np.array(features)
         n_clusters = min(n_clusters, len(features))
+        if taille_lot is None and len(features) > SEUIL_MINI_LOTS:
+            taille_lot = TAILLE_MINI_LOT
         
-        # Initialisation aléatoire des centres
-        np.random.seed(42)
-        indices = np.random.choice(len(features), n_clusters, replace=False)
-        centres = features[indices]
-        
-        # Itérations
-        for _ in range(10):
-            # Assigner chaque point au cluster le plus proche
-            clusters = []
-            for f in features:
-                distances = [np.linalg.norm(f - c) for c in centres]
-                clusters.append(np.argmin(distances))
-            
-            # Mettre à jour les centres
-            for i in range(n_clusters):
-                cluster_points = features[np.array(clusters) == i]
-                if len(cluster_points) > 0:
-                    centres[i] = cluster_points.mean(axis=0)
+        labels, _ = kmeans(
+            features, n_clusters,
+            max_iter=max_iter, tol=tol, taille_lot=taille_lot,
+            rng=np.random.default_rng(42)
+        )
         
         # Retourner les assignations
-        result = {}
-        for i, etudiant_id in enumerate(etudiant_ids):
-            result[etudiant_id] = clusters[i]
-        
-        return result
+        self.user_clusters = {
+            etudiant_id: int(label)
+            for etudiant_id, label in zip(etudiant_ids, labels)
+        }
+        return self.user_clusters
     
     def statistiques_emprunts(self):
-        """Générer des statistiques sur les emprunts"""
-        from models.models import Emprunt, Livre
-        from sqlalchemy import func
-        
-        stats = {}
-        
-        # Total emprunts
-        stats['total_emprunts'] = self.db.query(Emprunt).count()
-        
-        # Emprunts en cours
-        stats['emprunts_en_cours'] = self.db.query(Emprunt).filter(
-            Emprunt.date_retour_effective.is_(None)
-        ).count()
-        
-        # Emprunts en retard
-        emprunts_en_cours = self.db.query(Emprunt).filter(
-            Emprunt.date_retour_effective.is_(None)
-        ).all()
-        stats['emprunts_en_retard'] = sum(1 for e in emprunts_en_cours if e.est_en_retard)
+        """Générer des statistiques sur les emprunts (service de statistiques partagé)"""
+        from services.statistiques import statistiques_bibliotheque
         
-        # Pénalités totales
-        stats['penalites_totales'] = self.db.query(
-            func.sum(Emprunt.penalite)
-        ).scalar() or 0
-        
-        # Catégories les plus empruntées
-        cat_emprunts = self.db.query(
-            Livre.categorie,
-            func.count(Emprunt.id).label('count')
-        ).join(Emprunt).group_by(Livre.categorie).order_by(
-            func.count(Emprunt.id).desc()
-        ).limit(5).all()
-        stats['categories_populaires'] = [(cat, count) for cat, count in cat_emprunts if cat]
-        
-        return stats
+        stats = statistiques_bibliotheque(self.db)
+        return {
+            cle: stats[cle]
+            for cle in (
+                'total_emprunts', 'emprunts_en_cours', 'emprunts_en_retard',
+                'penalites_totales', 'categories_populaires'
+            )
+        }
+
+
+# ----------------------------------------------------------------------
+# Propagation des nouveaux emprunts aux modèles chargés
+# ----------------------------------------------------------------------
+
+# Systèmes de recommandation vivants (références faibles)
+_SYSTEMES_ACTIFS = weakref.WeakSet()
+_CLE_EMPRUNTS = 'recommandation_emprunts_inseres'
+
+
+@event.listens_for(Emprunt, 'after_insert')
+def _emprunt_insere(mapper, connection, emprunt):
+    """Noter l'emprunt inséré ; il n'est propagé qu'une fois la transaction validée"""
+    session = object_session(emprunt)
+    if session is not None:
+        session.info.setdefault(_CLE_EMPRUNTS, []).append(
+            (emprunt.id, emprunt.etudiant_id, emprunt.livre_id)
+        )
+
+
+@event.listens_for(Session, 'after_commit')
+def _propager_emprunts(session):
+    """Mettre à jour en mémoire chaque modèle chargé avec les emprunts validés"""
+    for emprunt_id, etudiant_id, livre_id in session.info.pop(_CLE_EMPRUNTS, []):
+        for systeme in list(_SYSTEMES_ACTIFS):
+            systeme.enregistrer_emprunt(etudiant_id, livre_id, emprunt_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _oublier_emprunts(session):
+    session.info.pop(_CLE_EMPRUNTS, None)
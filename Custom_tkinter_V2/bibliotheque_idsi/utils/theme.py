@@ -177,6 +177,7 @@ ICONS = {
     'star_filled': '★',
     'loan': '📖',
     'return': '↩️',
+    'barcode': '🏷️',
     'reserve': '🔖',
     'notification': '🔔',
     'email': '📧',
@@ -375,6 +376,7 @@ ANIMATIONS = {
     'bounce_duration': 400,  # ms
     'hover_scale': 1.02,
     'press_scale': 0.98,
+    'search_debounce': 250,  # ms sans frappe avant une recherche instantanée
 }
 
 # ============================================
@@ -0,0 +1,188 @@
+"""
+Exécution des requêtes hors du thread de l'interface
+Système de Gestion de Bibliothèque - IDSI
+
+Tk n'est pas thread-safe et une requête lente (ou une base SQLite
+verrouillée) figerait toute la fenêtre si elle tournait dans la boucle
+principale. ``DatabaseWorker`` exécute les tâches dans un pool de threads
+et rapporte leurs résultats au thread Tk par ``after()``.
+
+Règles :
+- chaque tâche reçoit sa propre session, ouverte et fermée dans le thread
+  qui l'exécute (jamais de session partagée entre threads) ;
+- une tâche retourne des données simples (tuples, dicts, nombres) ; un
+  objet ORM n'est retourné que détaché explicitement (``db.expunge``), et
+  seules ses colonnes déjà chargées sont lues ensuite (pas de relation
+  paresseuse hors session) ;
+- les callbacks ``on_succes`` / ``on_erreur`` sont toujours appelés dans
+  le thread Tk ;
+- les tâches d'un même ``groupe`` se remplacent : la dernière soumise
+  gagne, les précédentes sont annulées et leurs résultats ignorés.
+"""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from models.database import get_db
+
+# Nombre de threads : SQLite en WAL accepte plusieurs lecteurs simultanés
+NB_THREADS_DB = 2
+
+# Période (ms) de relève des résultats par le thread Tk
+INTERVALLE_RELEVE = 30
+
+
+class Tache:
+    """Tâche soumise au worker ; ``annuler()`` ignore son résultat"""
+    
+    def __init__(self, fonction, on_succes=None, on_erreur=None, groupe=None):
+        self.fonction = fonction
+        self.on_succes = on_succes
+        self.on_erreur = on_erreur
+        self.groupe = groupe
+        self.future = None
+        self._annulee = threading.Event()
+    
+    @property
+    def annulee(self):
+        return self._annulee.is_set()
+    
+    def annuler(self):
+        """Annuler la tâche (elle ne démarre pas si elle attend encore)"""
+        self._annulee.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class DatabaseWorker:
+    """
+    Pool de threads pour les accès à la base depuis une vue Tk
+    
+    ``widget`` sert à planifier la relève des résultats ; le worker doit
+    être arrêté (``arreter()``) quand la vue est détruite.
+    """
+    
+    def __init__(self, widget, nb_threads=NB_THREADS_DB):
+        self.widget = widget
+        self._executor = ThreadPoolExecutor(max_workers=nb_threads, thread_name_prefix='db')
+        self._resultats = queue.Queue()
+        self._taches = set()
+        self._groupes = {}
+        self._releve_job = None
+        self._arrete = False
+    
+    def soumettre(self, fonction, on_succes=None, on_erreur=None, groupe=None):
+        """
+        Exécuter ``fonction(db)`` dans un thread du pool.
+        
+        ``on_succes(resultat)`` ou ``on_erreur(exception)`` est ensuite
+        appelé dans le thread Tk, sauf si la tâche a été annulée entre-temps.
+        Une tâche avec un ``groupe`` annule la précédente du même groupe.
+        """
+        tache = Tache(fonction, on_succes, on_erreur, groupe)
+        if self._arrete:
+            tache.annuler()
+            return tache
+        
+        if groupe is not None:
+            precedente = self._groupes.get(groupe)
+            if precedente is not None:
+                precedente.annuler()
+            self._groupes[groupe] = tache
+        
+        self._taches.add(tache)
+        tache.future = self._executor.submit(self._executer, tache)
+        self._planifier_releve()
+        return tache
+    
+    def annuler(self, groupe=None):
+        """
+        Annuler les tâches d'un groupe, ou de tous les groupes si ``groupe``
+        est None (changement de page). Les tâches sans groupe (écritures
+        demandées par l'utilisateur) ne sont jamais annulées.
+        """
+        for tache in list(self._taches):
+            if tache.groupe is not None and (groupe is None or tache.groupe == groupe):
+                tache.annuler()
+        if groupe is None:
+            self._groupes.clear()
+        else:
+            self._groupes.pop(groupe, None)
+    
+    def arreter(self):
+        """Annuler toutes les tâches et libérer le pool"""
+        self._arrete = True
+        for tache in list(self._taches):
+            tache.annuler()
+        self._taches.clear()
+        self._groupes.clear()
+        if self._releve_job is not None:
+            try:
+                self.widget.after_cancel(self._releve_job)
+            except Exception:
+                pass
+            self._releve_job = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _executer(self, tache):
+        """Corps d'une tâche, dans un thread du pool : une session par tâche"""
+        if tache.annulee:
+            return
+        
+        db = get_db()
+        try:
+            resultat = tache.fonction(db)
+        except Exception as e:
+            db.rollback()
+            self._resultats.put((tache, False, e))
+        else:
+            self._resultats.put((tache, True, resultat))
+        finally:
+            db.close()
+    
+    def _planifier_releve(self):
+        if self._releve_job is None and not self._arrete:
+            self._releve_job = self.widget.after(INTERVALLE_RELEVE, self._relever)
+    
+    def _relever(self):
+        """
+        Distribuer les résultats terminés (thread Tk). Un callback qui lève
+        une exception est signalé sans interrompre la distribution des autres
+        résultats ni la relève suivante.
+        """
+        self._releve_job = None
+        
+        try:
+            while True:
+                try:
+                    tache, succes, valeur = self._resultats.get_nowait()
+                except queue.Empty:
+                    break
+                self._terminer(tache)
+                if tache.annulee or self._arrete:
+                    continue
+                
+                try:
+                    if succes:
+                        if tache.on_succes:
+                            tache.on_succes(valeur)
+                    elif tache.on_erreur:
+                        tache.on_erreur(valeur)
+                    else:
+                        print(f"Erreur tâche base de données: {valeur}")
+                except Exception as e:
+                    print(f"Erreur callback tâche base de données: {e}")
+            
+            # Les tâches annulées avant leur démarrage ne produisent pas de résultat
+            for tache in list(self._taches):
+                if tache.annulee and tache.future is not None and tache.future.done():
+                    self._terminer(tache)
+        finally:
+            if self._taches or not self._resultats.empty():
+                self._planifier_releve()
+    
+    def _terminer(self, tache):
+        self._taches.discard(tache)
+        if self._groupes.get(tache.groupe) is tache:
+            del self._groupes[tache.groupe]
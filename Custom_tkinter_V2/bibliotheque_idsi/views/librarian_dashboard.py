@@ -14,10 +14,16 @@ from utils.theme import (
 )
 from utils.components import (
     AnimatedButton, ModernEntry, ModernCard, ModernTable, 
-    Sidebar, SearchBar, StatCard, PasswordChangeDialog, ProfileEditDialog
+    Sidebar, SearchBar, ScanBar, StatCard, LoadMoreBar, PasswordChangeDialog, ProfileEditDialog
 )
-from models.database import get_db
+from models.pagination import paginate
+from models.search import rechercher_livres, mots_livre, CacheRecherche
+from models.queries import query_livres, query_emprunts, query_emprunts_en_cours, query_emprunts_en_retard
 from models.models import Livre, Auteur, Etudiant, Bibliothecaire, Emprunt, Reservation
+from services.statistiques import statistiques_bibliotheque
+from services.emprunts import retourner_emprunts
+from services.circulation import Guichet
+from utils.worker import DatabaseWorker
 
 
 class LibrarianDashboard(ctk.CTkFrame):
@@ -29,10 +35,22 @@ class LibrarianDashboard(ctk.CTkFrame):
         self.user = user
         self.on_logout = on_logout
         
+        # Requêtes exécutées hors du thread Tk
+        self.worker = DatabaseWorker(self)
+        # Scans traités un par un, dans l'ordre d'arrivée
+        self.scan_worker = DatabaseWorker(self, nb_threads=1)
+        # Premières pages de la recherche instantanée des livres
+        self._books_cache = CacheRecherche()
+        
         self._create_ui()
         self.sidebar.set_active('home')
         self._show_home()
     
+    def destroy(self):
+        self.worker.arreter()
+        self.scan_worker.arreter()
+        super().destroy()
+    
     def _create_ui(self):
         # Sidebar avec info utilisateur
         nav_items = {
@@ -122,9 +140,49 @@ class LibrarianDashboard(ctk.CTkFrame):
     
     def _clear_content(self):
         """Effacer le contenu actuel"""
+        # Les chargements de la page quittée sont devenus inutiles
+        self.worker.annuler()
         for widget in self.main_content.winfo_children():
             widget.destroy()
     
+    def _show_page(self, table, more_bar, rows, has_more):
+        """Ajouter une page (couples clé, valeurs) chargée par le worker à une table paginée"""
+        table.set_loading(False)
+        for key, values in rows:
+            table.insert(values, key=key)
+        more_bar.set_state(len(table.rows), has_more)
+    
+    def _page_error(self, table, more_bar, what):
+        """Callback d'erreur d'un chargement de page"""
+        def on_error(e):
+            print(f"Erreur chargement {what}: {e}")
+            table.set_loading(False)
+            more_bar.set_state(len(table.rows), False)
+        return on_error
+    
+    def _scan(self, bar, operation, code, on_done):
+        """
+        Traiter un code lu par la douchette : ``operation(db, code)`` (méthode
+        d'un ``Guichet``) puis ``on_done(resultat)``. Les scans ne sont jamais
+        annulés et passent dans l'ordre par le worker à un thread.
+        """
+        def done(resultat):
+            if bar.winfo_exists():
+                if resultat.succes:
+                    kind = 'success'
+                elif resultat.statut in ('attente', 'refus'):
+                    kind = 'warning'
+                else:
+                    kind = 'danger'
+                bar.set_status(resultat.message, kind)
+            on_done(resultat)
+        
+        def on_error(e):
+            if bar.winfo_exists():
+                bar.set_status(f"Erreur : {e}", 'danger')
+        
+        self.scan_worker.soumettre(lambda db: operation(db, code), done, on_error)
+    
     def _confirm_logout(self):
         """Confirmer la déconnexion"""
         if messagebox.askyesno("Déconnexion", "Voulez-vous vraiment vous déconnecter ?"):
@@ -156,27 +214,7 @@ class LibrarianDashboard(ctk.CTkFrame):
             text_color=COLORS['text_primary']
         ).pack(anchor='w', pady=(0, 25))
         
-        # Récupérer les statistiques
-        db = get_db()
-        try:
-            total_livres = db.query(Livre).count()
-            total_etudiants = db.query(Etudiant).count()
-            emprunts_en_cours = db.query(Emprunt).filter(
-                Emprunt.date_retour_effective.is_(None)
-            ).count()
-            emprunts = db.query(Emprunt).filter(
-                Emprunt.date_retour_effective.is_(None)
-            ).all()
-            emprunts_retard = sum(1 for e in emprunts if e.est_en_retard)
-        except:
-            total_livres = 0
-            total_etudiants = 0
-            emprunts_en_cours = 0
-            emprunts_retard = 0
-        finally:
-            db.close()
-        
-        # Statistiques
+        # Statistiques (chargées par le worker, squelettes en attendant)
         stats_frame = ctk.CTkFrame(self.main_content, fg_color='transparent')
         stats_frame.pack(fill='x', pady=(0, 25))
         
@@ -184,55 +222,32 @@ class LibrarianDashboard(ctk.CTkFrame):
             stats_frame.columnconfigure(i, weight=1)
         
         stats = [
-            ('Total Livres', total_livres, ICONS['book'], COLORS['primary']),
-            ('Étudiants', total_etudiants, ICONS['users'], COLORS['info']),
-            ('Emprunts en cours', emprunts_en_cours, ICONS['loan'], COLORS['secondary']),
-            ('En retard', emprunts_retard, ICONS['warning'], COLORS['danger']),
+            ('total_livres', 'Total Livres', ICONS['book'], COLORS['primary']),
+            ('total_etudiants', 'Étudiants', ICONS['users'], COLORS['info']),
+            ('emprunts_en_cours', 'Emprunts en cours', ICONS['loan'], COLORS['secondary']),
+            ('emprunts_en_retard', 'En retard', ICONS['warning'], COLORS['danger']),
         ]
         
-        for i, (title, value, icon, color) in enumerate(stats):
-            stat_card = StatCard(stats_frame, title, value, icon, color)
+        stat_cards = {}
+        for i, (key, title, icon, color) in enumerate(stats):
+            stat_card = StatCard(stats_frame, title, None, icon, color)
             stat_card.grid(row=0, column=i, padx=8, pady=5, sticky='nsew')
+            stat_cards[key] = stat_card
         
         # Section emprunts en retard
-        retard_title = f"⚠️  Emprunts en retard ({emprunts_retard})" if emprunts_retard > 0 else "✅  Aucun emprunt en retard"
-        retard_card = ModernCard(self.main_content, title=retard_title)
+        retard_card = ModernCard(self.main_content, title="⚠️  Emprunts en retard")
         retard_card.pack(fill='x', pady=(0, 20))
         
-        if emprunts_retard > 0:
-            columns = {
-                'etudiant': {'text': 'Étudiant', 'width': 180},
-                'livre': {'text': 'Livre', 'width': 280},
-                'jours': {'text': 'Jours de retard', 'width': 120},
-                'penalite': {'text': 'Pénalité', 'width': 120},
-            }
-            
-            table = ModernTable(retard_card.content, columns, height=200)
-            table.pack(fill='both', expand=True)
-            
-            db = get_db()
-            try:
-                emprunts = db.query(Emprunt).filter(
-                    Emprunt.date_retour_effective.is_(None)
-                ).all()
-                
-                for emprunt in emprunts:
-                    if emprunt.est_en_retard:
-                        table.insert((
-                            emprunt.etudiant.matricule if emprunt.etudiant else 'N/A',
-                            emprunt.livre.titre[:40] + '...' if emprunt.livre and len(emprunt.livre.titre) > 40 else (emprunt.livre.titre if emprunt.livre else 'N/A'),
-                            f"{emprunt.jours_retard} jours",
-                            f"{emprunt.calculer_penalite():,.0f} FCFA"
-                        ))
-            finally:
-                db.close()
-        else:
-            ctk.CTkLabel(
-                retard_card.content,
-                text="🎉 Tous les emprunts sont dans les délais !",
-                font=ctk.CTkFont(family=FONTS['family'], size=14),
-                text_color=COLORS['accent']
-            ).pack(pady=20)
+        columns = {
+            'etudiant': {'text': 'Étudiant', 'width': 180},
+            'livre': {'text': 'Livre', 'width': 280},
+            'jours': {'text': 'Jours de retard', 'width': 120},
+            'penalite': {'text': 'Pénalité', 'width': 120},
+        }
+        
+        table = ModernTable(retard_card.content, columns, height=200)
+        table.pack(fill='both', expand=True)
+        table.set_loading()
         
         # Section emprunts récents
         recent_card = ModernCard(self.main_content, title="📖  Emprunts récents")
@@ -248,10 +263,33 @@ class LibrarianDashboard(ctk.CTkFrame):
         
         table_recent = ModernTable(recent_card.content, columns_recent, height=200)
         table_recent.pack(fill='both', expand=True)
+        table_recent.set_loading()
         
-        db = get_db()
-        try:
-            emprunts_recents = db.query(Emprunt).order_by(
+        def load(db):
+            # Service de statistiques partagé, en cache
+            try:
+                stats = statistiques_bibliotheque(db)
+            except Exception as e:
+                print(f"Erreur statistiques: {e}")
+                stats = {key: 0 for key in stat_cards}
+            
+            retards = []
+            if stats['emprunts_en_retard'] > 0:
+                emprunts = query_emprunts_en_retard(db).add_columns(
+                    Emprunt.jours_retard,
+                    Emprunt.penalite_courante
+                ).all()
+                
+                for emprunt, jours_retard, penalite in emprunts:
+                    retards.append((
+                        emprunt.etudiant.matricule if emprunt.etudiant else 'N/A',
+                        emprunt.livre.titre[:40] + '...' if emprunt.livre and len(emprunt.livre.titre) > 40 else (emprunt.livre.titre if emprunt.livre else 'N/A'),
+                        f"{jours_retard} jours",
+                        f"{penalite:,.0f} FCFA"
+                    ))
+            
+            recents = []
+            emprunts_recents = query_emprunts(db).order_by(
                 Emprunt.date_emprunt.desc()
             ).limit(10).all()
             
@@ -263,17 +301,47 @@ class LibrarianDashboard(ctk.CTkFrame):
                 else:
                     statut = '📖 En cours'
                 
-                table_recent.insert((
+                recents.append((
                     emprunt.etudiant.matricule if emprunt.etudiant else 'N/A',
                     emprunt.livre.titre[:35] + '...' if emprunt.livre and len(emprunt.livre.titre) > 35 else (emprunt.livre.titre if emprunt.livre else 'N/A'),
                     emprunt.date_emprunt.strftime('%d/%m/%Y'),
                     emprunt.date_retour_prevue.strftime('%d/%m/%Y'),
                     statut
                 ))
-        except Exception as e:
+            
+            return stats, retards, recents
+        
+        def show(result):
+            stats, retards, recents = result
+            for key, stat_card in stat_cards.items():
+                stat_card.set_value(stats[key])
+            
+            emprunts_retard = stats['emprunts_en_retard']
+            table.set_loading(False)
+            if emprunts_retard > 0:
+                retard_card.title_label.configure(text=f"⚠️  Emprunts en retard ({emprunts_retard})")
+                for row in retards:
+                    table.insert(row)
+            else:
+                retard_card.title_label.configure(text="✅  Aucun emprunt en retard")
+                table.destroy()
+                ctk.CTkLabel(
+                    retard_card.content,
+                    text="🎉 Tous les emprunts sont dans les délais !",
+                    font=ctk.CTkFont(family=FONTS['family'], size=14),
+                    text_color=COLORS['accent']
+                ).pack(pady=20)
+            
+            table_recent.set_loading(False)
+            for row in recents:
+                table_recent.insert(row)
+        
+        def on_error(e):
             print(f"Erreur: {e}")
-        finally:
-            db.close()
+            table.set_loading(False)
+            table_recent.set_loading(False)
+        
+        self.worker.soumettre(load, show, on_error, groupe='home')
     
     def _show_books(self):
         """Afficher la gestion des livres"""
@@ -317,7 +385,8 @@ class LibrarianDashboard(ctk.CTkFrame):
         self.book_search = SearchBar(
             search_frame,
             placeholder="Rechercher un livre...",
-            on_search=self._search_books_admin
+            on_search=self._search_books_admin,
+            live=True
         )
         self.book_search.pack(fill='x')
         
@@ -333,38 +402,67 @@ class LibrarianDashboard(ctk.CTkFrame):
         self.books_table = ModernTable(self.main_content, columns)
         self.books_table.pack(fill='both', expand=True)
         
+        self.books_more = LoadMoreBar(
+            self.main_content,
+            on_load_more=lambda: self._load_books(append=True)
+        )
+        self.books_more.pack(fill='x', pady=(10, 0))
+        
         self._load_books()
     
-    def _load_books(self, search_term=None):
-        """Charger les livres"""
-        self.books_table.clear()
-        
-        db = get_db()
-        try:
-            query = db.query(Livre)
-            
-            if search_term:
-                search_term = f"%{search_term}%"
-                query = query.filter(
-                    Livre.titre.ilike(search_term) |
-                    Livre.categorie.ilike(search_term)
-                )
+    def _load_books(self, search_term=None, append=False):
+        """Charger une page de livres"""
+        if not append:
+            self.books_table.clear()
+            self._books_search = search_term
+            self._books_cursor = None
             
-            livres = query.all()
+            # Saisie déjà vue, ou qui affine un résultat complet : pas de requête
+            cached = self._books_cache.get(search_term) if search_term else None
+            if cached is not None:
+                self.worker.annuler('books')
+                lignes, self._books_cursor, has_more = cached
+                self._show_page(self.books_table, self.books_more, [row for _, row in lignes], has_more)
+                return
+        
+        self.books_table.set_loading()
+        self.books_more.set_loading()
+        search, cursor = self._books_search, self._books_cursor
+        
+        def load(db):
+            if search:
+                # Recherche plein texte classée par pertinence
+                page = rechercher_livres(db, search, cursor=cursor)
+            else:
+                page = paginate(query_livres(db), (Livre.id,), cursor=cursor)
             
-            for livre in livres:
+            rows = []
+            for livre in page:
                 auteurs = ", ".join([a.nom_complet for a in livre.auteurs]) if livre.auteurs else "N/A"
                 qte = f"{livre.quantite_disponible}/{livre.quantite_totale}"
                 
-                self.books_table.insert((
+                rows.append((livre.id, (
                     livre.id,
                     livre.titre,
                     auteurs,
                     livre.categorie or "N/A",
                     qte
-                ))
-        finally:
-            db.close()
+                )))
+            
+            # Mots des livres de la première page, pour le cache de recherche
+            mots = [mots_livre(livre) for livre in page] if search and cursor is None else None
+            return rows, mots, page.cursor, page.has_more
+        
+        def show(result):
+            rows, mots, self._books_cursor, has_more = result
+            if mots is not None:
+                self._books_cache.set(search, list(zip(mots, rows)), self._books_cursor, has_more)
+            self._show_page(self.books_table, self.books_more, rows, has_more)
+        
+        self.worker.soumettre(
+            load, show, self._page_error(self.books_table, self.books_more, "livres"),
+            groupe='books'
+        )
     
     def _search_books_admin(self, search_term):
         """Rechercher des livres (admin)"""
@@ -469,13 +567,34 @@ class LibrarianDashboard(ctk.CTkFrame):
                 messagebox.showerror("Erreur", "L'auteur est obligatoire.")
                 return
             
-            db = get_db()
+            # Valeurs lues dans le thread Tk, avant de passer la main au worker
+            parts = auteur.split(' ', 1)
+            prenom = parts[0] if len(parts) > 0 else ''
+            nom = parts[1] if len(parts) > 1 else parts[0]
+            
+            try:
+                quantite = int(fields['quantite'].get() or 1)
+            except:
+                quantite = 1
+            
             try:
+                annee = int(fields['annee'].get()) if fields['annee'].get() else None
+            except:
+                annee = None
+            
+            valeurs = dict(
+                titre=titre,
+                isbn=fields['isbn'].get().strip() or None,
+                categorie=fields['categorie'].get(),
+                editeur=fields['editeur'].get().strip() or None,
+                annee_publication=annee,
+                quantite_totale=quantite,
+                quantite_disponible=quantite,
+                description=fields['description'].get("1.0", "end-1c").strip() or None
+            )
+            
+            def save(db):
                 # Créer ou récupérer l'auteur
-                parts = auteur.split(' ', 1)
-                prenom = parts[0] if len(parts) > 0 else ''
-                nom = parts[1] if len(parts) > 1 else parts[0]
-                
                 auteur_obj = db.query(Auteur).filter(
                     Auteur.nom == nom,
                     Auteur.prenom == prenom
@@ -487,40 +606,28 @@ class LibrarianDashboard(ctk.CTkFrame):
                     db.flush()
                 
                 # Créer le livre
-                try:
-                    quantite = int(fields['quantite'].get() or 1)
-                except:
-                    quantite = 1
-                
-                try:
-                    annee = int(fields['annee'].get()) if fields['annee'].get() else None
-                except:
-                    annee = None
-                
-                livre = Livre(
-                    titre=titre,
-                    isbn=fields['isbn'].get().strip() or None,
-                    categorie=fields['categorie'].get(),
-                    editeur=fields['editeur'].get().strip() or None,
-                    annee_publication=annee,
-                    quantite_totale=quantite,
-                    quantite_disponible=quantite,
-                    description=fields['description'].get("1.0", "end-1c").strip() or None
-                )
-                
+                livre = Livre(**valeurs)
                 livre.auteurs.append(auteur_obj)
                 
                 db.add(livre)
                 db.commit()
-                
+            
+            def done(_):
+                self._books_cache.invalider()
                 messagebox.showinfo("Succès", f"Le livre '{titre}' a été ajouté.")
-                modal.destroy()
-                self._load_books()
-            except Exception as e:
-                db.rollback()
+                if modal.winfo_exists():
+                    modal.destroy()
+                if self.books_table.winfo_exists():
+                    self._load_books()
+            
+            def on_error(e):
+                if save_btn.winfo_exists():
+                    save_btn.configure(state='normal')
                 messagebox.showerror("Erreur", f"Erreur: {e}")
-            finally:
-                db.close()
+            
+            # Écriture demandée par l'utilisateur : sans groupe, jamais annulée
+            save_btn.configure(state='disabled')
+            self.worker.soumettre(save, done, on_error)
         
         # Boutons
         btn_frame = ctk.CTkFrame(main_frame, fg_color='transparent')
@@ -534,39 +641,49 @@ class LibrarianDashboard(ctk.CTkFrame):
             width=150
         ).pack(side='left')
         
-        AnimatedButton(
+        save_btn = AnimatedButton(
             btn_frame,
             text="Enregistrer",
             style='success',
             icon=ICONS['check'],
             command=save_book,
             width=180
-        ).pack(side='right')
+        )
+        save_btn.pack(side='right')
     
     def _delete_book(self):
         """Supprimer un livre"""
-        selected = self.books_table.get_selected()
-        if not selected:
+        livre_id = self.books_table.get_selected_key()
+        if livre_id is None:
             messagebox.showwarning("Sélection", "Veuillez sélectionner un livre.")
             return
         
-        livre_id = selected[0]
-        titre = selected[1]
+        titre = self.books_table.get_selected()[1]
         
-        if messagebox.askyesno("Confirmation", f"Supprimer le livre '{titre}' ?"):
-            db = get_db()
-            try:
-                livre = db.query(Livre).filter(Livre.id == livre_id).first()
-                if livre:
-                    db.delete(livre)
-                    db.commit()
-                    messagebox.showinfo("Succès", "Livre supprimé.")
-                    self._load_books()
-            except Exception as e:
-                db.rollback()
-                messagebox.showerror("Erreur", f"Erreur: {e}")
-            finally:
-                db.close()
+        if not messagebox.askyesno("Confirmation", f"Supprimer le livre '{titre}' ?"):
+            return
+        
+        def delete(db):
+            livre = db.get(Livre, livre_id)
+            if livre is None:
+                return False
+            db.delete(livre)
+            db.commit()
+            return True
+        
+        def done(supprime):
+            self._books_cache.invalider()
+            # Retirer la ligne sans recharger la table (déjà supprimé ailleurs : idem)
+            if self.books_table.winfo_exists():
+                self.books_table.remove_keys([livre_id])
+                self.books_more.set_state(len(self.books_table.rows), self.books_more.has_more)
+            if supprime:
+                messagebox.showinfo("Succès", "Livre supprimé.")
+        
+        # Écriture demandée par l'utilisateur : sans groupe, jamais annulée
+        self.worker.soumettre(
+            delete, done, lambda e: messagebox.showerror("Erreur", f"Erreur: {e}")
+        )
     
     def _show_students(self):
         """Afficher la liste des étudiants"""
@@ -574,20 +691,19 @@ class LibrarianDashboard(ctk.CTkFrame):
         header_frame = ctk.CTkFrame(self.main_content, fg_color='transparent')
         header_frame.pack(fill='x', pady=(0, 20))
         
-        db = get_db()
-        try:
-            total_etudiants = db.query(Etudiant).count()
-        except:
-            total_etudiants = 0
-        finally:
-            db.close()
-        
-        ctk.CTkLabel(
+        title_label = ctk.CTkLabel(
             header_frame,
-            text=f"{ICONS['users']}  Gestion des Étudiants ({total_etudiants})",
+            text=f"{ICONS['users']}  Gestion des Étudiants",
             font=ctk.CTkFont(family=FONTS['family'], size=26, weight='bold'),
             text_color=COLORS['text_primary']
-        ).pack(side='left')
+        )
+        title_label.pack(side='left')
+        
+        self.worker.soumettre(
+            lambda db: db.query(Etudiant).count(),
+            lambda total: title_label.configure(text=f"{ICONS['users']}  Gestion des Étudiants ({total})"),
+            groupe='students_count'
+        )
         
         # Barre de recherche
         search_frame = ctk.CTkFrame(self.main_content, fg_color='transparent')
@@ -596,7 +712,8 @@ class LibrarianDashboard(ctk.CTkFrame):
         self.student_search = SearchBar(
             search_frame,
             placeholder="Rechercher un étudiant par nom, matricule ou filière...",
-            on_search=self._search_students
+            on_search=self._search_students,
+            live=True
         )
         self.student_search.pack(fill='x')
         
@@ -612,44 +729,64 @@ class LibrarianDashboard(ctk.CTkFrame):
         self.students_table = ModernTable(self.main_content, columns, height=450)
         self.students_table.pack(fill='both', expand=True)
         
+        self.students_more = LoadMoreBar(
+            self.main_content,
+            on_load_more=lambda: self._load_students(append=True)
+        )
+        self.students_more.pack(fill='x', pady=(10, 0))
+        
         self._load_students()
     
-    def _load_students(self, search_term=None):
-        """Charger les étudiants dans la table"""
-        self.students_table.clear()
-        
-        db = get_db()
-        try:
+    def _load_students(self, search_term=None, append=False):
+        """Charger une page d'étudiants dans la table"""
+        if not append:
+            self.students_table.clear()
+            self._students_search = search_term
+            self._students_cursor = None
+        
+        self.students_table.set_loading()
+        self.students_more.set_loading()
+        search, cursor = self._students_search, self._students_cursor
+        
+        def load(db):
             query = db.query(Etudiant)
             
-            if search_term:
-                search_term = f"%{search_term}%"
+            if search:
+                pattern = f"%{search}%"
                 query = query.filter(
-                    Etudiant.nom.ilike(search_term) |
-                    Etudiant.prenom.ilike(search_term) |
-                    Etudiant.matricule.ilike(search_term) |
-                    Etudiant.filiere.ilike(search_term)
+                    Etudiant.nom.ilike(pattern) |
+                    Etudiant.prenom.ilike(pattern) |
+                    Etudiant.matricule.ilike(pattern) |
+                    Etudiant.filiere.ilike(pattern)
                 )
             
-            etudiants = query.order_by(Etudiant.nom).all()
+            # Ordre alphabétique, l'id départage les homonymes
+            page = paginate(query, (Etudiant.nom, Etudiant.id), cursor=cursor)
             
-            for etudiant in etudiants:
+            rows = []
+            for etudiant in page:
                 # Raccourcir le nom de la filière pour l'affichage
                 filiere = etudiant.filiere or "N/A"
                 if len(filiere) > 45:
                     filiere = filiere[:42] + "..."
                 
-                self.students_table.insert((
+                rows.append((etudiant.id, (
                     etudiant.matricule,
                     etudiant.nom,
                     etudiant.prenom,
                     filiere,
                     etudiant.niveau or "N/A"
-                ))
-        except Exception as e:
-            print(f"Erreur chargement étudiants: {e}")
-        finally:
-            db.close()
+                )))
+            return rows, page.cursor, page.has_more
+        
+        def show(result):
+            rows, self._students_cursor, has_more = result
+            self._show_page(self.students_table, self.students_more, rows, has_more)
+        
+        self.worker.soumettre(
+            load, show, self._page_error(self.students_table, self.students_more, "étudiants"),
+            groupe='students'
+        )
     
     def _search_students(self, search_term):
         """Rechercher des étudiants"""
@@ -664,6 +801,16 @@ class LibrarianDashboard(ctk.CTkFrame):
             text_color=COLORS['text_primary']
         ).pack(anchor='w', pady=(0, 25))
         
+        # Prêt au scanner : carte de l'étudiant, puis les livres
+        guichet = Guichet()
+        self.loans_scan = ScanBar(
+            self.main_content,
+            placeholder="Scanner la carte étudiant (matricule) puis l'ISBN des livres...",
+            on_scan=lambda code: self._scan(self.loans_scan, guichet.scanner_emprunt, code, self._on_loan_scanned)
+        )
+        self.loans_scan.pack(fill='x', pady=(0, 20))
+        self.loans_scan.focus()
+        
         columns = {
             'id': {'text': 'ID', 'width': 50},
             'etudiant': {'text': 'Étudiant', 'width': 150},
@@ -673,13 +820,37 @@ class LibrarianDashboard(ctk.CTkFrame):
             'statut': {'text': 'Statut', 'width': 100},
         }
         
-        table = ModernTable(self.main_content, columns)
-        table.pack(fill='both', expand=True)
+        self.loans_table = ModernTable(self.main_content, columns)
+        self.loans_table.pack(fill='both', expand=True)
+        
+        self.loans_more = LoadMoreBar(
+            self.main_content,
+            on_load_more=lambda: self._load_loans(append=True)
+        )
+        self.loans_more.pack(fill='x', pady=(10, 0))
         
-        db = get_db()
-        try:
-            emprunts = db.query(Emprunt).order_by(Emprunt.date_emprunt.desc()).all()
-            for emprunt in emprunts:
+        self._load_loans()
+    
+    def _load_loans(self, append=False):
+        """Charger une page de l'historique des emprunts"""
+        if not append:
+            self.loans_table.clear()
+            self._loans_cursor = None
+        
+        self.loans_table.set_loading()
+        self.loans_more.set_loading()
+        cursor = self._loans_cursor
+        
+        def load(db):
+            page = paginate(
+                query_emprunts(db),
+                (Emprunt.date_emprunt, Emprunt.id),
+                cursor=cursor,
+                descending=True
+            )
+            
+            rows = []
+            for emprunt in page:
                 if emprunt.date_retour_effective:
                     statut = '✅ Retourné'
                 elif emprunt.est_en_retard:
@@ -687,16 +858,43 @@ class LibrarianDashboard(ctk.CTkFrame):
                 else:
                     statut = '📖 En cours'
                 
-                table.insert((
+                rows.append((emprunt.id, (
                     emprunt.id,
                     emprunt.etudiant.matricule if emprunt.etudiant else 'N/A',
                     emprunt.livre.titre if emprunt.livre else 'N/A',
                     emprunt.date_emprunt.strftime('%d/%m/%Y'),
                     emprunt.date_retour_prevue.strftime('%d/%m/%Y'),
                     statut
-                ))
-        finally:
-            db.close()
+                )))
+            return rows, page.cursor, page.has_more
+        
+        def show(result):
+            rows, self._loans_cursor, has_more = result
+            self._show_page(self.loans_table, self.loans_more, rows, has_more)
+        
+        self.worker.soumettre(
+            load, show, self._page_error(self.loans_table, self.loans_more, "emprunts"),
+            groupe='loans'
+        )
+    
+    def _on_loan_scanned(self, resultat):
+        """Ajouter l'emprunt scanné en tête de l'historique, sans recharger la table"""
+        if resultat.statut != 'emprunt':
+            return
+        self._books_cache.invalider()
+        if not self.loans_table.winfo_exists():
+            return
+        
+        d = resultat.details
+        self.loans_table.insert((
+            d['emprunt_id'],
+            d['matricule'],
+            d['titre'],
+            d['date_emprunt'].strftime('%d/%m/%Y'),
+            d['date_retour_prevue'].strftime('%d/%m/%Y'),
+            '📖 En cours'
+        ), key=d['emprunt_id'], index=0)
+        self.loans_more.set_state(len(self.loans_table.rows), self.loans_more.has_more)
     
     def _show_returns(self):
         """Gérer les retours de livres"""
@@ -707,6 +905,16 @@ class LibrarianDashboard(ctk.CTkFrame):
             text_color=COLORS['text_primary']
         ).pack(anchor='w', pady=(0, 25))
         
+        # Retour au scanner : l'ISBN suffit, sauf si plusieurs étudiants ont ce livre
+        guichet = Guichet()
+        self.returns_scan = ScanBar(
+            self.main_content,
+            placeholder="Scanner l'ISBN du livre rendu (ou d'abord la carte étudiant)...",
+            on_scan=lambda code: self._scan(self.returns_scan, guichet.scanner_retour, code, self._on_return_scanned)
+        )
+        self.returns_scan.pack(fill='x', pady=(0, 20))
+        self.returns_scan.focus()
+        
         columns = {
             'id': {'text': 'ID', 'width': 50},
             'etudiant': {'text': 'Étudiant', 'width': 150},
@@ -716,80 +924,127 @@ class LibrarianDashboard(ctk.CTkFrame):
             'penalite': {'text': 'Pénalité', 'width': 100},
         }
         
-        self.returns_table = ModernTable(self.main_content, columns)
+        # Ctrl+clic / Maj+clic : plusieurs retours enregistrés en une fois
+        self.returns_table = ModernTable(self.main_content, columns, multi_select=True)
         self.returns_table.pack(fill='both', expand=True)
         
+        self.returns_more = LoadMoreBar(
+            self.main_content,
+            on_load_more=lambda: self._load_returns(append=True)
+        )
+        self.returns_more.pack(fill='x', pady=(10, 0))
+        
         self._load_returns()
         
         # Bouton retourner
         btn_frame = ctk.CTkFrame(self.main_content, fg_color='transparent')
         btn_frame.pack(fill='x', pady=(25, 0))
         
-        AnimatedButton(
+        self.return_btn = AnimatedButton(
             btn_frame,
-            text="Enregistrer le retour",
+            text="Enregistrer les retours",
             style='success',
             icon=ICONS['check'],
             command=self._process_return,
-            width=220
-        ).pack(side='left')
+            width=240
+        )
+        self.return_btn.pack(side='left')
+        
+        ctk.CTkLabel(
+            btn_frame,
+            text="Ctrl+clic ou Maj+clic pour sélectionner plusieurs emprunts",
+            font=ctk.CTkFont(family=FONTS['family'], size=12),
+            text_color=COLORS['text_secondary']
+        ).pack(side='left', padx=15)
     
-    def _load_returns(self):
-        """Charger les emprunts en cours pour retour"""
-        self.returns_table.clear()
-        
-        db = get_db()
-        try:
-            emprunts = db.query(Emprunt).filter(
-                Emprunt.date_retour_effective.is_(None)
-            ).all()
+    def _load_returns(self, append=False):
+        """Charger une page des emprunts en cours pour retour"""
+        if not append:
+            self.returns_table.clear()
+            self._returns_cursor = None
+        
+        self.returns_table.set_loading()
+        self.returns_more.set_loading()
+        cursor = self._returns_cursor
+        
+        def load(db):
+            page = paginate(
+                query_emprunts_en_cours(db),
+                (Emprunt.id,),
+                cursor=cursor
+            )
             
-            for emprunt in emprunts:
+            rows = []
+            for emprunt in page:
                 retard = f"⚠️ {emprunt.jours_retard} jours" if emprunt.est_en_retard else "✅ Aucun"
                 penalite = f"{emprunt.calculer_penalite():,.0f} FCFA"
                 
-                self.returns_table.insert((
+                rows.append((emprunt.id, (
                     emprunt.id,
                     emprunt.etudiant.matricule if emprunt.etudiant else 'N/A',
                     emprunt.livre.titre if emprunt.livre else 'N/A',
                     emprunt.date_retour_prevue.strftime('%d/%m/%Y'),
                     retard,
                     penalite
-                ))
-        finally:
-            db.close()
+                )))
+            return rows, page.cursor, page.has_more
+        
+        def show(result):
+            rows, self._returns_cursor, has_more = result
+            self._show_page(self.returns_table, self.returns_more, rows, has_more)
+        
+        self.worker.soumettre(
+            load, show, self._page_error(self.returns_table, self.returns_more, "retours"),
+            groupe='returns'
+        )
     
     def _process_return(self):
-        """Traiter un retour de livre"""
-        selected = self.returns_table.get_selected()
-        if not selected:
+        """Enregistrer le retour des emprunts sélectionnés (un seul lot)"""
+        emprunt_ids = self.returns_table.get_selected_keys()
+        if not emprunt_ids:
             messagebox.showwarning("Sélection", "Veuillez sélectionner un emprunt.")
             return
         
-        emprunt_id = selected[0]
-        
-        db = get_db()
-        try:
-            emprunt = db.query(Emprunt).filter(Emprunt.id == emprunt_id).first()
-            if emprunt:
-                emprunt.retourner()
-                db.commit()
-                
-                penalite = emprunt.penalite
-                if penalite > 0:
-                    messagebox.showinfo(
-                        "Retour enregistré",
-                        f"Retour enregistré avec succès.\nPénalité: {penalite:,.0f} FCFA"
-                    )
-                else:
-                    messagebox.showinfo("Succès", "Retour enregistré avec succès.")
-                
-                self._load_returns()
-        except Exception as e:
-            db.rollback()
+        def done(penalites):
+            self._end_return()
+            self._books_cache.invalider()
+            
+            # Retirer les seules lignes traitées, sans recharger la table ; celles
+            # déjà retournées par un autre poste ne sont plus en cours non plus
+            if self.returns_table.winfo_exists():
+                self.returns_table.remove_keys(emprunt_ids)
+                self.returns_more.set_state(len(self.returns_table.rows), self.returns_more.has_more)
+            
+            total = sum(penalites.values())
+            message = f"{len(penalites)} retour(s) enregistré(s) avec succès."
+            if total > 0:
+                message += f"\nPénalités: {total:,.0f} FCFA"
+            deja = len(emprunt_ids) - len(penalites)
+            if deja:
+                message += f"\n{deja} emprunt(s) déjà retourné(s) entre-temps."
+            messagebox.showinfo("Retours enregistrés", message)
+        
+        def on_error(e):
+            self._end_return()
             messagebox.showerror("Erreur", f"Erreur: {e}")
-        finally:
-            db.close()
+        
+        # Écriture demandée par l'utilisateur : sans groupe, jamais annulée
+        self.return_btn.configure(state='disabled')
+        self.worker.soumettre(lambda db: retourner_emprunts(db, emprunt_ids), done, on_error)
+    
+    def _on_return_scanned(self, resultat):
+        """Retirer l'emprunt rendu de la table des retours, sans la recharger"""
+        if resultat.statut != 'retour':
+            return
+        self._books_cache.invalider()
+        if self.returns_table.winfo_exists():
+            self.returns_table.remove_keys([resultat.details['emprunt_id']])
+            self.returns_more.set_state(len(self.returns_table.rows), self.returns_more.has_more)
+    
+    def _end_return(self):
+        """Réactiver le bouton de retour s'il est encore affiché"""
+        if self.return_btn.winfo_exists():
+            self.return_btn.configure(state='normal')
     
     def _show_settings(self):
         """Afficher les paramètres"""
@@ -867,7 +1122,7 @@ class LibrarianDashboard(ctk.CTkFrame):
     
     def _open_password_dialog(self):
         """Ouvrir le dialog de changement de mot de passe"""
-        PasswordChangeDialog(self.parent, self.user, 'bibliothecaire')
+        PasswordChangeDialog(self.parent, self.user, 'bibliothecaire', worker=self.worker)
     
     def _open_profile_dialog(self):
         """Ouvrir le dialog de modification du profil"""
@@ -875,7 +1130,8 @@ class LibrarianDashboard(ctk.CTkFrame):
             self.parent, 
             self.user, 
             'bibliothecaire',
-            on_success=self._refresh_ui
+            on_success=self._refresh_ui,
+            worker=self.worker
         )
     
     def _refresh_ui(self):
@@ -13,8 +13,8 @@ from utils.theme import (
     BACKGROUND_IMAGE, MESSAGES
 )
 from utils.components import ModernEntry, AnimatedButton
-from models.database import get_db
 from models.models import Etudiant, Bibliothecaire
+from utils.worker import DatabaseWorker
 
 
 class LoginView(ctk.CTkFrame):
@@ -28,9 +28,16 @@ class LoginView(ctk.CTkFrame):
         self._bg_image = None
         self._bg_photo = None
         
+        # Vérification des identifiants hors du thread Tk
+        self.worker = DatabaseWorker(self, nb_threads=1)
+        
         self._create_ui()
         self.bind('<Configure>', self._on_resize)
     
+    def destroy(self):
+        self.worker.arreter()
+        super().destroy()
+    
     def _load_background(self, width, height):
         """Charger et traiter l'image de fond"""
         try:
@@ -273,9 +280,8 @@ class LoginView(ctk.CTkFrame):
             self._show_error("Veuillez entrer votre mot de passe")
             return
         
-        # Vérification en base de données
-        db = get_db()
-        try:
+        # Vérification en base de données (worker : la fenêtre reste réactive)
+        def check(db):
             if user_type == 'etudiant':
                 # Pour les étudiants: identifier par email, mot de passe = matricule
                 user = db.query(Etudiant).filter(
@@ -289,16 +295,28 @@ class LoginView(ctk.CTkFrame):
             
             if user and user.verify_password(password):
                 if hasattr(user, 'actif') and not user.actif:
-                    self._show_error("Ce compte est désactivé")
-                    return
-                
-                # Connexion réussie
-                self.error_label.configure(text="")
-                self.on_login_success(user, user_type)
-            else:
-                self._show_error(MESSAGES['login_error'])
-                
-        except Exception as e:
+                    return None, "Ce compte est désactivé"
+                # Détaché avant la fermeture de la session : les vues ne
+                # lisent que ses colonnes, déjà chargées
+                db.expunge(user)
+                return user, None
+            return None, MESSAGES['login_error']
+        
+        def done(result):
+            self.login_btn.configure(state='normal')
+            user, error = result
+            if error:
+                self._show_error(error)
+                return
+            
+            # Connexion réussie
+            self.error_label.configure(text="")
+            self.on_login_success(user, user_type)
+        
+        def on_error(e):
+            self.login_btn.configure(state='normal')
             self._show_error(f"Erreur de connexion: {str(e)}")
-        finally:
-            db.close()
+        
+        self.error_label.configure(text="")
+        self.login_btn.configure(state='disabled')
+        self.worker.soumettre(check, done, on_error, groupe='login')
@@ -13,10 +13,16 @@ from utils.theme import (
 )
 from utils.components import (
     AnimatedButton, ModernCard, ModernTable, Sidebar, 
-    SearchBar, StatCard, PasswordChangeDialog, ProfileEditDialog
+    SearchBar, ScanBar, StatCard, LoadMoreBar, PasswordChangeDialog, ProfileEditDialog
 )
-from models.database import get_db
+from models.pagination import paginate
+from models.search import rechercher_livres, mots_livre, CacheRecherche
+from models.queries import query_livres, query_emprunts, query_recommandations
 from models.models import Livre, Emprunt, Reservation, Auteur
+from services.statistiques import statistiques_etudiant
+from services.emprunts import emprunter_livres, EmpruntRefuse
+from services.circulation import Guichet
+from utils.worker import DatabaseWorker
 
 
 class StudentDashboard(ctk.CTkFrame):
@@ -28,10 +34,22 @@ class StudentDashboard(ctk.CTkFrame):
         self.user = user
         self.on_logout = on_logout
         
+        # Requêtes exécutées hors du thread Tk
+        self.worker = DatabaseWorker(self)
+        # Scans traités un par un, dans l'ordre d'arrivée
+        self.scan_worker = DatabaseWorker(self, nb_threads=1)
+        # Premières pages de la recherche instantanée des livres
+        self._books_cache = CacheRecherche()
+        
         self._create_ui()
         self.sidebar.set_active('home')
         self._show_home()
     
+    def destroy(self):
+        self.worker.arreter()
+        self.scan_worker.arreter()
+        super().destroy()
+    
     def _create_ui(self):
         # Sidebar avec info utilisateur
         nav_items = {
@@ -114,9 +132,26 @@ class StudentDashboard(ctk.CTkFrame):
     
     def _clear_content(self):
         """Effacer le contenu actuel"""
+        # Les chargements de la page quittée sont devenus inutiles
+        self.worker.annuler()
         for widget in self.main_content.winfo_children():
             widget.destroy()
     
+    def _show_page(self, table, more_bar, rows, has_more):
+        """Ajouter une page (couples clé, valeurs) chargée par le worker à une table paginée"""
+        table.set_loading(False)
+        for key, values in rows:
+            table.insert(values, key=key)
+        more_bar.set_state(len(table.rows), has_more)
+    
+    def _page_error(self, table, more_bar, what):
+        """Callback d'erreur d'un chargement de page"""
+        def on_error(e):
+            print(f"Erreur chargement {what}: {e}")
+            table.set_loading(False)
+            more_bar.set_state(len(table.rows), False)
+        return on_error
+    
     def _confirm_logout(self):
         """Confirmer la déconnexion"""
         if messagebox.askyesno("Déconnexion", "Voulez-vous vraiment vous déconnecter ?"):
@@ -150,68 +185,25 @@ class StudentDashboard(ctk.CTkFrame):
             text_color=COLORS['text_primary']
         ).pack(side='left')
         
-        # Récupérer les statistiques
-        db = get_db()
-        try:
-            emprunts_en_cours = db.query(Emprunt).filter(
-                Emprunt.etudiant_id == self.user.id,
-                Emprunt.date_retour_effective.is_(None)
-            ).count()
-            
-            emprunts = db.query(Emprunt).filter(
-                Emprunt.etudiant_id == self.user.id,
-                Emprunt.date_retour_effective.is_(None)
-            ).all()
-            emprunts_retard = sum(1 for e in emprunts if e.est_en_retard)
-            
-            penalites = sum(e.calculer_penalite() for e in emprunts if e.est_en_retard)
-            
-            total_emprunts = db.query(Emprunt).filter(
-                Emprunt.etudiant_id == self.user.id
-            ).count()
-        except Exception as e:
-            emprunts_en_cours = 0
-            emprunts_retard = 0
-            penalites = 0
-            total_emprunts = 0
-        finally:
-            db.close()
-        
-        # Statistiques
+        # Statistiques (chargées par le worker, squelettes en attendant)
         stats_frame = ctk.CTkFrame(self.main_content, fg_color='transparent')
         stats_frame.pack(fill='x', pady=(0, 25))
         
         stats = [
-            ('Emprunts en cours', emprunts_en_cours, ICONS['book'], COLORS['primary']),
-            ('En retard', emprunts_retard, ICONS['warning'], COLORS['danger']),
-            ('Pénalités', f"{penalites:,.0f} FCFA", ICONS['info'], COLORS['secondary']),
-            ('Total emprunts', total_emprunts, ICONS['chart'], COLORS['accent']),
+            ('emprunts_en_cours', 'Emprunts en cours', ICONS['book'], COLORS['primary']),
+            ('emprunts_en_retard', 'En retard', ICONS['warning'], COLORS['danger']),
+            ('penalites', 'Pénalités', ICONS['info'], COLORS['secondary']),
+            ('total_emprunts', 'Total emprunts', ICONS['chart'], COLORS['accent']),
         ]
         
         for i in range(4):
             stats_frame.columnconfigure(i, weight=1)
         
-        for i, (title, value, icon, color) in enumerate(stats):
-            stat_card = StatCard(stats_frame, title, value, icon, color)
+        stat_cards = {}
+        for i, (key, title, icon, color) in enumerate(stats):
+            stat_card = StatCard(stats_frame, title, None, icon, color)
             stat_card.grid(row=0, column=i, padx=8, pady=5, sticky='nsew')
-        
-        # Alerte si pénalités
-        if penalites > 0:
-            alert_frame = ctk.CTkFrame(
-                self.main_content,
-                fg_color='#FEF2F2',
-                border_width=1,
-                border_color=COLORS['danger'],
-                corner_radius=DIMENSIONS['border_radius']
-            )
-            alert_frame.pack(fill='x', pady=(0, 25))
-            
-            ctk.CTkLabel(
-                alert_frame,
-                text=f"  {ICONS['warning']}  Attention : Vous avez {penalites:,.0f} FCFA de pénalités à régler",
-                font=ctk.CTkFont(family=FONTS['family'], size=14, weight='bold'),
-                text_color=COLORS['danger']
-            ).pack(pady=15)
+            stat_cards[key] = stat_card
         
         # Section emprunts récents
         recent_card = ModernCard(self.main_content, title=f"{ICONS['clock']}  Emprunts récents")
@@ -227,30 +219,116 @@ class StudentDashboard(ctk.CTkFrame):
         
         table = ModernTable(recent_card.content, columns)
         table.pack(fill='both', expand=True)
+        table.set_loading()
         
-        db = get_db()
-        try:
-            emprunts = db.query(Emprunt).filter(
-                Emprunt.etudiant_id == self.user.id
-            ).order_by(Emprunt.date_emprunt.desc()).limit(5).all()
+        etudiant_id = self.user.id
+        
+        def load(db):
+            # Service de statistiques partagé (une requête agrégée, en cache)
+            try:
+                stats = statistiques_etudiant(db, etudiant_id)
+            except Exception as e:
+                print(f"Erreur statistiques: {e}")
+                stats = {key: 0 for key in stat_cards}
             
-            for emprunt in emprunts:
-                if emprunt.date_retour_effective:
-                    statut = '✅ Retourné'
-                elif emprunt.est_en_retard:
-                    statut = '⚠️ En retard'
-                else:
-                    statut = '📖 En cours'
+            recommandations = self._load_recommendations(db, etudiant_id)
+            
+            rows = []
+            try:
+                emprunts = query_emprunts(db).filter(
+                    Emprunt.etudiant_id == etudiant_id
+                ).order_by(Emprunt.date_emprunt.desc()).limit(5).all()
                 
-                livre_titre = emprunt.livre.titre if emprunt.livre else 'N/A'
-                date_emprunt = emprunt.date_emprunt.strftime('%d/%m/%Y') if emprunt.date_emprunt else 'N/A'
-                date_retour = emprunt.date_retour_prevue.strftime('%d/%m/%Y') if emprunt.date_retour_prevue else 'N/A'
+                for emprunt in emprunts:
+                    if emprunt.date_retour_effective:
+                        statut = '✅ Retourné'
+                    elif emprunt.est_en_retard:
+                        statut = '⚠️ En retard'
+                    else:
+                        statut = '📖 En cours'
+                    
+                    livre_titre = emprunt.livre.titre if emprunt.livre else 'N/A'
+                    date_emprunt = emprunt.date_emprunt.strftime('%d/%m/%Y') if emprunt.date_emprunt else 'N/A'
+                    date_retour = emprunt.date_retour_prevue.strftime('%d/%m/%Y') if emprunt.date_retour_prevue else 'N/A'
+                    
+                    rows.append((livre_titre, date_emprunt, date_retour, statut))
+            except Exception as e:
+                print(f"Erreur chargement emprunts: {e}")
+            
+            return stats, recommandations, rows
+        
+        def show(result):
+            stats, recommandations, rows = result
+            penalites = stats['penalites']
+            for key, stat_card in stat_cards.items():
+                value = stats[key]
+                stat_card.set_value(f"{value:,.0f} FCFA" if key == 'penalites' else value)
+            
+            # Alerte si pénalités
+            if penalites > 0:
+                alert_frame = ctk.CTkFrame(
+                    self.main_content,
+                    fg_color='#FEF2F2',
+                    border_width=1,
+                    border_color=COLORS['danger'],
+                    corner_radius=DIMENSIONS['border_radius']
+                )
+                alert_frame.pack(fill='x', pady=(0, 25), before=recent_card)
                 
-                table.insert((livre_titre, date_emprunt, date_retour, statut))
+                ctk.CTkLabel(
+                    alert_frame,
+                    text=f"  {ICONS['warning']}  Attention : Vous avez {penalites:,.0f} FCFA de pénalités à régler",
+                    font=ctk.CTkFont(family=FONTS['family'], size=14, weight='bold'),
+                    text_color=COLORS['danger']
+                ).pack(pady=15)
+            
+            # Recommandations pré-calculées (voir RecommendationSystem.calculer_recommandations)
+            self._show_recommendations(recommandations, before=recent_card)
+            
+            table.set_loading(False)
+            for row in rows:
+                table.insert(row)
+        
+        def on_error(e):
+            print(f"Erreur: {e}")
+            table.set_loading(False)
+        
+        self.worker.soumettre(load, show, on_error, groupe='home')
+    
+    def _load_recommendations(self, db, etudiant_id):
+        """Recommandations enregistrées pour l'étudiant (exécuté par le worker)"""
+        try:
+            recommandations = query_recommandations(db, etudiant_id).limit(5).all()
+            return [
+                (
+                    r.livre.titre,
+                    r.livre.auteurs_str or "N/A",
+                    r.livre.categorie or "N/A"
+                )
+                for r in recommandations if r.livre
+            ]
         except Exception as e:
-            print(f"Erreur chargement emprunts: {e}")
-        finally:
-            db.close()
+            print(f"Erreur chargement recommandations: {e}")
+            return []
+    
+    def _show_recommendations(self, rows, before=None):
+        """Afficher les recommandations de l'étudiant, s'il y en a"""
+        if not rows:
+            return
+        
+        reco_card = ModernCard(self.main_content, title=f"{ICONS['star']}  Recommandé pour vous")
+        reco_card.pack(fill='x', pady=(0, 25), before=before)
+        
+        columns = {
+            'livre': {'text': 'Livre', 'width': 300},
+            'auteurs': {'text': 'Auteur(s)', 'width': 200},
+            'categorie': {'text': 'Catégorie', 'width': 150},
+        }
+        
+        table = ModernTable(reco_card.content, columns)
+        table.pack(fill='both', expand=True)
+        for row in rows:
+            table.insert(row)
     
     def _show_catalog(self):
         """Afficher le catalogue de livres"""
@@ -273,11 +351,22 @@ class StudentDashboard(ctk.CTkFrame):
         search_bar = SearchBar(
             search_frame,
             placeholder="Rechercher un livre par titre, auteur ou catégorie...",
-            on_search=self._search_books
+            on_search=self._search_books,
+            live=True
         )
         search_bar.pack(fill='x')
         self.search_entry = search_bar
         
+        # Emprunt en libre service : scanner l'ISBN au dos du livre
+        guichet = Guichet(etudiant_fixe=self.user)
+        self.books_scan = ScanBar(
+            self.main_content,
+            placeholder="Ou scanner l'ISBN du livre à emprunter...",
+            on_scan=lambda code: self._scan_book(guichet, code)
+        )
+        # Sans focus automatique : la recherche en direct garde la saisie clavier
+        self.books_scan.pack(fill='x', pady=(0, 20))
+        
         # Table des livres
         columns = {
             'titre': {'text': 'Titre', 'width': 350},
@@ -286,9 +375,16 @@ class StudentDashboard(ctk.CTkFrame):
             'disponible': {'text': 'Disponible', 'width': 100},
         }
         
-        self.books_table = ModernTable(self.main_content, columns)
+        # Ctrl+clic / Maj+clic : emprunter plusieurs livres en une fois
+        self.books_table = ModernTable(self.main_content, columns, multi_select=True)
         self.books_table.pack(fill='both', expand=True)
         
+        self.books_more = LoadMoreBar(
+            self.main_content,
+            on_load_more=lambda: self._load_books(append=True)
+        )
+        self.books_more.pack(fill='x', pady=(10, 0))
+        
         self._load_books()
         
         # Bouton emprunter
@@ -297,7 +393,7 @@ class StudentDashboard(ctk.CTkFrame):
         
         emprunt_btn = AnimatedButton(
             btn_frame,
-            text="Emprunter le livre sélectionné",
+            text="Emprunter la sélection",
             style='success',
             icon=ICONS['add'],
             command=self._emprunter_livre,
@@ -305,37 +401,58 @@ class StudentDashboard(ctk.CTkFrame):
         )
         emprunt_btn.pack(side='left')
     
-    def _load_books(self, search_term=None):
-        """Charger les livres dans la table"""
-        self.books_table.clear()
-        
-        db = get_db()
-        try:
-            query = db.query(Livre)
-            
-            if search_term:
-                search_term = f"%{search_term}%"
-                query = query.filter(
-                    Livre.titre.ilike(search_term) |
-                    Livre.categorie.ilike(search_term)
-                )
+    def _load_books(self, search_term=None, append=False):
+        """Charger une page de livres dans la table"""
+        if not append:
+            self.books_table.clear()
+            self._books_search = search_term
+            self._books_cursor = None
             
-            livres = query.all()
+            # Saisie déjà vue, ou qui affine un résultat complet : pas de requête
+            cached = self._books_cache.get(search_term) if search_term else None
+            if cached is not None:
+                self.worker.annuler('books')
+                lignes, self._books_cursor, has_more = cached
+                self._show_page(self.books_table, self.books_more, [row for _, row in lignes], has_more)
+                return
+        
+        self.books_table.set_loading()
+        self.books_more.set_loading()
+        search, cursor = self._books_search, self._books_cursor
+        
+        def load(db):
+            if search:
+                # Recherche plein texte classée par pertinence
+                page = rechercher_livres(db, search, cursor=cursor)
+            else:
+                page = paginate(query_livres(db), (Livre.id,), cursor=cursor)
             
-            for livre in livres:
+            rows = []
+            for livre in page:
                 auteurs = ", ".join([a.nom_complet for a in livre.auteurs]) if livre.auteurs else "N/A"
                 disponible = "✅ Oui" if livre.quantite_disponible > 0 else "❌ Non"
                 
-                self.books_table.insert((
+                rows.append((livre.id, (
                     livre.titre,
                     auteurs,
                     livre.categorie or "N/A",
                     disponible
-                ))
-        except Exception as e:
-            print(f"Erreur chargement livres: {e}")
-        finally:
-            db.close()
+                )))
+            
+            # Mots des livres de la première page, pour le cache de recherche
+            mots = [mots_livre(livre) for livre in page] if search and cursor is None else None
+            return rows, mots, page.cursor, page.has_more
+        
+        def show(result):
+            rows, mots, self._books_cursor, has_more = result
+            if mots is not None:
+                self._books_cache.set(search, list(zip(mots, rows)), self._books_cursor, has_more)
+            self._show_page(self.books_table, self.books_more, rows, has_more)
+        
+        self.worker.soumettre(
+            load, show, self._page_error(self.books_table, self.books_more, "livres"),
+            groupe='books'
+        )
     
     def _search_books(self, search_term=None):
         """Rechercher des livres"""
@@ -344,59 +461,91 @@ class StudentDashboard(ctk.CTkFrame):
         self._load_books(search_term if search_term else None)
     
     def _emprunter_livre(self):
-        """Emprunter un livre sélectionné"""
-        selected = self.books_table.get_selected()
-        if not selected:
+        """Emprunter les livres sélectionnés (un seul lot)"""
+        selection = [
+            (key, self.books_table.rows[idx])
+            for idx, key in enumerate(self.books_table.row_keys)
+            if idx in self.books_table.selected_indices
+        ]
+        if not selection:
             messagebox.showwarning("Sélection", "Veuillez sélectionner un livre.")
             return
         
-        titre = selected[0]
-        disponible = selected[3]
-        
-        if "Non" in disponible:
+        livre_ids = [key for key, values in selection if "Non" not in values[3]]
+        if not livre_ids:
             messagebox.showwarning("Indisponible", "Ce livre n'est pas disponible.")
             return
         
-        db = get_db()
-        try:
-            livre = db.query(Livre).filter(Livre.titre == titre).first()
+        titres = {key: values[0] for key, values in selection}
+        etudiant_id = self.user.id
+        
+        def save(db):
+            # Décrément du stock et limite d'emprunts vérifiés dans une seule transaction
+            emprunts, indisponibles, stocks = emprunter_livres(db, etudiant_id, livre_ids)
+            return emprunts[0].date_retour_prevue, [e.livre_id for e in emprunts], indisponibles, stocks
+        
+        def done(result):
+            date_retour, empruntes, indisponibles, stocks = result
+            self._books_cache.invalider()
+            self._patch_availability(stocks)
             
-            if livre and livre.quantite_disponible > 0:
-                # Vérifier le nombre max d'emprunts
-                emprunts_en_cours = db.query(Emprunt).filter(
-                    Emprunt.etudiant_id == self.user.id,
-                    Emprunt.date_retour_effective.is_(None)
-                ).count()
-                
-                if emprunts_en_cours >= APP_CONFIG['max_loans_per_student']:
-                    messagebox.showwarning(
-                        "Limite atteinte",
-                        f"Vous avez atteint le nombre maximum d'emprunts ({APP_CONFIG['max_loans_per_student']})."
-                    )
-                    return
-                
-                # Créer l'emprunt
-                emprunt = Emprunt(
-                    etudiant_id=self.user.id,
-                    livre_id=livre.id
-                )
-                livre.quantite_disponible -= 1
-                
-                db.add(emprunt)
-                db.commit()
-                
-                messagebox.showinfo(
-                    "Succès",
-                    f"Vous avez emprunté '{titre}'.\n"
-                    f"À rendre avant le {emprunt.date_retour_prevue.strftime('%d/%m/%Y')}"
-                )
-                
-                self._load_books()
-        except Exception as e:
-            db.rollback()
-            messagebox.showerror("Erreur", f"Erreur lors de l'emprunt: {e}")
-        finally:
-            db.close()
+            message = "Vous avez emprunté " + ", ".join(f"'{titres[l]}'" for l in empruntes) + ".\n"
+            message += f"À rendre avant le {date_retour.strftime('%d/%m/%Y')}"
+            if indisponibles:
+                message += "\n\nPlus disponible(s) : " + ", ".join(f"'{titres[l]}'" for l in indisponibles)
+                self._patch_availability({l: 0 for l in indisponibles})
+            messagebox.showinfo("Succès", message)
+        
+        def on_error(e):
+            if isinstance(e, EmpruntRefuse):
+                title = "Limite atteinte" if e.raison == 'limite' else "Indisponible"
+                messagebox.showwarning(title, str(e))
+                if e.raison == 'indisponible':
+                    self._books_cache.invalider()
+                    self._patch_availability({l: 0 for l in livre_ids})
+            else:
+                messagebox.showerror("Erreur", f"Erreur lors de l'emprunt: {e}")
+        
+        # Écriture demandée par l'utilisateur : sans groupe, jamais annulée
+        self.worker.soumettre(save, done, on_error)
+    
+    def _scan_book(self, guichet, code):
+        """Emprunter le livre scanné ; la table est mise à jour sans rechargement"""
+        bar = self.books_scan
+        
+        def done(resultat):
+            if bar.winfo_exists():
+                if resultat.succes:
+                    kind = 'success'
+                elif resultat.statut in ('attente', 'refus'):
+                    kind = 'warning'
+                else:
+                    kind = 'danger'
+                bar.set_status(resultat.message, kind)
+            
+            d = resultat.details
+            if resultat.statut == 'emprunt':
+                self._books_cache.invalider()
+                self._patch_availability({d['livre_id']: d['stock']})
+            elif d.get('raison') == 'indisponible':
+                self._books_cache.invalider()
+                self._patch_availability({d['livre_id']: 0})
+        
+        def on_error(e):
+            if bar.winfo_exists():
+                bar.set_status(f"Erreur : {e}", 'danger')
+        
+        # Jamais annulé : passe dans l'ordre par le worker à un thread
+        self.scan_worker.soumettre(lambda db: guichet.scanner_emprunt(db, code), done, on_error)
+    
+    def _patch_availability(self, stocks):
+        """Mettre à jour la colonne « Disponible » des livres ``stocks`` (id -> stock)"""
+        if not self.books_table.winfo_exists():
+            return
+        for key, values in zip(self.books_table.row_keys, list(self.books_table.rows)):
+            if key in stocks:
+                disponible = "✅ Oui" if stocks[key] > 0 else "❌ Non"
+                self.books_table.update_row(key, (*values[:3], disponible))
     
     def _show_loans(self):
         """Afficher les emprunts de l'étudiant"""
@@ -419,13 +568,63 @@ class StudentDashboard(ctk.CTkFrame):
         self.loans_table = ModernTable(self.main_content, columns)
         self.loans_table.pack(fill='both', expand=True)
         
-        db = get_db()
-        try:
-            emprunts = db.query(Emprunt).filter(
-                Emprunt.etudiant_id == self.user.id
-            ).order_by(Emprunt.date_emprunt.desc()).all()
+        self.loans_more = LoadMoreBar(
+            self.main_content,
+            on_load_more=lambda: self._load_loans(append=True)
+        )
+        self.loans_more.pack(fill='x', pady=(10, 0))
+        
+        self._load_loans()
+        
+        # Résumé pénalités
+        summary_card = ModernCard(self.main_content, title="💰 Résumé des pénalités")
+        summary_card.pack(fill='x', pady=(25, 0))
+        
+        summary_label = ctk.CTkLabel(
+            summary_card.content,
+            text="Total pénalités en cours: ...",
+            font=ctk.CTkFont(family=FONTS['family'], size=20, weight='bold'),
+            text_color=COLORS['text_disabled']
+        )
+        summary_label.pack(pady=15)
+        
+        etudiant_id = self.user.id
+        
+        def show(total_penalites):
+            color = COLORS['danger'] if total_penalites > 0 else COLORS['accent']
+            summary_label.configure(
+                text=f"Total pénalités en cours: {total_penalites:,.0f} FCFA",
+                text_color=color
+            )
+        
+        self.worker.soumettre(
+            lambda db: statistiques_etudiant(db, etudiant_id)['penalites'],
+            show,
+            lambda e: show(0),
+            groupe='penalties'
+        )
+    
+    def _load_loans(self, append=False):
+        """Charger une page des emprunts de l'étudiant"""
+        if not append:
+            self.loans_table.clear()
+            self._loans_cursor = None
+        
+        self.loans_table.set_loading()
+        self.loans_more.set_loading()
+        etudiant_id, cursor = self.user.id, self._loans_cursor
+        
+        def load(db):
+            query = query_emprunts(db).filter(Emprunt.etudiant_id == etudiant_id)
+            page = paginate(
+                query,
+                (Emprunt.date_emprunt, Emprunt.id),
+                cursor=cursor,
+                descending=True
+            )
             
-            for emprunt in emprunts:
+            rows = []
+            for emprunt in page:
                 if emprunt.date_retour_effective:
                     statut = '✅ Retourné'
                 elif emprunt.est_en_retard:
@@ -436,43 +635,23 @@ class StudentDashboard(ctk.CTkFrame):
                 penalite = f"{emprunt.calculer_penalite():,.0f} FCFA"
                 livre_titre = emprunt.livre.titre if emprunt.livre else 'N/A'
                 
-                self.loans_table.insert((
+                rows.append((emprunt.id, (
                     livre_titre,
                     emprunt.date_emprunt.strftime('%d/%m/%Y'),
                     emprunt.date_retour_prevue.strftime('%d/%m/%Y'),
                     statut,
                     penalite
-                ))
-        except Exception as e:
-            print(f"Erreur: {e}")
-        finally:
-            db.close()
+                )))
+            return rows, page.cursor, page.has_more
         
-        # Résumé pénalités
-        summary_card = ModernCard(self.main_content, title="💰 Résumé des pénalités")
-        summary_card.pack(fill='x', pady=(25, 0))
+        def show(result):
+            rows, self._loans_cursor, has_more = result
+            self._show_page(self.loans_table, self.loans_more, rows, has_more)
         
-        db = get_db()
-        try:
-            emprunts = db.query(Emprunt).filter(
-                Emprunt.etudiant_id == self.user.id,
-                Emprunt.date_retour_effective.is_(None)
-            ).all()
-            
-            total_penalites = sum(e.calculer_penalite() for e in emprunts if e.est_en_retard)
-        except:
-            total_penalites = 0
-        finally:
-            db.close()
-        
-        color = COLORS['danger'] if total_penalites > 0 else COLORS['accent']
-        
-        ctk.CTkLabel(
-            summary_card.content,
-            text=f"Total pénalités en cours: {total_penalites:,.0f} FCFA",
-            font=ctk.CTkFont(family=FONTS['family'], size=20, weight='bold'),
-            text_color=color
-        ).pack(pady=15)
+        self.worker.soumettre(
+            load, show, self._page_error(self.loans_table, self.loans_more, "emprunts"),
+            groupe='loans'
+        )
     
     def _show_profile(self):
         """Afficher le profil de l'étudiant"""
@@ -631,7 +810,7 @@ class StudentDashboard(ctk.CTkFrame):
     
     def _open_password_dialog(self):
         """Ouvrir le dialog de changement de mot de passe"""
-        PasswordChangeDialog(self.parent, self.user, 'etudiant')
+        PasswordChangeDialog(self.parent, self.user, 'etudiant', worker=self.worker)
     
     def _open_profile_dialog(self):
         """Ouvrir le dialog de modification du profil"""
@@ -639,7 +818,8 @@ class StudentDashboard(ctk.CTkFrame):
             self.parent, 
             self.user, 
             'etudiant',
-            on_success=self._refresh_ui
+            on_success=self._refresh_ui,
+            worker=self.worker
         )
     
     def _refresh_ui(self):